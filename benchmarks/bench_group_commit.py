@@ -0,0 +1,73 @@
+"""
+Benchmark POST /posts/ throughput with and without group commit on a SQLite file.
+
+Usage:
+    python -m benchmarks.bench_group_commit [posts_per_writer]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_jwt_extended import create_access_token
+
+from src.app import create_app, db, User, Role
+
+WRITERS = [1, 8, 64]
+
+
+def bench(group_commit, writers, posts_per_writer):
+    """
+    Run ``writers`` threads, each creating ``posts_per_writer`` posts.
+
+    Returns:
+        float: Posts created per second.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+            'POST_GROUP_COMMIT': group_commit,
+            'ADMISSION_LIMITS': {},
+            'REVOCATION_REFRESH_INTERVAL': 0,
+        })
+        with app.app_context():
+            db.create_all()
+            role = Role(name='admin')
+            db.session.add(role)
+            db.session.commit()
+            user = User(username='bench', password='bench', role_id=role.id)
+            db.session.add(user)
+            db.session.commit()
+            headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+        def write(_):
+            client = app.test_client()
+            for i in range(posts_per_writer):
+                response = client.post('/posts/', json={'title': f'title {i}', 'body': 'body ' * 20}, headers=headers)
+                assert response.status_code == 201, response.data
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            list(pool.map(write, range(writers)))
+        elapsed = time.perf_counter() - start
+
+        writer = app.extensions.get('post_writer')
+        if writer is not None:
+            writer.stop()
+        with app.app_context():
+            db.engine.dispose()
+        return writers * posts_per_writer / elapsed
+
+
+def main():
+    posts_per_writer = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"{'writers':>8}{'per-request commit':>22}{'group commit':>16}")
+    for writers in WRITERS:
+        plain = bench(False, writers, posts_per_writer)
+        grouped = bench(True, writers, posts_per_writer)
+        print(f"{writers:>8}{plain:>18.0f} p/s{grouped:>12.0f} p/s")
+
+
+if __name__ == "__main__":
+    main()
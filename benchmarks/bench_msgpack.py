@@ -0,0 +1,61 @@
+"""
+Compare payload size and encode/decode time of JSON and MessagePack for a
+/posts/-shaped listing.
+
+JSON is encoded with the app's own provider (the path used by jsonify), so
+datetimes become HTTP date strings; MessagePack keeps them as native timestamps.
+
+Usage:
+    python -m benchmarks.bench_msgpack [posts] [repeat]
+"""
+import json
+import sys
+import time
+from datetime import datetime
+
+from flask import Flask
+
+from src.msgpack_support import NegotiatingJSONProvider, packb, unpackb, msgpack
+
+
+def listing(posts):
+    return {"posts": [
+        {
+            "id": i,
+            "title": f"Post number {i}",
+            "body": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+            "created": datetime(2026, 10, 19, 10, i % 60),
+            "author_id": i % 50,
+        }
+        for i in range(posts)
+    ]}
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    if msgpack is None:
+        sys.exit("msgpack is not installed")
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    obj = listing(posts)
+    provider = NegotiatingJSONProvider(Flask(__name__))
+
+    json_body, json_encode = timed(lambda: provider.dumps(obj, separators=(",", ":")).encode(), repeat)
+    _, json_decode = timed(lambda: json.loads(json_body), repeat)
+    msgpack_body, msgpack_encode = timed(lambda: packb(obj), repeat)
+    _, msgpack_decode = timed(lambda: unpackb(msgpack_body), repeat)
+
+    print(f"{posts} posts")
+    print(f"{'format':<10}{'bytes':>12}{'encode ms':>12}{'decode ms':>12}")
+    print(f"{'json':<10}{len(json_body):>12}{json_encode:>12.2f}{json_decode:>12.2f}")
+    print(f"{'msgpack':<10}{len(msgpack_body):>12}{msgpack_encode:>12.2f}{msgpack_decode:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark password verification throughput at several cost settings.
+
+Each verification runs on a single core, so the figures are logins per second
+per core. Multiply by PASSWORD_POOL_WORKERS to size the login pool.
+
+Usage:
+    python -m benchmarks.bench_password_hashing [seconds_per_setting]
+"""
+import sys
+import time
+
+from src.passwords import hash_password, verify_password, SCRYPT, PBKDF2
+
+SETTINGS = [
+    (SCRYPT, {"scrypt_n": 2 ** 12}),
+    (SCRYPT, {"scrypt_n": 2 ** 14}),
+    (SCRYPT, {"scrypt_n": 2 ** 15}),
+    (PBKDF2, {"pbkdf2_iterations": 100_000}),
+    (PBKDF2, {"pbkdf2_iterations": 300_000}),
+    (PBKDF2, {"pbkdf2_iterations": 600_000}),
+]
+
+
+def bench(method, params, duration):
+    """
+    Verify the same password repeatedly for about ``duration`` seconds.
+
+    Returns:
+        float: Verifications per second.
+    """
+    stored = hash_password("correct horse battery staple", method=method, **params)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        verify_password(stored, "correct horse battery staple")
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    print(f"{'method':<15}{'cost':>12}{'logins/s/core':>16}{'ms/login':>12}")
+    for method, params in SETTINGS:
+        rate = bench(method, params, duration)
+        cost = next(iter(params.values()))
+        print(f"{method:<15}{cost:>12}{rate:>16.1f}{1000 / rate:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the raw sqlite3 read path against the ORM for the hottest lookups.
+
+Each lookup is timed directly (no HTTP), then GET /posts/<id> and GET /users/<id>
+are timed through the test client.
+
+Usage:
+    python -m benchmarks.bench_raw_reads [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from src.app import create_app, db, User, Role, Post
+from src.controllers.post import _post_to_dict
+from src.controllers.user import _user_to_dict
+
+USERS = 100
+POSTS = 1000
+
+
+def timed(function, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        function(i)
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+            'ADMISSION_LIMITS': {},
+            'REVOCATION_REFRESH_INTERVAL': 0,
+            'RAW_SQLITE_READS': True,
+        })
+        reader = app.extensions['raw_sqlite']
+        with app.app_context():
+            db.create_all()
+            role = Role(name='admin')
+            db.session.add(role)
+            db.session.commit()
+            db.session.add_all([User(username=f'user{i}', password='x', role_id=role.id) for i in range(USERS)])
+            db.session.commit()
+            db.session.add_all([Post(title=f't{i}', body='body ' * 20, author_id=i % USERS + 1) for i in range(POSTS)])
+            db.session.commit()
+
+        def orm(lookup):
+            def run(i):
+                with app.app_context():
+                    lookup(i)
+                    db.session.remove()
+            return run
+
+        cases = [
+            ("get_post",
+             orm(lambda i: _post_to_dict(db.session.get(Post, i % POSTS + 1))),
+             lambda i: reader.get_post(i % POSTS + 1)),
+            ("get_user",
+             orm(lambda i: _user_to_dict(db.session.get(User, i % USERS + 1))),
+             lambda i: reader.get_user(i % USERS + 1)),
+            ("login lookup",
+             orm(lambda i: db.session.execute(db.select(User).where(User.username == f'user{i % USERS}')).scalar().password),
+             lambda i: reader.get_credentials(f'user{i % USERS}').password),
+        ]
+
+        client = app.test_client()
+
+        def endpoint(path, count):
+            return lambda i: client.get(path.format(i % count + 1))
+
+        def without_reader(function):
+            def run(i):
+                app.extensions.pop('raw_sqlite', None)
+                try:
+                    function(i)
+                finally:
+                    app.extensions['raw_sqlite'] = reader
+            return run
+
+        for path, count in (('/posts/{}', POSTS), ('/users/{}', USERS)):
+            function = endpoint(path, count)
+            cases.append((f"GET {path.format('<id>')}", without_reader(function), function))
+
+        print(f"{'lookup':>18}{'ORM':>14}{'raw sqlite3':>16}{'speedup':>10}")
+        for name, slow, fast in cases:
+            slow_rate, fast_rate = timed(slow, iterations), timed(fast, iterations)
+            print(f"{name:>18}{slow_rate:>10.0f} op/s{fast_rate:>12.0f} op/s{fast_rate / slow_rate:>9.1f}x")
+
+        reader.close()
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark post write throughput with 1, 2, 4 and 8 shard files.
+
+Three numbers are reported per shard count: inserts through the shard router
+alone, POST /posts/ requests, and the rate at which the posts of the requests were
+applied to the author counters, the daily summary and the change log of the main
+database, measured until the last shard event was applied.
+
+Usage:
+    python -m benchmarks.bench_sharding [posts_per_writer] [writers]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_jwt_extended import create_access_token
+
+from src.app import create_app, db, User, Role
+
+SHARDS = [1, 2, 4, 8]
+
+
+def bench(shards, writers, posts_per_writer):
+    """
+    Run ``writers`` threads, one author each, each creating ``posts_per_writer`` posts.
+
+    Returns:
+        float: Posts per second through the router alone.
+        float: Posts per second through the endpoint.
+        float: Posts per second through the endpoint, until their events were applied.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+            'POST_SHARDS': [f"sqlite:///{os.path.join(tmp, f'posts-{i}.sqlite')}" for i in range(shards)],
+            'ADMISSION_LIMITS': {},
+            'REVOCATION_REFRESH_INTERVAL': 0,
+        })
+        router = app.extensions['post_shards']
+        with app.app_context():
+            db.create_all()
+            role = Role(name='admin')
+            db.session.add(role)
+            db.session.commit()
+            users = [User(username=f'bench{i}', password='bench', role_id=role.id) for i in range(writers)]
+            db.session.add_all(users)
+            db.session.commit()
+            authors = [user.id for user in users]
+            tokens = [create_access_token(identity=str(author)) for author in authors]
+
+        def insert(author_id):
+            # The router reserves post IDs through the main database session.
+            with app.app_context():
+                for i in range(posts_per_writer):
+                    router.create(f'title {i}', 'body ' * 20, author_id)
+
+        def request(token):
+            client = app.test_client()
+            headers = {'Authorization': f'Bearer {token}'}
+            for i in range(posts_per_writer):
+                response = client.post('/posts/', json={'title': f'title {i}', 'body': 'body ' * 20}, headers=headers)
+                assert response.status_code == 201, response.data
+
+        applier = app.extensions['post_shard_events']
+        posts = writers * posts_per_writer
+        rates = []
+        for target, args in ((insert, authors), (request, tokens)):
+            with app.app_context():
+                applier.apply_pending()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=writers) as pool:
+                list(pool.map(target, args))
+            rates.append(posts / (time.perf_counter() - start))
+        with app.app_context():
+            applier.apply_pending()
+        rates.append(posts / (time.perf_counter() - start))
+
+        applier.stop()
+        router.dispose()
+        with app.app_context():
+            db.engine.dispose()
+        return rates
+
+
+def main():
+    posts_per_writer = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    print(f"{writers} writers, {posts_per_writer} posts each")
+    print(f"{'shards':>8}{'router':>14}{'endpoint':>14}{'applied':>14}")
+    for shards in SHARDS:
+        inserts, requests, applied = bench(shards, writers, posts_per_writer)
+        print(f"{shards:>8}{inserts:>10.0f} p/s{requests:>10.0f} p/s{applied:>10.0f} p/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,8 @@ def app():
     """
     app = create_app({
         'TESTING': True,
-        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'REVOCATION_REFRESH_INTERVAL': 0,
     })
     with app.app_context():
         db.create_all()
@@ -0,0 +1,50 @@
+"""
+Production settings for gunicorn.
+
+The app is created once in the master (``preload_app``) and shared with the
+workers through copy-on-write. The fork safety itself lives in src/forking.py;
+the hooks below close the master's connections before each fork, start each
+worker eagerly and stop it cleanly.
+
+Usage:
+    gunicorn -c gunicorn.conf.py "src.app:create_app()"
+"""
+import os
+
+from src import forking
+
+# Import NumPy once in the master, before the workers are forked.
+os.environ.setdefault("ANALYTICS_PRELOAD", "true")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+
+def pre_fork(server, worker):
+    """
+    Close the idle connections of the master before a worker is forked.
+    """
+    forking.before_fork()
+
+
+def post_worker_init(worker):
+    """
+    Start the background threads of a new worker before it accepts requests.
+    """
+    forking.start_worker(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    """
+    Flush the group commit queue, let running jobs finish and close the connections
+    of an exiting worker.
+    """
+    forking.shutdown(worker.wsgi)
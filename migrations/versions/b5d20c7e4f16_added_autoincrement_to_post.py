@@ -0,0 +1,28 @@
+"""Added AUTOINCREMENT to post
+
+Revision ID: b5d20c7e4f16
+Revises: a3c81e5f0b92
+Create Date: 2026-10-19 22:58:30.104733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d20c7e4f16'
+down_revision = 'a3c81e5f0b92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite can only add AUTOINCREMENT by recreating the table. Copying the rows
+    # sets the sequence to the highest existing ID.
+    with op.batch_alter_table('post', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+        pass
+
+
+def downgrade():
+    with op.batch_alter_table('post', recreate='always', table_kwargs={'sqlite_autoincrement': False}):
+        pass
@@ -0,0 +1,139 @@
+import threading
+import time
+from http import HTTPStatus
+
+from flask import g, request
+
+
+class ConcurrencyLimiter:
+    """
+    Limit the number of requests running at once, with a bounded wait queue.
+
+    When ``adaptive`` is set, the limit follows an AIMD rule: it grows by roughly one
+    slot per ``limit`` fast requests and shrinks by ``decrease`` whenever a request is
+    slower than ``target_latency``.
+
+    Attributes:
+        limit (float): The current number of concurrent requests allowed.
+        active (int): The number of requests currently running.
+        waiting (int): The number of requests waiting for a slot.
+        rejected (int): The number of requests turned away.
+    """
+
+    def __init__(self, limit, queue=0, timeout=1.0, adaptive=False, min_limit=1,
+                 max_limit=None, target_latency=0.5, decrease=0.9):
+        self.limit = float(limit)
+        self.queue = queue
+        self.timeout = timeout
+        self.adaptive = adaptive
+        self.min_limit = min_limit
+        self.max_limit = max_limit or limit * 4
+        self.target_latency = target_latency
+        self.decrease = decrease
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Take a slot, waiting at most ``timeout`` seconds in the queue.
+
+        Returns:
+            bool: False if the queue is full or the wait timed out.
+        """
+        with self._cond:
+            if self.active < int(self.limit):
+                self.active += 1
+                return True
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                return False
+
+            self.waiting += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self.active < int(self.limit), self.timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                self.rejected += 1
+                return False
+            self.active += 1
+            return True
+
+    def release(self, latency=None):
+        """
+        Give back a slot and, in adaptive mode, adjust the limit from the request latency.
+
+        Args:
+            latency (float, optional): How long the request took, in seconds.
+        """
+        with self._cond:
+            self.active -= 1
+            if self.adaptive and latency is not None:
+                if latency > self.target_latency:
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify()
+
+
+def get_limiter(app, endpoint):
+    """
+    Return the limiter of an endpoint, creating it on first use.
+
+    The options come from the endpoint's own entry in ``ADMISSION_LIMITS``, or else
+    from the entry of its blueprint.
+
+    Args:
+        app (Flask): The Flask application.
+        endpoint (str): The endpoint name, e.g. ``"post.get_post"``.
+
+    Returns:
+        ConcurrencyLimiter: The limiter, or None if the endpoint is not limited.
+    """
+    limiters = app.extensions["admission"]
+    limiter = limiters.get(endpoint)
+    if limiter is None and endpoint is not None:
+        config = app.config.get("ADMISSION_LIMITS", {})
+        options = config.get(endpoint) or config.get(endpoint.rpartition(".")[0])
+        if options is not None:
+            # setdefault is atomic, so two threads racing here share one limiter.
+            limiter = limiters.setdefault(endpoint, ConcurrencyLimiter(**options))
+    return limiter
+
+
+def init_app(app):
+    """
+    Register per-endpoint admission control on the app.
+
+    ``ADMISSION_LIMITS`` maps an endpoint or a blueprint name to the keyword
+    arguments of a ConcurrencyLimiter, e.g. ``{"post": {"limit": 8, "queue": 16}}``.
+    A blueprint entry gives each endpoint of the blueprint its own limiter with
+    those options, so a saturated endpoint, e.g. a slow listing, does not slow down
+    cheap lookups next to it. Endpoints without an entry are not limited. Requests
+    that find the queue full are rejected with 503.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.extensions["admission"] = {}
+    if not app.config.get("ADMISSION_LIMITS"):
+        return
+
+    @app.before_request
+    def admit_request():
+        limiter = get_limiter(app, request.endpoint)
+        if limiter is None:
+            return None
+        if not limiter.acquire():
+            return {"error": "Server busy, try again later"}, HTTPStatus.SERVICE_UNAVAILABLE, {"Retry-After": "1"}
+        g._admission = (limiter, time.monotonic())
+        return None
+
+    @app.teardown_request
+    def release_request(exc=None):
+        admission = g.pop("_admission", None)
+        if admission is not None:
+            limiter, started = admission
+            limiter.release(time.monotonic() - started)
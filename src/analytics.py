@@ -0,0 +1,345 @@
+import math
+import sys
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+
+from src.models import db, Post, AnalyticsVersion
+
+# NumPy is optional, and imported on first use so that it does not slow down
+# the start of processes that never compute analytics, unless ANALYTICS_PRELOAD
+# is set (see init_app).
+_NOT_LOADED = object()
+np = _NOT_LOADED
+
+BUCKET_SECONDS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+# The epoch is a Thursday; weekly buckets start on Mondays.
+BUCKET_OFFSETS = {"hour": 0, "day": 0, "week": 4 * 86400}
+PERCENTILES = (50, 90, 99)
+
+
+def _numpy():
+    global np
+    if np is _NOT_LOADED:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - optional dependency
+            numpy = None
+        np = numpy
+    return np
+
+
+def _to_epoch(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _to_datetime(epoch):
+    return datetime.fromtimestamp(int(epoch), timezone.utc).replace(tzinfo=None)
+
+
+def _columns_query(start, end, after_id):
+    query = sa.select(
+        Post.id,
+        sa.cast(sa.func.strftime("%s", Post.created), sa.Integer),
+        Post.author_id,
+        sa.func.length(Post.body),
+    ).where(Post.id > after_id).where(Post.created.is_not(None))
+    if start is not None:
+        query = query.where(Post.created >= _to_datetime(start))
+    if end is not None:
+        query = query.where(Post.created < _to_datetime(end))
+    return query
+
+
+def _fetch_columns(start, end, after_id):
+    """
+    Pull (id, created, author_id, body length) for the posts of a range in bulk.
+
+    created is converted to epoch seconds and the body length is computed by SQLite,
+    so neither ORM objects nor post bodies are loaded.
+    """
+    return db.session.execute(_columns_query(start, end, after_id)).all()
+
+
+def _fetch_sharded_columns(router, start, end):
+    """
+    Pull the columns of a range from every shard, in parallel, and from the post table.
+
+    Sharded IDs are reserved in blocks by each process, so they do not grow with
+    time, and a range cannot be extended from its last ID: these columns are read
+    in full on every request and not cached.
+    """
+    rows = [row for rows in router.scatter(_columns_query(start, end, 0)) for row in rows]
+    columns = _Columns()
+    columns.extend(rows + _fetch_columns(start, end, 0))
+    return columns
+
+
+class _Columns:
+    """
+    Columnar storage for the posts of a range: NumPy arrays when available,
+    plain lists otherwise.
+
+    Only the highest post ID is kept, not the IDs themselves, and author IDs and
+    body lengths are stored as 32-bit integers, which keeps cached ranges small.
+    """
+
+    def __init__(self, created=None, authors=None, lengths=None, last_id=0):
+        self.last_id = last_id
+        self.created, self.authors, self.lengths = created, authors, lengths
+        if created is None:
+            self.extend([])
+
+    def __len__(self):
+        return len(self.created)
+
+    def extend(self, rows):
+        if rows:
+            self.last_id = max(self.last_id, max(row[0] for row in rows))
+        np = _numpy()
+        if np is not None:
+            block = np.array(rows, dtype=np.int64).reshape(-1, 4)
+            columns = [block[:, 1], block[:, 2].astype(np.int32), block[:, 3].astype(np.int32)]
+            if self.created is not None:
+                columns = [np.concatenate((old, new)) for old, new in
+                           zip((self.created, self.authors, self.lengths), columns)]
+        else:
+            columns = [list(column) for column in zip(*rows)][1:] or [[], [], []]
+            if self.created is not None:
+                columns = [old + new for old, new in
+                           zip((self.created, self.authors, self.lengths), columns)]
+        self.created, self.authors, self.lengths = columns
+
+    def between(self, start, end):
+        """
+        Return the posts created in ``[start, end)``, as new columns.
+        """
+        np = _numpy()
+        if np is not None:
+            mask = np.ones(len(self), dtype=bool)
+            if start is not None:
+                mask &= self.created >= start
+            if end is not None:
+                mask &= self.created < end
+            return _Columns(self.created[mask], self.authors[mask], self.lengths[mask], self.last_id)
+        keep = [(start is None or t >= start) and (end is None or t < end) for t in self.created]
+        columns = ([value for value, kept in zip(column, keep) if kept]
+                   for column in (self.created, self.authors, self.lengths))
+        return _Columns(*columns, last_id=self.last_id)
+
+    @property
+    def nbytes(self):
+        np = _numpy()
+        if np is not None:
+            return self.created.nbytes + self.authors.nbytes + self.lengths.nbytes
+        # A list slot plus a small int object, for each of the three columns.
+        return sum(sys.getsizeof(column) for column in (self.created, self.authors, self.lengths)) + 3 * 28 * len(self)
+
+
+def _aggregate(columns, bucket):
+    """
+    Compute the time buckets, per-author distribution and body length stats.
+    """
+    size, offset = BUCKET_SECONDS[bucket], BUCKET_OFFSETS[bucket]
+    total = len(columns)
+
+    np = _numpy()
+    if np is not None:
+        starts = (columns.created - offset) // size * size + offset
+        bucket_keys, bucket_counts = np.unique(starts, return_counts=True)
+        author_keys, author_index, author_counts = np.unique(
+            columns.authors, return_inverse=True, return_counts=True)
+        author_lengths = np.bincount(author_index, weights=columns.lengths, minlength=len(author_keys))
+        buckets = zip(bucket_keys.tolist(), bucket_counts.tolist())
+        authors = zip(author_keys.tolist(), author_counts.tolist(), author_lengths.astype(np.int64).tolist())
+        if total:
+            percentiles = np.percentile(columns.lengths, PERCENTILES).tolist()
+            lengths = {"mean": float(columns.lengths.mean()), "max": int(columns.lengths.max())}
+    else:
+        buckets = sorted(Counter((t - offset) // size * size + offset for t in columns.created).items())
+        counts, sums = Counter(columns.authors), Counter()
+        for author, length in zip(columns.authors, columns.lengths):
+            sums[author] += length
+        authors = ((author, counts[author], sums[author]) for author in sorted(counts))
+        if total:
+            ordered = sorted(columns.lengths)
+            percentiles = [_percentile(ordered, p) for p in PERCENTILES]
+            lengths = {"mean": sum(ordered) / total, "max": ordered[-1]}
+
+    body_length = {"count": total}
+    if total:
+        body_length.update(lengths)
+        body_length.update({f"p{p}": value for p, value in zip(PERCENTILES, percentiles)})
+
+    return {
+        "bucket": bucket,
+        "total": total,
+        "buckets": [{"start": _to_datetime(start), "count": count} for start, count in buckets],
+        "authors": [
+            {"author_id": author, "count": count, "total_length": length}
+            for author, count, length in authors
+        ],
+        "body_length": body_length,
+    }
+
+
+def _percentile(ordered, p):
+    # Linear interpolation, as numpy.percentile does by default.
+    rank = (len(ordered) - 1) * p / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _floor(epoch, bucket):
+    if epoch is None:
+        return None
+    size, offset = BUCKET_SECONDS[bucket], BUCKET_OFFSETS[bucket]
+    return (epoch - offset) // size * size + offset
+
+
+def _ceil(epoch, bucket):
+    if epoch is None:
+        return None
+    size, offset = BUCKET_SECONDS[bucket], BUCKET_OFFSETS[bucket]
+    return -((offset - epoch) // size) * size + offset
+
+
+def _read_version():
+    try:
+        return db.session.execute(sa.select(AnalyticsVersion.version).where(AnalyticsVersion.id == 1)).scalar() or 0
+    except OperationalError:
+        # The table does not exist yet, e.g. before the first migration.
+        return None
+
+
+class AnalyticsCache:
+    """
+    LRU cache of post columns per time range, updated incrementally.
+
+    Ranges are widened to whole buckets, so requests for nearby bounds share an
+    entry, and the exact bounds are applied when aggregating. Inserts only append
+    rows, so a cached range is brought up to date by fetching the rows with an ID
+    above the last one seen. Updates and deletions increment the analytics_version
+    row through mark_stale(), and every read compares it with the version the
+    entries were built at, so the caches of all processes are dropped. The cache is
+    bounded by the total size of its columns.
+    """
+
+    def __init__(self, max_bytes=64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def get_columns(self, start, end, bucket):
+        # The version is read first: a change committed after it only makes the
+        # entries look older than they are.
+        version = _read_version()
+        key = (_floor(start, bucket), _ceil(end, bucket))
+        with self._lock:
+            if version is None or version != self.version:
+                self._entries.clear()
+                self.nbytes = 0
+                self.version = version
+            cached = self._entries.get(key)
+            # extend() replaces the columns rather than changing them, so a copy of
+            # the references is a consistent snapshot.
+            columns = _Columns() if cached is None else _Columns(
+                cached.created, cached.authors, cached.lengths, cached.last_id)
+
+        # The scan runs without the lock, so a cold range does not hold up the
+        # requests for other ranges.
+        columns.extend(_fetch_columns(key[0], key[1], columns.last_id))
+
+        with self._lock:
+            # Another request may have stored a newer entry, or dropped the cache
+            # for a newer version, while the rows were read.
+            current = self._entries.get(key)
+            if (
+                version is not None
+                and version == self.version
+                and (current is None or current.last_id <= columns.last_id)
+                and columns.nbytes <= self.max_bytes
+            ):
+                if current is not None:
+                    self.nbytes -= self._entries.pop(key).nbytes
+                self._entries[key] = columns
+                self.nbytes += columns.nbytes
+                while self.nbytes > self.max_bytes:
+                    self.nbytes -= self._entries.popitem(last=False)[1].nbytes
+            elif current is not None:
+                self._entries.move_to_end(key)
+        return columns.between(start, end) if key != (start, end) else columns
+
+
+def get_cache():
+    """
+    Return the analytics cache of the current app, creating it on first use.
+    """
+    return current_app.extensions.setdefault(
+        "analytics_cache", AnalyticsCache(current_app.config.get("ANALYTICS_CACHE_MAX_BYTES", 64 * 2 ** 20)))
+
+
+def mark_stale():
+    """
+    Make every process drop its cached analytics, e.g. when a post is updated or
+    deleted. The version is incremented in the current transaction, so the caller
+    is responsible for committing the session.
+    """
+    bumped = db.session.execute(
+        sa.update(AnalyticsVersion).where(AnalyticsVersion.id == 1).values(version=AnalyticsVersion.version + 1))
+    if bumped.rowcount == 0:
+        db.session.execute(sa.insert(AnalyticsVersion).values(id=1, version=1))
+
+
+def post_analytics(start=None, end=None, bucket="day"):
+    """
+    Return post activity analytics for a time range. When sharding is enabled, the
+    posts of every shard are read as well, without the cache.
+
+    Args:
+        start (datetime, optional): Inclusive lower bound on Post.created (UTC).
+        end (datetime, optional): Exclusive upper bound on Post.created (UTC).
+        bucket (str): One of ``"hour"``, ``"day"`` or ``"week"``.
+
+    Returns:
+        dict: Time-bucketed counts, per-author counts and body length stats.
+    """
+    router = current_app.extensions.get("post_shards")
+    if router is not None:
+        columns = _fetch_sharded_columns(router, _to_epoch(start), _to_epoch(end))
+    else:
+        columns = get_cache().get_columns(_to_epoch(start), _to_epoch(end), bucket)
+    result = _aggregate(columns, bucket)
+    result.update({"from": start, "to": end})
+    return result
+
+
+def init_app(app):
+    """
+    Import NumPy now when ``ANALYTICS_PRELOAD`` is set.
+
+    In a pre-forking server that creates the app in the master, the import then
+    happens once, and the workers share its memory instead of each paying for the
+    import on their first analytics request.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    if app.config.get("ANALYTICS_PRELOAD"):
+        _numpy()
@@ -1,18 +1,35 @@
 import os
+from datetime import timedelta
 import click
-import sqlalchemy as sa
 
 from flask import Flask, current_app
 from dotenv import load_dotenv
-from flask_migrate import Migrate
-from flask_jwt_extended import JWTManager
-from src.db import init_db_command
-from src.models import db
+from src.models import db, User, Role, Post
+from src.token_cache import CachingJWTManager
+from src import db as raw_db, statements, revocation, ratelimit, admission, group_commit, compression, msgpack_support, post_stats, post_summary, archive, sharding, analytics, forking, startup, profiling, singleflight, roles, backfill, jobs, shard_events
+from src.controllers import user, post, role, auth, job
 
-load_dotenv()
+jwt = CachingJWTManager()
 
-migrate = Migrate()
-jwt = JWTManager()
+
+class LazyMigrateGroup(click.Group):
+    """
+    Placeholder for the ``flask db`` command group.
+
+    Flask-Migrate pulls in Alembic, which takes longer to import than the rest of
+    the app, and only the migration commands need it. It is set up the first time
+    a ``flask db`` command is looked up, and then replaces this group.
+    """
+
+    def __init__(self, app):
+        super().__init__('db', help='Perform database migrations.')
+        self.app = app
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        from flask_migrate import Migrate
+
+        Migrate(self.app, db)
+        return self.app.cli.commands['db'].make_context(info_name, args, parent=parent, **extra)
 
 @click.command('init-db')
 def init_db_command():
@@ -41,11 +58,62 @@ def create_app(test_config=None):
     Returns:
         Flask: The configured Flask application.
     """
+    load_dotenv()
     app = Flask(__name__, instance_relative_config=True)
+    msgpack_support.init_app(app)
     app.config.from_mapping(
         SECRET_KEY=os.getenv('SECRET_KEY', 'dev'),
         SQLALCHEMY_DATABASE_URI=os.getenv('DATABASE_URL', 'sqlite:///blog.sqlite'),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        MULTI_GET_MAX_IDS=int(os.getenv('MULTI_GET_MAX_IDS', 100)),
+        PASSWORD_HASH_METHOD=os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+        PASSWORD_SCRYPT_N=int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 14)),
+        PASSWORD_PBKDF2_ITERATIONS=int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 600_000)),
+        PASSWORD_POOL_WORKERS=int(os.getenv('PASSWORD_POOL_WORKERS', os.cpu_count() or 1)),
+        PASSWORD_POOL_MAX_PENDING=int(os.getenv('PASSWORD_POOL_MAX_PENDING', 16)),
+        JWT_VERIFIED_CACHE_SIZE=int(os.getenv('JWT_VERIFIED_CACHE_SIZE', 4096)),
+        JWT_ACCESS_TOKEN_EXPIRES=timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES_MINUTES', 15))),
+        JWT_REFRESH_TOKEN_EXPIRES=timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_EXPIRES_DAYS', 30))),
+        REVOCATION_REFRESH_INTERVAL=float(os.getenv('REVOCATION_REFRESH_INTERVAL', 5)),
+        REVOCATION_LOAD_ATTEMPTS=int(os.getenv('REVOCATION_LOAD_ATTEMPTS', 3)),
+        RATELIMITS={
+            'auth': {'client': (5, 20), 'username': (0.2, 5)},
+        },
+        RATELIMIT_STORAGE_URL=os.getenv('RATELIMIT_STORAGE_URL'),
+        COMPRESS_LEVELS={
+            'gzip': int(os.getenv('COMPRESS_LEVEL_GZIP', 6)),
+            'br': int(os.getenv('COMPRESS_LEVEL_BR', 4)),
+            'zstd': int(os.getenv('COMPRESS_LEVEL_ZSTD', 3)),
+        },
+        COMPRESS_MIN_SIZE=int(os.getenv('COMPRESS_MIN_SIZE', 1024)),
+        POST_GROUP_COMMIT=os.getenv('POST_GROUP_COMMIT', '').lower() in ('1', 'true', 'yes'),
+        POST_GROUP_COMMIT_WINDOW_MS=float(os.getenv('POST_GROUP_COMMIT_WINDOW_MS', 5)),
+        POST_ARCHIVE_PATH=os.getenv('POST_ARCHIVE_PATH'),
+        ANALYTICS_CACHE_MAX_BYTES=int(os.getenv('ANALYTICS_CACHE_MAX_BYTES', 64 * 2 ** 20)),
+        ANALYTICS_PRELOAD=os.getenv('ANALYTICS_PRELOAD', '').lower() in ('1', 'true', 'yes'),
+        RAW_SQLITE_READS=os.getenv('RAW_SQLITE_READS', 'true').lower() in ('1', 'true', 'yes'),
+        RAW_SQLITE_POOL_SIZE=int(os.getenv('RAW_SQLITE_POOL_SIZE', 8)),
+        PROFILING=os.getenv('PROFILING', '').lower() in ('1', 'true', 'yes'),
+        PROFILE_SAMPLE_RATE=int(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+        PROFILE_ENDPOINTS=[name for name in os.getenv('PROFILE_ENDPOINTS', '').split(',') if name],
+        PROFILE_HEADER=os.getenv('PROFILE_HEADER', 'X-Profile'),
+        PROFILE_MAX_FILES=int(os.getenv('PROFILE_MAX_FILES', 200)),
+        JOB_WORKERS=int(os.getenv('JOB_WORKERS', 2)),
+        JOB_MAX_ATTEMPTS=int(os.getenv('JOB_MAX_ATTEMPTS', 3)),
+        JOB_RETRY_BACKOFF=float(os.getenv('JOB_RETRY_BACKOFF', 5.0)),
+        JOB_LEASE=float(os.getenv('JOB_LEASE', 300.0)),
+        DELETE_BATCH_SIZE=int(os.getenv('DELETE_BATCH_SIZE', 500)),
+        ROLE_VERSION_CHECK_INTERVAL=float(os.getenv('ROLE_VERSION_CHECK_INTERVAL', 5.0)),
+        SINGLE_FLIGHT_TIMEOUT=float(os.getenv('SINGLE_FLIGHT_TIMEOUT', 5.0)),
+        POST_SHARDS=[url for url in os.getenv('POST_SHARDS', '').split(',') if url],
+        POST_ID_BLOCKS=int(os.getenv('POST_ID_BLOCKS', 100)),
+        POST_SHARD_EVENTS_INTERVAL=float(os.getenv('POST_SHARD_EVENTS_INTERVAL', 1.0)),
+        ADMISSION_LIMITS={
+            'user': {'limit': 8, 'queue': 32, 'timeout': 2.0},
+            'post': {'limit': 8, 'queue': 32, 'timeout': 2.0},
+            'role': {'limit': 4, 'queue': 16, 'timeout': 1.0},
+            'auth': {'limit': 8, 'queue': 32, 'timeout': 2.0},
+        },
     )
 
     if test_config is None:
@@ -56,16 +124,41 @@ def create_app(test_config=None):
             app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
 
     app.cli.add_command(init_db_command)
+    app.cli.add_command(post_stats.reconcile_post_stats_command)
+    app.cli.add_command(post_summary.rebuild_summaries_command)
+    app.cli.add_command(archive.archive_posts_command)
+    app.cli.add_command(sharding.reshard_posts_command)
+    app.cli.add_command(startup.startup_profile_command)
+    app.cli.add_command(profiling.profiles_command)
+    app.cli.add_command(backfill.backfill_command)
+    app.cli.add_command(jobs.jobs_command)
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    app.cli.add_command(LazyMigrateGroup(app))
+    sharding.init_app(app)
+    # Attaches the archive database, so it must run before anything opens a connection.
+    archive.init_app(app)
+    raw_db.init_app(app)
+    statements.init_app(app)
+    roles.init_app(app)
     jwt.init_app(app)
-
-    from src.controllers import user, post, role, auth
+    # Registered first so that it runs after every other after_request hook.
+    compression.init_app(app)
+    revocation.init_app(app, jwt)
+    ratelimit.init_app(app)
+    admission.init_app(app)
+    group_commit.init_app(app)
+    analytics.init_app(app)
+    profiling.init_app(app)
+    singleflight.init_app(app)
+    jobs.init_app(app)
+    shard_events.init_app(app)
+    forking.init_app(app)
 
     app.register_blueprint(user.app)
     app.register_blueprint(post.app)
     app.register_blueprint(role.app)
     app.register_blueprint(auth.app)
+    app.register_blueprint(job.app)
 
     return app
\ No newline at end of file
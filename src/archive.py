@@ -0,0 +1,191 @@
+import os
+import time
+from datetime import timedelta
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import with_appcontext
+
+from src.models import db, Post
+from src.utils import utcnow
+from src import analytics
+
+SCHEMA = "archive"
+
+archive_metadata = sa.MetaData(schema=SCHEMA)
+
+# Same columns as Post, without the foreign key: the user table lives in the main database.
+archive_post = sa.Table(
+    "post",
+    archive_metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("title", sa.String, nullable=False),
+    sa.Column("body", sa.String, nullable=False),
+    sa.Column("created", sa.DateTime),
+    sa.Column("author_id", sa.Integer, nullable=False),
+    sa.Index("ix_archive_post_created", "created"),
+    sa.Index("ix_archive_post_author_id", "author_id"),
+)
+
+COLUMNS = ("id", "title", "body", "created", "author_id")
+
+
+def enabled():
+    return bool(current_app.config.get("POST_ARCHIVE_PATH"))
+
+
+def tables():
+    """
+    Return the archive post table in a list, or an empty list when the archive is disabled.
+    """
+    return [archive_post] if enabled() else []
+
+
+def get_archived_post(post_id):
+    """
+    Return an archived post as a dictionary, or None if it is not in the archive.
+    """
+    if not enabled():
+        return None
+    row = db.session.execute(sa.select(archive_post).where(archive_post.c.id == post_id)).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def get_archived_posts(post_ids):
+    """
+    Return the archived posts among ``post_ids``, keyed by ID.
+    """
+    if not enabled() or not post_ids:
+        return {}
+    rows = db.session.execute(sa.select(archive_post).where(archive_post.c.id.in_(post_ids))).mappings()
+    return {row["id"]: dict(row) for row in rows}
+
+
+def list_archived_posts():
+    """
+    Return every archived post as a dictionary, oldest first.
+    """
+    if not enabled():
+        return []
+    rows = db.session.execute(sa.select(archive_post).order_by(archive_post.c.id)).mappings()
+    return [dict(row) for row in rows]
+
+
+def delete_archived_posts_by_author(author_id):
+    """
+    Delete the archived posts of an author. The caller is responsible for committing.
+
+    Returns:
+        list: The deleted posts, as dictionaries.
+    """
+    if not enabled():
+        return []
+    rows = db.session.execute(
+        sa.delete(archive_post).where(archive_post.c.author_id == author_id).returning(*archive_post.c)).mappings()
+    return [dict(row) for row in rows]
+
+
+def archive_posts(older_than, batch_size=1000, pause=0.0):
+    """
+    Move the posts created before ``now - older_than`` to the archive database.
+
+    Each batch is copied and deleted in its own short transaction, so writers are
+    only blocked for one batch at a time. The post table uses AUTOINCREMENT, and
+    its sequence is raised to the highest archived ID as well, in case posts were
+    archived before the table had it, so an archived ID is never handed out again.
+    Each batch marks the cached analytics as stale, since the archived posts leave
+    the post table they are computed from.
+
+    Args:
+        older_than (timedelta): The minimum age of the posts to archive.
+        batch_size (int): The number of posts moved per transaction.
+        pause (float): Seconds to sleep between batches.
+
+    Returns:
+        int: The number of posts archived.
+    """
+    cutoff = utcnow() - older_than
+    post = Post.__table__
+    moved = 0
+    while True:
+        ids = db.session.execute(
+            sa.select(post.c.id)
+            .where(post.c.created < cutoff)
+            .order_by(post.c.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return moved
+
+        db.session.execute(archive_post.insert().from_select(
+            COLUMNS, sa.select(*(post.c[name] for name in COLUMNS)).where(post.c.id.in_(ids))))
+        db.session.execute(sa.delete(post).where(post.c.id.in_(ids)))
+        _raise_sequence(max(ids))
+        analytics.mark_stale()
+        db.session.commit()
+        moved += len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def _raise_sequence(post_id):
+    # sqlite_sequence only has a row for the post table once a post was inserted.
+    raised = db.session.execute(
+        sa.text("UPDATE sqlite_sequence SET seq = max(seq, :id) WHERE name = 'post'"), {"id": post_id})
+    if raised.rowcount == 0:
+        db.session.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('post', :id)"), {"id": post_id})
+
+
+def _parse_age(value):
+    units = {"d": "days", "h": "hours", "w": "weeks"}
+    try:
+        return timedelta(**{units[value[-1]]: int(value[:-1])})
+    except (KeyError, ValueError, IndexError):
+        raise click.BadParameter("use a number followed by h, d or w, e.g. 90d")
+
+
+@click.command('archive-posts')
+@click.option('--older-than', required=True, help='Minimum age of the posts to archive, e.g. 90d, 12w or 48h.')
+@click.option('--batch-size', default=1000, show_default=True, help='Posts moved per transaction.')
+@click.option('--pause', default=0.0, show_default=True, help='Seconds to sleep between batches.')
+@with_appcontext
+def archive_posts_command(older_than, batch_size, pause):
+    """
+    Move old posts into the archive database.
+    """
+    if not enabled():
+        raise click.UsageError("POST_ARCHIVE_PATH is not configured.")
+    moved = archive_posts(_parse_age(older_than), batch_size=batch_size, pause=pause)
+    click.echo(f"Archived {moved} post(s).")
+
+
+def init_app(app):
+    """
+    Attach the archive database to every connection when ``POST_ARCHIVE_PATH`` is set,
+    and create its post table if needed.
+
+    Must be called before the first database connection is opened.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    path = app.config.get("POST_ARCHIVE_PATH")
+    if not path:
+        return
+    if not os.path.isabs(path):
+        path = os.path.join(app.instance_path, path)
+        os.makedirs(app.instance_path, exist_ok=True)
+
+    with app.app_context():
+        engine = db.engine
+
+        @sa.event.listens_for(engine, "connect")
+        def attach_archive(dbapi_connection, connection_record):
+            dbapi_connection.execute(f"ATTACH DATABASE ? AS {SCHEMA}", (path,))
+
+        with engine.begin() as connection:
+            archive_metadata.create_all(connection)
+            # Archives created before an index was added only get it here.
+            for index in archive_post.indexes:
+                index.create(connection, checkfirst=True)
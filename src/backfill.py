@@ -0,0 +1,295 @@
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.models import db, User, BackfillCheckpoint
+from src.post_stats import post_count_expression, latest_post_expression
+from src.utils import utcnow
+
+BackfillResult = namedtuple("BackfillResult", ["rows", "batches", "finished"])
+
+checkpoint_table = BackfillCheckpoint.__table__
+
+
+@contextmanager
+def _transaction(bind):
+    if isinstance(bind, sa.engine.Engine):
+        with bind.begin() as connection:
+            yield connection
+    else:
+        # A connection owned by the caller in autocommit mode, e.g. Alembic's inside an
+        # autocommit block, where each statement would otherwise commit on its own.
+        bind.exec_driver_sql("BEGIN")
+        try:
+            yield bind
+        except BaseException:
+            bind.exec_driver_sql("ROLLBACK")
+            raise
+        bind.exec_driver_sql("COMMIT")
+
+
+class Backfill:
+    """
+    A resumable UPDATE of one table, run in small batches ordered by an integer key.
+
+    Each batch selects the next ``batch_size`` keys after the checkpoint, updates
+    those rows and moves the checkpoint forward in the same transaction, so the
+    database is only locked for one batch at a time and an interrupted run resumes
+    where it stopped. ``where`` should select the rows that still need the update,
+    which keeps a batch idempotent if it is ever applied twice.
+
+    Attributes:
+        name (str): Identifies the backfill and its checkpoint.
+        table (Table): The table to update. A lightweight ``sa.table()`` is enough,
+            which is what Alembic revisions should use.
+        values (dict or callable): Column name to the new value or SQL expression,
+            or a function returning that mapping, called when the backfill runs.
+        where (ColumnElement): Optional predicate of the rows to update.
+        key (str): The integer key column the batches are ordered by.
+        batch_size (int): The number of rows updated per transaction.
+        pause (float): Seconds to sleep between batches.
+        description (str): A short description, shown by ``flask backfill list``.
+    """
+
+    def __init__(self, name, table, values, where=None, key="id", batch_size=1000, pause=0.0, description=""):
+        self.name = name
+        self.table = table
+        self.values = values
+        self.where = where
+        self.key = table.c[key]
+        self.batch_size = batch_size
+        self.pause = pause
+        self.description = description
+
+    def resolve_values(self):
+        """
+        Return the column values of the update.
+        """
+        return self.values() if callable(self.values) else self.values
+
+    def checkpoint(self, bind):
+        """
+        Return the checkpoint row of the backfill, or None if it never ran.
+        """
+        with _transaction(bind) as connection:
+            return connection.execute(
+                sa.select(checkpoint_table).where(checkpoint_table.c.name == self.name)).first()
+
+    def reset(self, bind):
+        """
+        Forget the checkpoint, so the next run starts from the first row.
+        """
+        with _transaction(bind) as connection:
+            connection.execute(sa.delete(checkpoint_table).where(checkpoint_table.c.name == self.name))
+
+    def run(self, bind, batch_size=None, pause=None, max_batches=None, restart=False, progress=None):
+        """
+        Update the remaining rows, one committed batch at a time.
+
+        Args:
+            bind (Engine or Connection): Every batch runs in its own transaction,
+                begun on the engine, or with an explicit ``BEGIN`` on a connection,
+                which must then be in autocommit mode.
+            batch_size (int, optional): Overrides the backfill's batch size.
+            pause (float, optional): Overrides the pause between batches.
+            max_batches (int, optional): Stop after this many batches.
+            restart (bool): Ignore the checkpoint and start from the first row.
+            progress (callable, optional): Called with ``(last_key, rows)`` after
+                every batch.
+
+        Returns:
+            BackfillResult: The rows updated and batches run by this call, and
+            whether the backfill is complete.
+        """
+        batch_size = batch_size or self.batch_size
+        pause = self.pause if pause is None else pause
+        if restart:
+            self.reset(bind)
+        checkpoint = self.checkpoint(bind)
+        if checkpoint is not None and checkpoint.finished_at is not None:
+            return BackfillResult(0, 0, True)
+
+        last_key = checkpoint.last_key if checkpoint is not None else None
+        rows = batches = 0
+        while max_batches is None or batches < max_batches:
+            with _transaction(bind) as connection:
+                keys = connection.execute(self._next_keys(last_key, batch_size)).scalars().all()
+                if not keys:
+                    self._save(connection, last_key, 0, finished=True)
+                    return BackfillResult(rows, batches, True)
+                query = sa.update(self.table).where(self.key.in_(keys)).values(self.resolve_values())
+                if self.where is not None:
+                    query = query.where(self.where)
+                updated = connection.execute(query).rowcount
+                self._save(connection, keys[-1], updated)
+
+            last_key = keys[-1]
+            rows += updated
+            batches += 1
+            if progress is not None:
+                progress(last_key, rows)
+            if pause:
+                time.sleep(pause)
+        return BackfillResult(rows, batches, False)
+
+    def _next_keys(self, last_key, batch_size):
+        query = sa.select(self.key).order_by(self.key).limit(batch_size)
+        if last_key is not None:
+            query = query.where(self.key > last_key)
+        if self.where is not None:
+            query = query.where(self.where)
+        return query
+
+    def _save(self, connection, last_key, rows, finished=False):
+        now = utcnow()
+        stmt = sqlite_insert(checkpoint_table).values(
+            name=self.name, last_key=last_key, rows=rows, updated_at=now,
+            finished_at=now if finished else None,
+        )
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[checkpoint_table.c.name],
+            set_={
+                "last_key": stmt.excluded.last_key,
+                "rows": checkpoint_table.c.rows + stmt.excluded.rows,
+                "updated_at": stmt.excluded.updated_at,
+                "finished_at": stmt.excluded.finished_at,
+            },
+        ))
+
+
+BACKFILLS = {}
+
+
+def register(backfill):
+    """
+    Make a backfill available to ``flask backfill``.
+
+    Returns:
+        Backfill: The backfill, so this can be used on an assignment.
+    """
+    BACKFILLS[backfill.name] = backfill
+    return backfill
+
+
+def run_in_migration(backfill, **options):
+    """
+    Run a backfill from an Alembic revision, committing after every batch.
+
+    Add the column as nullable with ``op.add_column`` (instant on SQLite, unlike
+    ``batch_alter_table``, which copies the table), then call this to fill it::
+
+        user = sa.table('user', sa.column('id'), sa.column('excerpt'))
+        run_in_migration(Backfill('user-excerpt', user, {'excerpt': ''},
+                                  where=user.c.excerpt.is_(None)))
+
+    The batches run inside an autocommit block, so the migration's own transaction
+    is committed first. In offline (``--sql``) mode a single UPDATE is emitted.
+
+    Args:
+        backfill (Backfill): The backfill to run.
+        **options: Passed to ``Backfill.run``.
+
+    Returns:
+        BackfillResult: The result of the run, or None in offline mode.
+    """
+    from alembic import op
+
+    context = op.get_context()
+    if context.as_sql:
+        query = sa.update(backfill.table).values(backfill.resolve_values())
+        if backfill.where is not None:
+            query = query.where(backfill.where)
+        op.execute(query)
+        return None
+    with context.autocommit_block():
+        return backfill.run(op.get_bind(), **options)
+
+
+_user = User.__table__
+
+
+def _user_post_stats():
+    # Built when the backfill runs, since the tables holding posts depend on the
+    # archive configured for the app.
+    if current_app.extensions.get("post_shards") is not None:
+        # The shards are separate databases that a single UPDATE cannot read.
+        raise click.UsageError("POST_SHARDS is configured; run 'flask reconcile-post-stats' instead.")
+    return {
+        "post_count": post_count_expression(_user.c.id),
+        "last_post_at": latest_post_expression(_user.c.id),
+    }
+
+
+register(Backfill(
+    "user-post-stats",
+    _user,
+    _user_post_stats,
+    description="Recompute post_count and last_post_at from the post tables.",
+))
+
+
+@click.group('backfill')
+def backfill_command():
+    """
+    Run batched, resumable data backfills.
+    """
+
+
+@backfill_command.command('list')
+@with_appcontext
+def backfill_list_command():
+    """
+    List the registered backfills and their progress.
+    """
+    for name, backfill in sorted(BACKFILLS.items()):
+        checkpoint = backfill.checkpoint(db.engine)
+        if checkpoint is None:
+            status = "not started"
+        elif checkpoint.finished_at is not None:
+            status = f"finished at {checkpoint.finished_at:%Y-%m-%d %H:%M:%S}, {checkpoint.rows} row(s)"
+        else:
+            status = f"stopped after key {checkpoint.last_key}, {checkpoint.rows} row(s)"
+        click.echo(f"{name}: {status}")
+        if backfill.description:
+            click.echo(f"  {backfill.description}")
+
+
+@backfill_command.command('run')
+@click.argument('name')
+@click.option('--batch-size', type=int, help='Rows updated per transaction.')
+@click.option('--pause', type=float, help='Seconds to sleep between batches.')
+@click.option('--max-batches', type=int, help='Stop after this many batches; run again to resume.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and start from the first row.')
+@with_appcontext
+def backfill_run_command(name, batch_size, pause, max_batches, restart):
+    """
+    Run a backfill from its checkpoint.
+    """
+    backfill = BACKFILLS.get(name)
+    if backfill is None:
+        raise click.BadParameter(f"unknown backfill, use one of: {', '.join(sorted(BACKFILLS))}", param_hint="NAME")
+    result = backfill.run(
+        db.engine, batch_size=batch_size, pause=pause, max_batches=max_batches, restart=restart,
+        progress=lambda last_key, rows: click.echo(f"  up to key {last_key}: {rows} row(s)"),
+    )
+    state = "finished" if result.finished else "paused, run again to resume"
+    click.echo(f"Backfill {name}: {result.rows} row(s) in {result.batches} batch(es), {state}.")
+
+
+@backfill_command.command('reset')
+@click.argument('name')
+@with_appcontext
+def backfill_reset_command(name):
+    """
+    Forget the checkpoint of a backfill.
+    """
+    if name not in BACKFILLS:
+        raise click.BadParameter(f"unknown backfill, use one of: {', '.join(sorted(BACKFILLS))}", param_hint="NAME")
+    BACKFILLS[name].reset(db.engine)
+    click.echo(f"Backfill {name} will start from the first row.")
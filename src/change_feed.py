@@ -0,0 +1,230 @@
+import json
+import os
+import queue
+import threading
+
+import sqlalchemy as sa
+from flask import current_app
+
+from src.models import db, PostChange
+
+_CLOSED = object()
+
+
+def record_change(op, post_id, author_id):
+    """
+    Append an entry to the post change log. The caller is responsible for
+    committing the session, so the entry is written in the same transaction as
+    the change itself.
+
+    Args:
+        op (str): "create", "update" or "delete".
+        post_id (int): The ID of the post.
+        author_id (int): The ID of the post's author.
+    """
+    db.session.add(PostChange(op=op, post_id=post_id, author_id=int(author_id)))
+
+
+def change_to_dict(change):
+    """
+    Serialize a PostChange object into a dictionary.
+    """
+    return {
+        "seq": change.seq,
+        "post_id": change.post_id,
+        "op": change.op,
+        "author_id": change.author_id,
+        "changed_at": change.changed_at.isoformat(),
+    }
+
+
+def changes_since(since, limit):
+    """
+    Return up to ``limit`` changes with a sequence number above ``since``, oldest first.
+    """
+    query = sa.select(PostChange).where(PostChange.seq > since).order_by(PostChange.seq).limit(limit)
+    return [change_to_dict(change) for change in db.session.execute(query).scalars()]
+
+
+def last_seq():
+    return db.session.execute(sa.select(sa.func.coalesce(sa.func.max(PostChange.seq), 0))).scalar()
+
+
+class ChangeHub:
+    """
+    In-process pub/sub that fans the change log out to stream subscribers.
+
+    A single poller thread reads new changes from the database and copies them to
+    every subscriber's queue, so N subscribers cost one query per poll instead of N.
+    The poller only runs while there are subscribers, and local writes wake it up
+    immediately through notify(). Subscribers that fall ``max_queue`` events behind
+    are disconnected instead of slowing down the others.
+    """
+
+    def __init__(self, app, interval=1.0, max_queue=1000, batch=500):
+        self.app = app
+        self.interval = interval
+        self.max_queue = max_queue
+        self.batch = batch
+        self.last_seq = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def subscribe(self):
+        """
+        Register a subscriber. Must be called with an app context.
+
+        Returns:
+            Queue: Receives change dictionaries, or a closing marker on disconnect.
+        """
+        subscriber = queue.Queue(self.max_queue)
+        with self._lock:
+            if self.last_seq is None:
+                self.last_seq = last_seq()
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="post-change-hub", daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def notify(self):
+        self._wake.set()
+
+    def poll(self):
+        """
+        Read the changes committed since the last poll and publish them.
+
+        Returns:
+            int: The number of changes published.
+        """
+        with self.app.app_context():
+            try:
+                changes = changes_since(self.last_seq or 0, self.batch)
+            finally:
+                db.session.remove()
+        if not changes:
+            return 0
+
+        with self._lock:
+            self.last_seq = changes[-1]["seq"]
+            for subscriber in list(self._subscribers):
+                try:
+                    for change in changes:
+                        subscriber.put_nowait(change)
+                except queue.Full:
+                    self._subscribers.discard(subscriber)
+                    _close(subscriber)
+        return len(changes)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._lock:
+                if not self._subscribers:
+                    # Changes written while nobody listens are not published, so the
+                    # next subscribe starts from the head of the log again.
+                    self._thread = None
+                    self.last_seq = None
+                    return
+            try:
+                while self.poll() == self.batch:
+                    pass
+            except Exception:
+                self.app.logger.exception("Could not poll the post change log")
+
+
+def _close(subscriber):
+    try:
+        subscriber.put_nowait(_CLOSED)
+    except queue.Full:
+        subscriber.get_nowait()
+        subscriber.put_nowait(_CLOSED)
+
+
+_hub_lock = threading.Lock()
+
+
+def _reset_hub_lock():
+    global _hub_lock
+    _hub_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_hub_lock)
+
+
+def get_hub():
+    """
+    Return the change hub of the current app, creating it on first use.
+    """
+    app = current_app._get_current_object()
+    with _hub_lock:
+        if "post_change_hub" not in app.extensions:
+            app.extensions["post_change_hub"] = ChangeHub(
+                app, interval=app.config.get("CHANGE_FEED_POLL_INTERVAL", 1.0))
+    return app.extensions["post_change_hub"]
+
+
+def notify():
+    """
+    Wake up the change hub of the current app after a local write was committed.
+    """
+    hub = current_app.extensions.get("post_change_hub")
+    if hub is not None:
+        hub.notify()
+
+
+def stream(since, heartbeat=15.0):
+    """
+    Build a Server-Sent Events stream of the changes after ``since``. Must be called
+    with an app context; the returned generator does not need one.
+
+    The backlog is read from the database in pages, then live changes come from the
+    hub. The subscription starts before the backlog is read, and events are
+    deduplicated by sequence number, so no change is lost in between. Each event
+    carries its sequence number as ``id``, so clients can resume with the
+    Last-Event-ID header.
+    """
+    app = current_app._get_current_object()
+    hub = get_hub()
+    subscriber = hub.subscribe()
+
+    def generate():
+        sent = since
+        try:
+            while True:
+                with app.app_context():
+                    try:
+                        backlog = changes_since(sent, hub.batch)
+                    finally:
+                        db.session.remove()
+                for change in backlog:
+                    sent = change["seq"]
+                    yield _event(change)
+                if len(backlog) < hub.batch:
+                    break
+            while True:
+                try:
+                    change = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if change is _CLOSED:
+                    return
+                if change["seq"] > sent:
+                    sent = change["seq"]
+                    yield _event(change)
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return generate()
+
+
+def _event(change):
+    return f"id: {change['seq']}\nevent: {change['op']}\ndata: {json.dumps(change)}\n\n"
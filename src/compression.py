@@ -0,0 +1,166 @@
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/msgpack", "text/html", "text/plain", "text/event-stream"}
+
+
+class _Gzip:
+    DEFAULT_LEVEL = 6
+
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush_chunk(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    # Higher qualities cost far more CPU for a few percent, which does not pay off
+    # for responses compressed on every request.
+    DEFAULT_LEVEL = 4
+
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush_chunk(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class _Zstd:
+    DEFAULT_LEVEL = 3
+
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush_chunk(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encodings():
+    """
+    Return the supported encodings, most preferred first.
+    """
+    encodings = {}
+    if zstandard is not None:
+        encodings["zstd"] = _Zstd
+    if brotli is not None:
+        encodings["br"] = _Brotli
+    encodings["gzip"] = _Gzip
+    return encodings
+
+
+def choose_encoding(accept_encoding, encodings):
+    """
+    Pick the encoding to use from an Accept-Encoding header.
+
+    Among the encodings the client accepts with the highest q-value, the one listed
+    first in ``encodings`` wins.
+
+    Args:
+        accept_encoding (Accept): The parsed Accept-Encoding header.
+        encodings (dict): The supported encodings, most preferred first.
+
+    Returns:
+        str: The chosen encoding, or None to send the body uncompressed.
+    """
+    best, best_quality = None, 0
+    for name in encodings:
+        quality = accept_encoding[name]
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def _compress_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.compress(chunk) + compressor.flush_chunk()
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def init_app(app):
+    """
+    Compress responses according to the client's Accept-Encoding header.
+
+    Buffered responses are compressed when they reach ``COMPRESS_MIN_SIZE`` bytes.
+    Streamed responses are always compressed, chunk by chunk, with a flush after
+    each chunk so the client can decode data as it arrives. ``COMPRESS_LEVELS`` maps
+    an encoding (``"gzip"``, ``"br"`` or ``"zstd"``) to its level, since their scales
+    differ; encodings without an entry use their own default. brotli and zstd are
+    used when their packages are installed.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    if not app.config.get("COMPRESS_ENABLED", True):
+        return
+
+    encodings = available_encodings()
+    configured = app.config.get("COMPRESS_LEVELS") or {}
+    levels = {name: configured.get(name, cls.DEFAULT_LEVEL) for name, cls in encodings.items()}
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or request.method == "HEAD"
+        ):
+            return response
+
+        encoding = choose_encoding(request.accept_encodings, encodings)
+        if encoding is None:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encodings[encoding](levels[encoding]))
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < min_size:
+                # Most API responses end here, so the compressor is only built below.
+                return response
+            compressor = encodings[encoding](levels[encoding])
+            response.set_data(compressor.compress(body) + compressor.finish())
+        response.headers["Content-Encoding"] = encoding
+        return response
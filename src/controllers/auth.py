@@ -1,20 +1,64 @@
-from flask import Blueprint, request, jsonify
+import uuid
+from flask import Blueprint, request, jsonify, current_app
 from sqlalchemy import inspect
 from src.models.user import User, db
-from flask_jwt_extended import create_access_token
+from src.models.refresh_token import RefreshTokenFamily
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt, get_jwt_identity
 from http import HTTPStatus
+from src.passwords import check_password, dummy_password, make_password, needs_rehash, PasswordPoolSaturated
+from src.revocation import revoke_token, revoke_refresh_families
+from src.utils import utcnow
+from src import db as raw_db, statements
 
 app = Blueprint("auth", __name__, url_prefix="/auth")
 
 
+def _issue_refresh_token(user_id, family=None):
+    """
+    Create a refresh token and record it as the current token of its family.
+
+    A new family is started when none is given. The caller is responsible for
+    committing the session.
+
+    Args:
+        user_id (int): The ID of the user the token is issued to.
+        family (RefreshTokenFamily, optional): The family being rotated.
+
+    Returns:
+        str: The encoded refresh token.
+        RefreshTokenFamily: The family of the token.
+    """
+    jti = str(uuid.uuid4())
+    if family is None:
+        family = RefreshTokenFamily(id=str(uuid.uuid4()), user_id=user_id, revoked=False)
+        db.session.add(family)
+    family.current_jti = jti
+    family.expires_at = utcnow() + current_app.config["JWT_REFRESH_TOKEN_EXPIRES"]
+    token = create_refresh_token(identity=str(user_id), additional_claims={"jti": jti, "fam": family.id})
+    return token, family
+
+
+def _issue_access_token(user_id, family_id):
+    # The family is carried in the access token too, so logout can end the session.
+    return create_access_token(identity=str(user_id), additional_claims={"fam": family_id})
+
+
 @app.route('/login', methods=['POST'])
 def login():
     """
-    Handle user login and return a JWT access token.
+    Handle user login and return a JWT access token and a refresh token.
 
     This endpoint expects a JSON payload with 'username' and 'password'.
-    If the credentials are valid, it returns a JWT access token.
+    If the credentials are valid, it returns a JWT access token, and a refresh token
+    that can be exchanged at /auth/refresh for new access tokens.
     Otherwise, it returns an error message with HTTP status 401.
+    Password verification runs in a bounded pool; when the pool is saturated the
+    request is rejected with HTTP status 503 instead of waiting.
+    Legacy plaintext passwords, and hashes made with an outdated cost, are rehashed
+    on a successful login. The user is looked up through the raw sqlite3 fast path
+    when it is enabled. Unknown usernames are checked against a dummy hash, so they
+    take as long as a wrong password. Inactive users, such as users being deleted,
+    cannot log in.
 
     Returns:
         dict: A dictionary containing the access token or an error message.
@@ -22,11 +66,103 @@ def login():
     """
     username = request.json.get('username')
     password = request.json.get('password')
-    user = db.session.execute(db.select(User).where(User.username == username)).scalar()
+    reader = raw_db.get_reader()
+    if reader is not None:
+        user = reader.get_credentials(username)
+    else:
+        user = db.session.execute(statements.USER_BY_USERNAME, {"username": username}).scalar()
     
-    if not user or user.password != password:
+    if not isinstance(password, str):
         return {"error": "Invalid username or password"}, HTTPStatus.UNAUTHORIZED
+
+    try:
+        if not user or not user.active:
+            # Pay for the key derivation anyway, so unknown usernames, and users being
+            # deleted, cannot be told apart from wrong passwords by the response time.
+            check_password(dummy_password(), password)
+            return {"error": "Invalid username or password"}, HTTPStatus.UNAUTHORIZED
+        if not check_password(user.password, password):
+            return {"error": "Invalid username or password"}, HTTPStatus.UNAUTHORIZED
+        if needs_rehash(user.password):
+            db.session.execute(
+                db.update(User).where(User.id == user.id).values(password=make_password(password)))
+    except (PasswordPoolSaturated, TimeoutError):
+        return {"error": "Too many login attempts, try again later"}, HTTPStatus.SERVICE_UNAVAILABLE, {"Retry-After": "1"}
     
-    acess_token = create_access_token(identity=str(user.id))
+    refresh_token, family = _issue_refresh_token(user.id)
+    acess_token = _issue_access_token(user.id, family.id)
+    db.session.commit()
+
+    return {"access_token": acess_token, "refresh_token": refresh_token}, HTTPStatus.OK
+
+
+@app.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+
+    No password check is done, but the user must still exist and be active. Refresh
+    tokens are rotated: each one can be used once, and presenting an already rotated
+    token revokes its whole family, since it means the token was stolen or replayed.
 
-    return {"access_token": acess_token}, HTTPStatus.OK
\ No newline at end of file
+    Returns:
+        dict: A dictionary containing the new tokens or an error message.
+        HTTPStatus: The HTTP status code.
+    """
+    claims = get_jwt()
+    family = db.session.get(RefreshTokenFamily, claims.get("fam"))
+    if family is None or family.revoked:
+        return {"error": "Invalid refresh token"}, HTTPStatus.UNAUTHORIZED
+    user = db.session.get(User, family.user_id)
+    if user is None or not user.active:
+        return {"error": "Invalid refresh token"}, HTTPStatus.UNAUTHORIZED
+
+    # Rotate with a conditional update so two concurrent refreshes cannot both win.
+    new_jti = str(uuid.uuid4())
+    expires_at = utcnow() + current_app.config["JWT_REFRESH_TOKEN_EXPIRES"]
+    rotated = db.session.execute(
+        db.update(RefreshTokenFamily)
+        .where(RefreshTokenFamily.id == family.id)
+        .where(RefreshTokenFamily.current_jti == claims["jti"])
+        .where(RefreshTokenFamily.revoked.is_(False))
+        .values(current_jti=new_jti, expires_at=expires_at)
+    ).rowcount
+    if not rotated:
+        db.session.execute(
+            db.update(RefreshTokenFamily)
+            .where(RefreshTokenFamily.id == family.id)
+            .values(revoked=True)
+        )
+        db.session.commit()
+        return {"error": "Refresh token reuse detected"}, HTTPStatus.UNAUTHORIZED
+
+    db.session.commit()
+
+    user_id = get_jwt_identity()
+
+    acess_token = _issue_access_token(user_id, family.id)
+    refresh_token = create_refresh_token(identity=user_id, additional_claims={"jti": new_jti, "fam": family.id})
+    return {"access_token": acess_token, "refresh_token": refresh_token}, HTTPStatus.OK
+
+
+@app.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    """
+    Revoke the access token used to call this endpoint, and end its login session.
+
+    The token is added to the revocation table and to the in-memory blocklist,
+    so it is rejected by every protected endpoint from now on. The refresh token
+    family it was issued with is revoked too; tokens issued before access tokens
+    named their family revoke every family of the user.
+
+    Returns:
+        dict: A message indicating the token was revoked.
+        HTTPStatus: The HTTP status code.
+    """
+    claims = get_jwt()
+    revoke_token(claims)
+    revoke_refresh_families(int(claims["sub"]), claims.get("fam"))
+    db.session.commit()
+    return {"msg": "Token revoked"}, HTTPStatus.OK
@@ -0,0 +1,77 @@
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required
+from src.models import db, Job
+from src import statements, jobs
+from src.jobs import job_to_dict
+from src.utils import requires_roles
+from http import HTTPStatus
+
+app = Blueprint("job", __name__, url_prefix="/jobs")
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+JOB_LIST_LIMIT = 100
+
+@app.route('/<int:job_id>', methods=['GET'])
+@jwt_required()
+@requires_roles("admin")
+def get_job(job_id):
+    """
+    Retrieve the status of a background job by job ID.
+
+    This endpoint returns the status of a job queued by a request that answered 202,
+    such as the deletion of a user. While the job waits or runs, its status is "queued"
+    or "running"; it ends as "succeeded", with the handler's result, or "failed", with
+    the error of the last attempt. Like the job list, it is restricted to admins.
+
+    Args:
+        job_id (int): The ID of the job.
+
+    Returns:
+        dict: The ID, kind, status, attempts, timestamps, error and result of the job.
+        HTTPStatus: The HTTP status code indicating the result of the operation.
+    """
+    job = statements.get_or_404(Job, job_id)
+    return job_to_dict(job), HTTPStatus.OK
+
+@app.route('/', methods=['GET'])
+@jwt_required()
+@requires_roles("admin")
+def list_jobs():
+    """
+    List background jobs, newest first, optionally filtered by status.
+
+    Use ``?status=failed`` to find the jobs that failed for good, e.g. user deletions
+    that need attention; they can be queued again at ``POST /jobs/<id>/retry``.
+
+    Returns:
+        dict: The jobs, or an error message.
+        HTTPStatus: The HTTP status code indicating the result of the operation.
+    """
+    status = request.args.get("status")
+    query = db.select(Job).order_by(Job.id.desc()).limit(JOB_LIST_LIMIT)
+    if status is not None:
+        if status not in JOB_STATUSES:
+            return {"error": f"status must be one of {', '.join(JOB_STATUSES)}"}, HTTPStatus.BAD_REQUEST
+        query = query.where(Job.status == status)
+    return {"jobs": [job_to_dict(job) for job in db.session.execute(query).scalars()]}, HTTPStatus.OK
+
+@app.route('/<int:job_id>/retry', methods=['POST'])
+@jwt_required()
+@requires_roles("admin")
+def retry_job(job_id):
+    """
+    Queue a failed job again, with a fresh set of attempts.
+
+    Args:
+        job_id (int): The ID of the job.
+
+    Returns:
+        dict: The queued job, or an error message.
+        HTTPStatus: 202 Accepted, or 409 Conflict if the job has not failed.
+    """
+    job = statements.get_or_404(Job, job_id)
+    if not jobs.retry(job.id):
+        return {"error": "Only failed jobs can be retried"}, HTTPStatus.CONFLICT
+    db.session.commit()
+    db.session.refresh(job)
+    return jobs.accepted(job)
@@ -1,6 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models import db, Post
+from src.utils import parse_id_list
+from src.post_stats import record_post_created, record_post_deleted
+from src.post_summary import record_summary, summary_stats, body_bytes
+from src import analytics, change_feed, archive, sharding, shard_events, statements, singleflight, jobs, db as raw_db
+from datetime import datetime, date
 from http import HTTPStatus
 from sqlalchemy import inspect
 
@@ -8,6 +13,25 @@ from sqlalchemy import inspect
 app = Blueprint("post", __name__, url_prefix="/posts")
 
 
+def _post_to_dict(post):
+    """
+    Serialize a Post object into a dictionary.
+
+    Args:
+        post (Post): The post to serialize.
+
+    Returns:
+        dict: A dictionary containing the ID, title, body, created, and author_id of the post.
+    """
+    return {
+        "id": post.id,
+        "title": post.title,
+        "body": post.body,
+        "created": post.created,
+        "author_id": post.author_id,
+    }
+
+
 @app.route('/', methods=['POST'])
 @jwt_required()
 def _create_post():
@@ -15,47 +39,100 @@ def _create_post():
     Create a new post and add it to the database.
     
     This function retrieves the JSON data from the request, creates a new Post object,
-    adds it to the database session, and commits the session.
+    adds it to the database session, and commits the session. When group commit is
+    enabled, the post is handed to the writer thread and committed together with
+    other concurrent posts instead. If the writer does not confirm the post within
+    ``POST_GROUP_COMMIT_TIMEOUT`` seconds, 503 is returned, but the post stays queued
+    and may still be created, so clients should check before posting it again. When
+    sharding is enabled, the post is committed in the shard of its author only; the
+    counters, the summary and the change log follow once its event is applied.
     
     Returns:
         dict: A dictionary containing the ID, title, body, created, and author_id of the newly created post.
     """
-    user_id = get_jwt_identity()
+    # Identities are strings in the token; flights and counters key users by int.
+    user_id = int(get_jwt_identity())
     data = request.json
+    router = sharding.get_router()
+    if router is not None:
+        post = router.create(data["title"], data["body"], user_id)
+        shard_events.notify()
+        return jsonify(post), HTTPStatus.CREATED
+
+    writer = current_app.extensions.get("post_writer")
+    if writer is not None:
+        try:
+            post = writer.submit(data["title"], data["body"], user_id).result(
+                timeout=current_app.config.get("POST_GROUP_COMMIT_TIMEOUT", 10))
+        except TimeoutError:
+            # The post is still queued and may be committed after this response.
+            return ({"error": "Post not confirmed in time, it may still be created"},
+                    HTTPStatus.SERVICE_UNAVAILABLE, {"Retry-After": "1"})
+        singleflight.forget(("user", post["author_id"]))
+        return jsonify(post), HTTPStatus.CREATED
+
     post = Post(title=data["title"], body=data["body"], author_id=user_id)
     db.session.add(post)
+    db.session.flush()
+    record_post_created(post.author_id, post.created)
+    record_summary([(post.created, post.author_id, 1, body_bytes(post.body))])
+    change_feed.record_change("create", post.id, post.author_id)
     db.session.commit()
-    return jsonify({
-        "id": post.id,
-        "title": post.title,
-        "body": post.body,
-        "created": post.created,
-        "author_id": post.author_id,
-    }), HTTPStatus.CREATED
+    singleflight.forget(("user", post.author_id))
+    change_feed.notify()
+    return jsonify(_post_to_dict(post)), HTTPStatus.CREATED
 
 
-def _list_posts():
+def _list_posts(include_archived=False):
     """
     Retrieve a list of all posts from the database.
     
     This function executes a SELECT query on the Post table and returns a list of dictionaries,
-    each containing the ID, title, body, created, and author_id of a post.
+    each containing the ID, title, body, created, and author_id of a post. Archived posts
+    are only read when ``include_archived`` is set, and then come first, since they are
+    the oldest. When sharding is enabled, the shards are queried in parallel and their
+    posts are merged with those of the post table in ``(created, id)`` order.
+    
+    Args:
+        include_archived (bool): Also return the posts of the archive database.
     
     Returns:
         list: A list of dictionaries, each representing a post.
     """
+    archived = archive.list_archived_posts() if include_archived else []
+    router = sharding.get_router()
+    if router is not None:
+        return archived + router.list_posts()
     query = db.select(Post)
     posts = db.session.execute(query).scalars()
-    return [
-        {
-            "id": post.id,
-            "title": post.title,
-            "body": post.body,
-            "created": post.created,
-            "author_id": post.author_id,
-        }
-        for post in posts
-    ]
+    return archived + [_post_to_dict(post) for post in posts]
+
+
+def _get_posts_by_ids(post_ids):
+    """
+    Retrieve several posts by ID with a single query.
+
+    The posts are fetched with one ``IN`` query and returned in the order the IDs
+    were requested. IDs that are not in the post table are looked up in the archive,
+    and IDs that do not match any post are reported separately.
+
+    Args:
+        post_ids (list): The IDs of the posts to retrieve.
+
+    Returns:
+        list: A list of dictionaries, each representing a post.
+        list: The requested IDs that were not found.
+    """
+    router = sharding.get_router()
+    if router is not None:
+        found = router.get_many(post_ids)
+    else:
+        query = db.select(Post).where(Post.id.in_(post_ids))
+        found = {post.id: _post_to_dict(post) for post in db.session.execute(query).scalars()}
+    found.update(archive.get_archived_posts([post_id for post_id in post_ids if post_id not in found]))
+    posts = [found[post_id] for post_id in post_ids if post_id in found]
+    missing = [post_id for post_id in post_ids if post_id not in found]
+    return posts, missing
 
 
 @app.route('/', methods=['GET', 'POST'])
@@ -65,6 +142,9 @@ def list_or_create_post():
     
     If the request method is POST, a new post is created using the _create_post function.
     If the request method is GET, a list of all posts is returned using the _list_posts function.
+    When the ``ids`` query parameter is given (e.g. ``?ids=1,2,3``), only those posts are
+    returned, in the requested order, together with the IDs that were not found. The
+    listing leaves out archived posts unless ``?archived=true`` is given.
     
     Returns:
         dict: A dictionary containing a message if a new post is created, or a list of posts.
@@ -73,18 +153,126 @@ def list_or_create_post():
     if request.method == 'POST':
         post = _create_post()
         return jsonify(post), HTTPStatus.CREATED
+    elif "ids" in request.args:
+        try:
+            post_ids = parse_id_list(request.args["ids"], current_app.config.get("MULTI_GET_MAX_IDS", 100))
+        except ValueError as e:
+            return {"message": str(e)}, HTTPStatus.BAD_REQUEST
+        posts, missing = _get_posts_by_ids(post_ids)
+        return jsonify({"posts": posts, "missing": missing}), HTTPStatus.OK
     else:
-        posts = _list_posts()
+        posts = _list_posts(request.args.get("archived", "").lower() in ("1", "true", "yes"))
         return jsonify({"posts": posts}), HTTPStatus.OK
 
 
+@app.route('/analytics', methods=['GET'])
+def post_analytics():
+    """
+    Return post activity analytics over an optional time range.
+    
+    Query parameters ``from`` and ``to`` are ISO 8601 UTC datetimes (``to`` is exclusive),
+    and ``bucket`` is one of hour, day or week (default day). The response contains
+    counts per time bucket, counts and total body length per author, and percentile
+    stats of body length. Columns are pulled in bulk and aggregated as arrays, and
+    the columns of recent ranges are cached and extended with new posts only. When
+    sharding is enabled, the shards are read in parallel on every request instead.
+    
+    Returns:
+        dict: The analytics for the requested range.
+        int: The HTTP status code.
+    """
+    bucket = request.args.get("bucket", "day")
+    if bucket not in analytics.BUCKET_SECONDS:
+        return {"message": "'bucket' must be one of hour, day, week"}, HTTPStatus.BAD_REQUEST
+    try:
+        start, end = (
+            datetime.fromisoformat(request.args[name]) if name in request.args else None
+            for name in ("from", "to")
+        )
+    except ValueError:
+        return {"message": "'from' and 'to' must be ISO 8601 datetimes"}, HTTPStatus.BAD_REQUEST
+    return analytics.post_analytics(start, end, bucket), HTTPStatus.OK
+
+
+@app.route('/stats', methods=['GET'])
+def post_stats():
+    """
+    Return post counts and sizes per day and per author from the daily summary table.
+    
+    Query parameters ``from`` and ``to`` are inclusive ISO dates (YYYY-MM-DD), and
+    ``author_id`` optionally restricts the stats to one author. Only summary rows are
+    read, never the post table.
+    
+    Returns:
+        dict: Totals per day, per author and for the whole range.
+        int: The HTTP status code.
+    """
+    try:
+        start, end = (
+            date.fromisoformat(request.args[name]) if name in request.args else None
+            for name in ("from", "to")
+        )
+    except ValueError:
+        return {"message": "'from' and 'to' must be ISO dates (YYYY-MM-DD)"}, HTTPStatus.BAD_REQUEST
+    try:
+        author_id = int(request.args["author_id"]) if "author_id" in request.args else None
+    except ValueError:
+        return {"message": "'author_id' must be an integer"}, HTTPStatus.BAD_REQUEST
+    return summary_stats(start, end, author_id), HTTPStatus.OK
+
+
+@app.route('/changes', methods=['GET'])
+def list_changes():
+    """
+    Return a batch of entries of the post change log after a cursor.
+    
+    Query parameters: ``since`` is the last sequence number already seen (default 0)
+    and ``limit`` the maximum batch size (default 100, at most 1000). Clients poll
+    again with ``since`` set to the returned ``next`` value.
+    
+    Returns:
+        dict: The changes, oldest first, and the cursor to use next.
+        int: The HTTP status code.
+    """
+    since = request.args.get("since", 0, type=int)
+    limit = min(request.args.get("limit", 100, type=int), 1000)
+    changes = change_feed.changes_since(since, limit)
+    return {"changes": changes, "next": changes[-1]["seq"] if changes else since}, HTTPStatus.OK
+
+
+@app.route('/changes/stream', methods=['GET'])
+def stream_changes():
+    """
+    Stream the post change log as Server-Sent Events.
+    
+    The stream starts after the ``since`` query parameter, or after the
+    Last-Event-ID header when a client reconnects. All subscribers of a process
+    share a single database poller.
+    
+    Returns:
+        Response: A text/event-stream response.
+    """
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", 0, type=int)
+    return Response(
+        change_feed.stream(since, current_app.config.get("CHANGE_FEED_HEARTBEAT", 15.0)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route('/<int:post_id>', methods=['GET'])
 def get_post(post_id):
     """
     Retrieve the details of a specific post by post ID.
     
     This function retrieves a post from the database using the post ID and returns a dictionary
-    containing the post's ID, title, body, created, and author_id.
+    containing the post's ID, title, body, created, and author_id. Posts that are not in the
+    post table are looked up in the archive database, if one is configured. When sharding
+    is enabled, the post is read from the shard encoded in its ID. Otherwise the raw
+    sqlite3 fast path is tried first, when it is enabled. Concurrent requests for the
+    same post share one lookup.
     
     Args:
         post_id (int): The ID of the post to retrieve.
@@ -92,14 +280,26 @@ def get_post(post_id):
     Returns:
         dict: A dictionary containing the ID, title, body, created, and author_id of the post.
     """
-    post = db.get_or_404(Post, post_id)
-    return {
-        "id": post.id,
-        "title": post.title,
-        "body": post.body,
-        "created": post.created,
-        "author_id": post.author_id,
-    }
+    return singleflight.do(("post", post_id), lambda: _load_post(post_id))
+
+
+def _load_post(post_id):
+    router = sharding.get_router()
+    if router is not None:
+        post = router.get(post_id)
+        if post is not None:
+            return post
+    else:
+        post = raw_db.get_post(post_id)
+        if post is not None:
+            return post
+        post = db.session.get(Post, post_id)
+        if post is not None:
+            return _post_to_dict(post)
+    archived = archive.get_archived_post(post_id)
+    if archived is None:
+        abort(HTTPStatus.NOT_FOUND)
+    return archived
 
 
 @app.route('/<int:post_id>', methods=['PATCH'])
@@ -108,7 +308,10 @@ def update_post(post_id):
     Update the details of a specific post by post ID.
     
     This function retrieves a post from the database using the post ID, updates the post's attributes
-    with the provided JSON data, and commits the changes to the database.
+    with the provided JSON data, and commits the changes to the database. When sharding is
+    enabled, the post is updated in its shard, where it stays even if its author changes,
+    and the counters follow once the event of the update is applied. Posts written
+    before sharding was enabled are updated in the post table.
     
     Args:
         post_id (int): The ID of the post to update.
@@ -116,22 +319,40 @@ def update_post(post_id):
     Returns:
         dict: A dictionary containing the updated ID, title, body, created, and author_id of the post.
     """
-    post = db.get_or_404(Post, post_id)
     data = request.json
-
     mapper = inspect(Post)
+    router = sharding.get_router()
+    if router is not None:
+        post = router.update(post_id, {
+            column.key: data[column.key] for column in mapper.attrs if column.key in data and column.key != "id"
+        })
+        if post is not None:
+            singleflight.forget(("post", post_id))
+            shard_events.notify()
+            return post
+
+    post = statements.get_or_404(Post, post_id)
+    before = _post_to_dict(post)
     for column in mapper.attrs:
         if column.key in data:
             setattr(post, column.key, data[column.key])
+    post = _post_to_dict(post)
+
+    previous = (before["created"], before["author_id"], body_bytes(before["body"]))
+    current = (post["created"], post["author_id"], body_bytes(post["body"]))
+    if current[1] != previous[1]:
+        db.session.flush()
+        record_post_deleted(previous[1])
+        record_post_created(post["author_id"], post["created"])
+    if current != previous:
+        record_summary([(previous[0], previous[1], -1, -previous[2]), (current[0], current[1], 1, current[2])])
+    change_feed.record_change("update", post["id"], post["author_id"])
+    analytics.mark_stale()
     db.session.commit()
+    singleflight.forget(("post", post_id), ("user", previous[1]), ("user", current[1]))
+    change_feed.notify()
 
-    return {
-        "id": post.id,
-        "title": post.title,
-        "body": post.body,
-        "created": post.created,
-        "author_id": post.author_id,
-    }
+    return post
 
 
 @app.route('/<int:post_id>', methods=['DELETE'])
@@ -140,7 +361,10 @@ def delete_post(post_id):
     Delete a specific post by post ID.
     
     This function retrieves a post from the database using the post ID, deletes the post,
-    and commits the changes to the database.
+    updates the author's post counters, and commits the changes to the database. When
+    sharding is enabled, the post is deleted from its shard, and the counters follow once
+    the event of the deletion is applied. Posts written before sharding was enabled are
+    deleted from the post table.
     
     Args:
         post_id (int): The ID of the post to delete.
@@ -149,7 +373,75 @@ def delete_post(post_id):
         str: An empty string.
         int: The HTTP status code indicating no content.
     """
-    post = db.get_or_404(Post, post_id)
+    router = sharding.get_router()
+    if router is not None and router.delete(post_id) is not None:
+        singleflight.forget(("post", post_id))
+        shard_events.notify()
+        return "", HTTPStatus.NO_CONTENT
+
+    post = statements.get_or_404(Post, post_id)
     db.session.delete(post)
+    db.session.flush()
+    record_post_deleted(post.author_id)
+    post = _post_to_dict(post)
+    record_summary([(post["created"], post["author_id"], -1, -body_bytes(post["body"]))])
+    change_feed.record_change("delete", post["id"], post["author_id"])
+    analytics.mark_stale()
     db.session.commit()
-    return "", HTTPStatus.NO_CONTENT
\ No newline at end of file
+    singleflight.forget(("post", post_id), ("user", post["author_id"]))
+    change_feed.notify()
+    return "", HTTPStatus.NO_CONTENT
+
+def delete_posts_by_author(author_id, batch_size=500):
+    """
+    Delete every post of an author, one batch per transaction.
+    
+    This function is used when a user is deleted. Each batch deletes at most
+    ``batch_size`` posts and records them in the daily summaries and the change log
+    before committing, so writers are never blocked for long and an interrupted run
+    can simply be started again. When sharding is enabled, the posts are deleted from
+    each shard first, up to ``batch_size`` per shard, in the same transaction as their
+    events, which update the summaries and the change log once applied. Posts left
+    in the post table, then archived posts of the author, are deleted at the end.
+    When run by a job, the job's lease is renewed after every batch.
+    
+    Args:
+        author_id (int): The ID of the author.
+        batch_size (int): The number of posts deleted per transaction.
+    
+    Returns:
+        int: The number of posts deleted.
+    """
+    router = sharding.get_router()
+    table = Post.__table__
+    deleted = 0
+    while router is not None:
+        posts = router.delete_by_author(author_id, batch_size)
+        if not posts:
+            break
+        singleflight.forget(*(("post", post["id"]) for post in posts))
+        shard_events.notify()
+        deleted += len(posts)
+        jobs.heartbeat()
+
+    while True:
+        ids = db.select(table.c.id).where(table.c.author_id == author_id).order_by(table.c.id).limit(batch_size)
+        posts = db.session.execute(
+            db.delete(table).where(table.c.id.in_(ids.scalar_subquery())).returning(*table.c)
+        ).mappings().all()
+        if not posts:
+            # Archived posts are few per author; they go in one last batch.
+            posts = archive.delete_archived_posts_by_author(author_id)
+            if not posts:
+                break
+        record_summary([(post["created"], post["author_id"], -1, -body_bytes(post["body"])) for post in posts])
+        for post in posts:
+            change_feed.record_change("delete", post["id"], post["author_id"])
+        analytics.mark_stale()
+        db.session.commit()
+        singleflight.forget(("user", author_id), *(("post", post["id"]) for post in posts))
+        change_feed.notify()
+        deleted += len(posts)
+        jobs.heartbeat()
+
+    return deleted
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from sqlalchemy import inspect
 from src.models import Role, db
+from src import statements, roles, jobs
 from http import HTTPStatus
 
 app = Blueprint("role", __name__, url_prefix="/roles")
@@ -33,6 +34,7 @@ def create_role():
     
     db.session.add(role)
     db.session.commit()
+    roles.get_registry().reload()
     
     return {"message": "Role created successfully"}, HTTPStatus.CREATED
 
@@ -41,19 +43,19 @@ def list_roles():
     """
     List all roles.
 
-    This endpoint retrieves all roles from the database and returns them as a list of dictionaries.
+    This endpoint returns the roles of the in-memory role snapshot as a list of dictionaries,
+    without querying the database.
 
     Returns:
         list: A list of dictionaries, each representing a role.
         HTTPStatus: The HTTP status code indicating the result of the operation.
     """
-    roles = db.session.execute(db.select(Role)).scalars().all()
     return jsonify([
         {
-            "id": role.id,
-            "name": role.name
+            "id": role_id,
+            "name": name
         }
-        for role in roles
+        for role_id, name in roles.snapshot().by_id.items()
     ]), HTTPStatus.OK
 
 @app.route('/<int:role_id>', methods=['DELETE'])
@@ -61,18 +63,32 @@ def delete_role(role_id):
     """
     Delete a role by ID.
 
-    This endpoint deletes a role from the database using the provided role ID.
+    This endpoint checks that the role exists and queues a background job that deletes
+    it. The job's progress is available at ``GET /jobs/<id>``.
 
     Args:
         role_id (int): The ID of the role to delete.
 
     Returns:
-        dict: A message indicating the role was deleted successfully.
-        HTTPStatus: The HTTP status code indicating the result of the operation.
+        dict: The queued job.
+        HTTPStatus: The HTTP status code indicating the request was accepted.
+        dict: The Location header of the job.
     """
-    role = db.get_or_404(Role, role_id)
-    
-    db.session.delete(role)
+    statements.get_or_404(Role, role_id)
+    job = jobs.enqueue("delete-role", role_id=role_id)
     db.session.commit()
-    
-    return {"message": "Role deleted successfully"}, HTTPStatus.OK
\ No newline at end of file
+    return jobs.accepted(job)
+
+@jobs.job("delete-role")
+def delete_role_job(role_id):
+    """
+    Delete a role and refresh the role snapshot. Runs as a background job.
+
+    Args:
+        role_id (int): The ID of the role to delete.
+    """
+    role = db.session.get(Role, role_id)
+    if role is not None:
+        db.session.delete(role)
+        db.session.commit()
+    roles.get_registry().reload()
\ No newline at end of file
@@ -1,19 +1,45 @@
 from http import HTTPStatus
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app
 from sqlalchemy import inspect
 from src.models.user import User, db
 from flask_jwt_extended import jwt_required
-from src.utils import requires_roles
+from src.utils import requires_roles, parse_id_list
+from src.passwords import make_password, PasswordPoolSaturated
+from src.revocation import revoke_user_tokens
+from src import db as raw_db, statements, singleflight, roles, jobs
+from src.controllers.post import delete_posts_by_author
 from sqlalchemy.exc import IntegrityError
 
 app = Blueprint("user", __name__, url_prefix="/users")
 
+def _user_to_dict(user):
+    """
+    Serialize a User object into a dictionary.
+    
+    Args:
+        user (User): The user to serialize.
+    
+    Returns:
+        dict: A dictionary containing the ID, username, role and post stats of the user. The
+        password hash is never serialized.
+    """
+    return {
+        "id": user.id,
+        "username": user.username,
+        "role": {
+            "id": user.role_id,
+            "name": roles.name_of(user.role_id),
+        },
+        "post_count": user.post_count,
+        "last_post_at": user.last_post_at,
+    }
+
 def _create_user():
     """
     Create a new user and add it to the database.
     
-    This function retrieves the JSON data from the request, creates a new User object,
-    adds it to the database session, and commits the session.
+    This function retrieves the JSON data from the request, creates a new User object
+    with a hashed password, adds it to the database session, and commits the session.
     
     Returns:
         dict: A dictionary containing the ID and username of the newly created user.
@@ -22,7 +48,7 @@ def _create_user():
     
     user = User(
         username=data["username"],
-        password=data["password"],  
+        password=make_password(data["password"]),
         role_id=data["role_id"],  
     )
     
@@ -33,30 +59,52 @@ def _create_user():
         "username": user.username,
     }, HTTPStatus.CREATED
 
-def _list_users():
+USER_ORDERINGS = {
+    "id": User.id,
+    "username": User.username,
+    "post_count": User.post_count.desc(),
+    "last_post_at": User.last_post_at.desc(),
+}
+
+def _list_users(order=None):
     """
     Retrieve a list of all users from the database.
     
     This function executes a SELECT query on the User table and returns a list of dictionaries,
     each containing the ID and username of a user.
     
+    Args:
+        order (str, optional): One of the keys of USER_ORDERINGS. Post stats are sorted
+            in descending order, ties are broken by ID.
+    
     Returns:
         list: A list of dictionaries, each representing a user.
     """
     query = db.select(User)
+    if order is not None:
+        query = query.order_by(USER_ORDERINGS[order], User.id)
     users = db.session.execute(query).scalars()
-    return [
-        {
-            "id": user.id,
-            "username": user.username,
-            "password": user.password,
-            "role": {
-                "id": user.role.id,
-                "name": user.role.name,
-            }
-        }
-        for user in users
-    ]
+    return [_user_to_dict(user) for user in users]
+
+def _get_users_by_ids(user_ids):
+    """
+    Retrieve several users by ID with a single query.
+    
+    The users are fetched with one ``IN`` query and returned in the order the IDs
+    were requested. IDs that do not match any user are reported separately.
+    
+    Args:
+        user_ids (list): The IDs of the users to retrieve.
+    
+    Returns:
+        list: A list of dictionaries, each representing a user.
+        list: The requested IDs that were not found.
+    """
+    query = db.select(User).where(User.id.in_(user_ids))
+    found = {user.id: user for user in db.session.execute(query).scalars()}
+    users = [_user_to_dict(found[user_id]) for user_id in user_ids if user_id in found]
+    missing = [user_id for user_id in user_ids if user_id not in found]
+    return users, missing
 
 @app.route('/', methods=['GET', 'POST'])
 @jwt_required()
@@ -67,16 +115,32 @@ def list_or_create_user():
     
     If the request method is POST, a new user is created using the _create_user function.
     If the request method is GET, a list of all users is returned using the _list_users function.
+    When the ``ids`` query parameter is given (e.g. ``?ids=1,2,3``), only those users are
+    returned, in the requested order, together with the IDs that were not found.
+    The ``order`` query parameter sorts the listing, e.g. ``?order=post_count``.
     
     Returns:
         dict: A dictionary containing a message if a new user is created, or a list of users.
         int: The HTTP status code.
     """
     if request.method == 'POST':
-        _create_user()
+        try:
+            _create_user()
+        except PasswordPoolSaturated:
+            return {"message": "Server busy, try again later"}, HTTPStatus.SERVICE_UNAVAILABLE, {"Retry-After": "1"}
         return {"message": "User created!"}, HTTPStatus.CREATED
+    elif "ids" in request.args:
+        try:
+            user_ids = parse_id_list(request.args["ids"], current_app.config.get("MULTI_GET_MAX_IDS", 100))
+        except ValueError as e:
+            return {"message": str(e)}, HTTPStatus.BAD_REQUEST
+        users, missing = _get_users_by_ids(user_ids)
+        return {"users": users, "missing": missing}, HTTPStatus.OK
     else:
-        return {"users": _list_users()}, HTTPStatus.OK
+        order = request.args.get("order")
+        if order is not None and order not in USER_ORDERINGS:
+            return {"message": f"'order' must be one of {', '.join(USER_ORDERINGS)}"}, HTTPStatus.BAD_REQUEST
+        return {"users": _list_users(order)}, HTTPStatus.OK
 
 @app.route('/<int:user_id>', methods=['GET'])
 # @jwt_required()
@@ -86,7 +150,8 @@ def get_user(user_id):
     Retrieve the details of a specific user by user ID.
     
     This function retrieves a user from the database using the user ID and returns a dictionary
-    containing the user's ID and username.
+    containing the user's ID and username. The raw sqlite3 fast path is tried first,
+    when it is enabled. Concurrent requests for the same user share one lookup.
     
     Args:
         user_id (int): The ID of the user to retrieve.
@@ -94,16 +159,14 @@ def get_user(user_id):
     Returns:
         dict: A dictionary containing the ID and username of the user.
     """
-    user = db.get_or_404(User, user_id)
-    return {
-            "id": user.id,
-            "username": user.username,
-            "password": user.password,
-            "role": {
-                "id": user.role.id,
-                "name": user.role.name,
-            }
-        }
+    return singleflight.do(("user", user_id), lambda: _load_user(user_id))
+
+def _load_user(user_id):
+    user = raw_db.get_user(user_id)
+    if user is not None:
+        return user
+    user = statements.get_or_404(User, user_id)
+    return _user_to_dict(user)
 
 @app.route('/<int:user_id>', methods=['PATCH'])
 @jwt_required()
@@ -121,14 +184,20 @@ def update_user(user_id):
     Returns:
         dict: A dictionary containing the updated ID and username of the user.
     """
-    user = db.get_or_404(User, user_id)
+    user = statements.get_or_404(User, user_id)
     data = request.json
 
     if "username" in data:
-        existing_user = db.session.execute(db.select(User).filter_by(username=data["username"])).scalar()
+        existing_user = statements.user_by_username(data["username"])
         if existing_user and existing_user.id != user_id:
             return {"message": "Username already exists!"}, HTTPStatus.CONFLICT
 
+    if "password" in data:
+        try:
+            data = {**data, "password": make_password(data["password"])}
+        except PasswordPoolSaturated:
+            return {"message": "Server busy, try again later"}, HTTPStatus.SERVICE_UNAVAILABLE, {"Retry-After": "1"}
+
     mapper = inspect(User)
     for column in mapper.attrs:
         if column.key in data:
@@ -139,16 +208,9 @@ def update_user(user_id):
     except IntegrityError:
         db.session.rollback()
         return {"message": "An error occurred while updating the user."}, HTTPStatus.BAD_REQUEST
+    singleflight.forget(("user", user_id))
 
-    return {
-            "id": user.id,
-            "username": user.username,
-            "password": user.password,
-            "role": {
-                "id": user.role.id,
-                "name": user.role.name,
-            }
-        }
+    return _user_to_dict(user)
 
 @app.route('/<int:user_id>', methods=['DELETE'])
 @jwt_required()
@@ -157,17 +219,43 @@ def delete_user(user_id):
     """
     Delete a specific user by user ID.
     
-    This function retrieves a user from the database using the user ID, deletes the user,
-    and commits the changes to the database.
+    This function checks that the user exists, marks them inactive and revokes every
+    token issued to them right away, so they can neither log in nor use a token while
+    their deletion is pending, and queues a background job that deletes their posts
+    and then the user. The job's progress is available at ``GET /jobs/<id>``; deletions
+    that failed for good are listed at ``GET /jobs/?status=failed`` and can be retried.
     
     Args:
         user_id (int): The ID of the user to delete.
     
     Returns:
-        str: An empty string.
-        int: The HTTP status code indicating no content.
+        dict: The queued job.
+        int: The HTTP status code indicating the request was accepted.
+        dict: The Location header of the job.
     """
-    user = db.get_or_404(User, user_id)
-    db.session.delete(user)
+    user = statements.get_or_404(User, user_id)
+    user.active = False
+    revoke_user_tokens(user.id)
+    job = jobs.enqueue("delete-user", user_id=user.id)
     db.session.commit()
-    return "", HTTPStatus.NO_CONTENT
\ No newline at end of file
+    singleflight.forget(("user", user.id))
+    return jobs.accepted(job)
+
+@jobs.job("delete-user")
+def delete_user_job(user_id):
+    """
+    Delete a user and their posts. Runs as a background job.
+    
+    Args:
+        user_id (int): The ID of the user to delete.
+    
+    Returns:
+        dict: The number of posts deleted.
+    """
+    posts = delete_posts_by_author(user_id, current_app.config.get("DELETE_BATCH_SIZE", 500))
+    user = db.session.get(User, user_id)
+    if user is not None:
+        db.session.delete(user)
+        db.session.commit()
+        singleflight.forget(("user", user_id))
+    return {"deleted_posts": posts}
\ No newline at end of file
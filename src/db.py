@@ -1,62 +1,188 @@
-import sqlite3
 import os
-import click
-from flask import current_app, g
+import sqlite3
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import quote
 
+from flask import current_app
 
-def get_db():
-    """Get a database connection.
+from src.models import db
 
-    This function connects to the database specified in the Flask app configuration
-    if not already connected, and returns the connection.
-    """
-    if 'db' not in g:
-        g.db = sqlite3.connect(
-            current_app.config['DATABASE'],
-            detect_types=sqlite3.PARSE_DECLTYPES
-        )
-        g.db.row_factory = sqlite3.Row
+POST_BY_ID = "SELECT id, title, body, created, author_id FROM post WHERE id = ?"
+USER_BY_ID = (
+    "SELECT user.id, user.username, user.post_count, user.last_post_at,"
+    " role.id AS role_id, role.name AS role_name"
+    " FROM user LEFT JOIN role ON role.id = user.role_id WHERE user.id = ?"
+)
+CREDENTIALS_BY_USERNAME = "SELECT id, password, active FROM user WHERE username = ?"
 
-    return g.db
+Credentials = namedtuple("Credentials", ["id", "password", "active"])
 
 
-def close_db(e=None):
-    """Close the database connection.
+def _datetime(value):
+    return datetime.fromisoformat(value) if value is not None else None
 
-    This function closes the database connection if it exists.
-    """
-    db = g.pop('db', None)
 
-    if db is not None:
-        db.close()
+class RawReader:
+    """
+    Primary-key lookups straight through ``sqlite3``, without the ORM.
+
+    Read-only connections are kept in a small pool: a lookup takes the most
+    recently used idle connection, or opens one when none is idle, and hands it
+    back afterwards. At most ``pool_size`` idle connections are kept, the others
+    are closed, so threads that come and go do not leave connections behind. The
+    queries are fixed strings, so sqlite3 prepares each statement once per
+    connection and reuses it from its statement cache. The results are the same
+    dictionaries the ORM based handlers return.
+
+    Args:
+        path (str): The path of the SQLite database file.
+        cached_statements (int): The size of the prepared statement cache of each connection.
+        pool_size (int): The maximum number of idle connections kept open.
+    """
 
+    def __init__(self, path, cached_statements=64, pool_size=8):
+        self.path = path
+        self.cached_statements = cached_statements
+        self.pool_size = pool_size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            f"file:{quote(self.path)}?mode=ro",
+            uri=True,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """
+        Lend an idle connection, or a new one, for the duration of the block.
+        """
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._connect()
+        try:
+            yield connection
+        finally:
+            with self._lock:
+                keep = len(self._idle) < self.pool_size
+                if keep:
+                    self._idle.append(connection)
+            if not keep:
+                connection.close()
+
+    def _fetchone(self, query, params):
+        with self.connection() as connection:
+            return connection.execute(query, params).fetchone()
+
+    def get_post(self, post_id):
+        row = self._fetchone(POST_BY_ID, (post_id,))
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "body": row["body"],
+            "created": _datetime(row["created"]),
+            "author_id": row["author_id"],
+        }
+
+    def get_user(self, user_id):
+        row = self._fetchone(USER_BY_ID, (user_id,))
+        if row is None or row["role_id"] is None:
+            return None
+        return {
+            "id": row["id"],
+            "username": row["username"],
+            "role": {
+                "id": row["role_id"],
+                "name": row["role_name"],
+            },
+            "post_count": row["post_count"],
+            "last_post_at": _datetime(row["last_post_at"]),
+        }
+
+    def get_credentials(self, username):
+        row = self._fetchone(CREDENTIALS_BY_USERNAME, (username,))
+        return Credentials(row["id"], row["password"], bool(row["active"])) if row is not None else None
+
+    def forget_connections(self):
+        """
+        Drop the connections without closing them, in a forked child. They belong to
+        the parent process, and the child opens its own on first use.
+        """
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def close(self):
+        """
+        Close the idle connections. Connections that are lent out are closed when
+        they are handed back, if the pool is full, or by a later call.
+        """
+        with self._lock:
+            connections, self._idle = self._idle, []
+        for connection in connections:
+            connection.close()
+
+
+def get_reader():
+    """
+    Return the raw reader of the current app, or None when the fast path is disabled.
+    """
+    return current_app.extensions.get("raw_sqlite")
 
-def init_db():
-    """Initialize the database.
 
-    This function initializes the database using the schema.sql file.
+def get_post(post_id):
     """
-    db = get_db()
+    Return a post as a dictionary through the fast path.
 
-    schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
-    with open(schema_path, 'r', encoding='utf8') as f:
-        db.executescript(f.read())
+    Returns:
+        dict: The post, or None when it is not in the post table or the fast path is
+        disabled, in which case the caller falls back to the ORM.
+    """
+    reader = get_reader()
+    return reader.get_post(post_id) if reader is not None else None
 
 
-@click.command('init-db')
-def init_db_command():
-    """Clear the existing data and create new tables.
+def get_user(user_id):
+    """
+    Return a user as a dictionary through the fast path.
 
-    This command initializes the database and prints a confirmation message.
+    Returns:
+        dict: The user, or None when it is not found or the fast path is disabled, in
+        which case the caller falls back to the ORM.
     """
-    init_db()
-    click.echo('Initialized the database.')
+    reader = get_reader()
+    return reader.get_user(user_id) if reader is not None else None
 
 
 def init_app(app):
-    """Initialize the Flask app with database functions.
+    """
+    Enable the raw ``sqlite3`` read path when ``RAW_SQLITE_READS`` is set and the
+    database is a SQLite file. In-memory databases are private to their connection,
+    so they always use the ORM.
 
-    This function registers the database functions with the Flask app.
+    Args:
+        app (Flask): The Flask application.
     """
-    app.teardown_appcontext(close_db)
-    app.cli.add_command(init_db_command)
+    if not app.config.get("RAW_SQLITE_READS"):
+        return
+    with app.app_context():
+        url = db.engine.url
+    if not url.drivername.startswith("sqlite") or url.database in (None, "", ":memory:") \
+            or url.query.get("mode") == "memory":
+        return
+    app.extensions["raw_sqlite"] = RawReader(
+        os.path.abspath(url.database),
+        app.config.get("RAW_SQLITE_CACHED_STATEMENTS", 64),
+        app.config.get("RAW_SQLITE_POOL_SIZE", 8),
+    )
@@ -0,0 +1,216 @@
+import os
+import threading
+import weakref
+
+import sqlalchemy as sa
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.pool import StaticPool, SingletonThreadPool
+
+from src.models import db
+from src import revocation, group_commit
+from src.passwords import shutdown_pool
+from src.ratelimit import MemoryBackend
+from src.token_cache import VerifiedTokenCache
+from src.statements import CacheStats
+from src.singleflight import SingleFlight
+from src.roles import RoleRegistry
+from src.jobs import JobQueue
+from src.shard_events import ShardEventApplier
+
+_apps = weakref.WeakSet()
+
+
+def _engines(app):
+    with app.app_context():
+        engines = list(db.engines.values())
+    router = app.extensions.get("post_shards")
+    if router is not None:
+        engines.extend(router.engines)
+    return engines
+
+
+def _guard_engine(engine):
+    """
+    Tag each pooled connection with the PID that opened it, and refuse to check it
+    out in any other process. The pool then opens a new connection instead.
+    """
+    if sa.event.contains(engine, "connect", _record_pid):
+        return
+    sa.event.listen(engine, "connect", _record_pid)
+    sa.event.listen(engine, "checkout", _check_pid)
+
+
+def _record_pid(dbapi_connection, connection_record):
+    connection_record.info["pid"] = os.getpid()
+
+
+def _check_pid(dbapi_connection, connection_record, connection_proxy):
+    if connection_record.info.get("pid") != os.getpid():
+        connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+        raise DisconnectionError("Connection belongs to another process")
+
+
+def before_fork():
+    """
+    Close the idle connections of the process, so that a forked worker has nothing
+    to share with it. In-memory databases only live as long as their connection,
+    so they are kept.
+
+    Call it from the server's pre-fork hook, in the master. It is not run on every
+    fork: processes forked for other reasons, such as the password hashing pool,
+    would otherwise close the connections of a busy worker.
+    """
+    for app in list(_apps):
+        for engine in _engines(app):
+            if not isinstance(engine.pool, (StaticPool, SingletonThreadPool)):
+                engine.dispose()
+
+
+def _after_fork_in_child():
+    for app in list(_apps):
+        reset_after_fork(app)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def reset_after_fork(app):
+    """
+    Give a forked child its own connections, caches and locks.
+
+    Runs in the child right after ``fork()``, so it must not do any I/O or start
+    threads. Connections are dropped without being closed, since they still belong
+    to the parent. Background threads do not survive a fork; they are restarted by
+    start_worker(), on the first request or from the server's worker hook.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    for engine in _engines(app):
+        engine.dispose(close=False)
+    router = app.extensions.get("post_shards")
+    if router is not None:
+        router.forget_connections()
+    reader = app.extensions.get("raw_sqlite")
+    if reader is not None:
+        reader.forget_connections()
+
+    cache = app.extensions.get("jwt_verified_cache")
+    if cache is not None:
+        app.extensions["jwt_verified_cache"] = VerifiedTokenCache(cache.maxsize)
+    if isinstance(app.extensions.get("ratelimit"), MemoryBackend):
+        app.extensions["ratelimit"] = MemoryBackend(app.extensions["ratelimit"].maxsize)
+    if "admission" in app.extensions:
+        # The limiters are created again on first use in this process.
+        app.extensions["admission"] = {}
+    if "statement_cache_stats" in app.extensions:
+        app.extensions["statement_cache_stats"] = CacheStats()
+    store = app.extensions.get("profile_store")
+    if store is not None:
+        store.forget_pending()
+    registry = app.extensions.get("roles")
+    if registry is not None:
+        app.extensions["roles"] = RoleRegistry(registry.check_interval, registry.snapshot)
+    flights = app.extensions.get("single_flight")
+    if flights is not None:
+        app.extensions["single_flight"] = SingleFlight(flights.timeout)
+    queue = app.extensions.get("jobs")
+    if queue is not None:
+        app.extensions["jobs"] = JobQueue(app, queue.workers, queue.poll_interval, queue.lease, queue.retry_backoff)
+    applier = app.extensions.get("post_shard_events")
+    if applier is not None:
+        app.extensions["post_shard_events"] = ShardEventApplier(app, applier.router, applier.interval, applier.batch)
+    app.extensions.pop("analytics_cache", None)
+    app.extensions.pop("post_change_hub", None)
+    app.extensions.pop("post_writer", None)
+    app.extensions["revocation_store"] = revocation.RevocationStore()
+    app.extensions["forking"] = {"pid": None, "lock": threading.Lock()}
+
+
+def start_worker(app):
+    """
+    Start the per-process state of a worker: load the revocation store, retrying
+    ``REVOCATION_LOAD_ATTEMPTS`` times, and start its refresh thread, and start the
+    group commit writer, the job workers and the shard event applier. Does nothing
+    if it already ran in this process.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    state = app.extensions["forking"]
+    if state["pid"] == os.getpid():
+        return
+    with state["lock"]:
+        if state["pid"] == os.getpid():
+            return
+        store = app.extensions["revocation_store"]
+        with app.app_context():
+            try:
+                # If this fails, tokens are rejected until a later load succeeds.
+                store.load(app.config.get("REVOCATION_LOAD_ATTEMPTS", 3))
+            finally:
+                db.session.remove()
+        store.start(app, app.config.get("REVOCATION_REFRESH_INTERVAL", 0))
+        group_commit.init_app(app)
+        queue = app.extensions.get("jobs")
+        if queue is not None:
+            queue.start()
+        applier = app.extensions.get("post_shard_events")
+        if applier is not None:
+            applier.start()
+        state["pid"] = os.getpid()
+
+
+def shutdown(app):
+    """
+    Stop the background threads of the current process and close its connections,
+    e.g. when a worker exits.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    writer = app.extensions.pop("post_writer", None)
+    if writer is not None:
+        writer.stop()
+    queue = app.extensions.get("jobs")
+    if queue is not None:
+        # Unfinished jobs are picked up again once their lease expires.
+        queue.stop(timeout=app.config.get("JOB_SHUTDOWN_TIMEOUT", 10))
+    applier = app.extensions.get("post_shard_events")
+    if applier is not None:
+        # Events left in the shards are applied by the next process to start.
+        applier.stop(timeout=app.config.get("JOB_SHUTDOWN_TIMEOUT", 10))
+    store = app.extensions.get("revocation_store")
+    if store is not None:
+        store.stop()
+    reader = app.extensions.get("raw_sqlite")
+    if reader is not None:
+        reader.close()
+    profiles = app.extensions.get("profile_store")
+    if profiles is not None:
+        profiles.flush()
+    shutdown_pool()
+    for engine in _engines(app):
+        engine.dispose()
+
+
+def init_app(app):
+    """
+    Make the app safe to create before forking worker processes, e.g. with a
+    pre-forking server's ``--preload``. The server should call before_fork() in the
+    master before each worker is forked.
+
+    Must be called after every other extension was set up.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.extensions["forking"] = {"pid": os.getpid(), "lock": threading.Lock()}
+    for engine in _engines(app):
+        _guard_engine(engine)
+    _apps.add(app)
+
+    @app.before_request
+    def start_forked_worker():
+        if app.extensions["forking"]["pid"] != os.getpid():
+            start_worker(app)
@@ -0,0 +1,453 @@
+import os
+import threading
+import time
+from datetime import timedelta
+from http import HTTPStatus
+
+import click
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.models import db, Job
+from src.utils import utcnow
+
+HANDLERS = {}
+
+job_table = Job.__table__
+
+
+class LeaseLost(Exception):
+    """
+    Raised by heartbeat() when the lease of the running job expired and another
+    worker claimed the job again.
+    """
+
+
+def job(kind):
+    """
+    Register a function as the handler of a kind of job.
+
+    The handler is called in an app context with the payload as keyword arguments,
+    and its return value, if any, is stored as the job's result. A job can run more
+    than once (a retry, or a worker that died mid-job), so handlers must be safe to
+    run again. Handlers that may run longer than the lease call heartbeat() between
+    batches.
+
+    Args:
+        kind (str): The name the job is enqueued with.
+    """
+    def decorator(f):
+        HANDLERS[kind] = f
+        return f
+    return decorator
+
+
+def enqueue(kind, max_attempts=None, **payload):
+    """
+    Add a job to the current session. It is queued when the session commits, together
+    with the rest of the request's changes, and the workers are woken up then.
+
+    Args:
+        kind (str): The name of a registered handler.
+        max_attempts (int, optional): Overrides ``JOB_MAX_ATTEMPTS``.
+        **payload: The JSON serializable arguments of the handler.
+
+    Returns:
+        Job: The new job, with its ID.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    now = utcnow()
+    row = Job(
+        kind=kind,
+        payload=payload,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts or current_app.config.get("JOB_MAX_ATTEMPTS", 3),
+        run_after=now,
+        created_at=now,
+    )
+    db.session.add(row)
+    db.session.flush()
+    db.session.info["jobs_enqueued"] = True
+    return row
+
+
+def job_to_dict(row):
+    """
+    Serialize a job into a dictionary.
+
+    Args:
+        row (Job): The job to serialize.
+
+    Returns:
+        dict: The ID, kind, status, attempts, timestamps, error and result of the job.
+    """
+    return {
+        "id": row.id,
+        "kind": row.kind,
+        "status": row.status,
+        "attempts": row.attempts,
+        "max_attempts": row.max_attempts,
+        "created_at": row.created_at,
+        "started_at": row.started_at,
+        "finished_at": row.finished_at,
+        "error": row.error,
+        "result": row.result,
+    }
+
+
+def accepted(row):
+    """
+    Build the 202 response of a request that queued a job.
+
+    Returns:
+        dict: The job.
+        HTTPStatus: 202 Accepted.
+        dict: The Location header of the job status.
+    """
+    return {"job": job_to_dict(row)}, HTTPStatus.ACCEPTED, {"Location": f"/jobs/{row.id}"}
+
+
+class JobQueue:
+    """
+    Runs the jobs of the job table in a pool of worker threads.
+
+    Workers claim the oldest runnable job with a single ``UPDATE ... RETURNING``, so
+    several threads and processes can share the table without running a job twice.
+    A claimed job holds a lease of ``lease`` seconds; if its worker dies, the job is
+    picked up again once the lease expires, which is also how jobs left running by
+    a restart are resumed. Long jobs renew their lease with heartbeat(), and a worker
+    only records the outcome of an attempt while the job is still its own. Failed
+    attempts are retried with exponential backoff until ``max_attempts`` is reached.
+
+    Attributes:
+        workers (int): The number of jobs run at once by this process.
+        succeeded (int): The number of jobs that succeeded in this process.
+        failed (int): The number of failed attempts in this process.
+    """
+
+    def __init__(self, app, workers=2, poll_interval=1.0, lease=300.0, retry_backoff=5.0):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.retry_backoff = retry_backoff
+        self.succeeded = 0
+        self.failed = 0
+        self._threads = []
+        self._pid = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the worker threads, once per process. An in-memory database is bound to
+        a single shared connection, so no threads are started for it; its jobs only
+        run through ``run_pending``.
+        """
+        if self._pid == os.getpid() or self.workers <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            with self.app.app_context():
+                if isinstance(db.engine.pool, StaticPool):
+                    return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """
+        Stop the workers once their current job is done.
+        """
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def run_pending(self):
+        """
+        Run runnable jobs in the calling thread until none is left.
+
+        Returns:
+            int: The number of jobs run.
+        """
+        ran = 0
+        while self.run_one():
+            ran += 1
+        return ran
+
+    def run_one(self):
+        """
+        Claim and run one runnable job. Must be called in an app context.
+
+        Returns:
+            bool: False if there was no runnable job.
+        """
+        claimed = self._claim()
+        if claimed is None:
+            return False
+
+        handler = HANDLERS.get(claimed.kind)
+        g.job = (self, claimed)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for job kind {claimed.kind!r}")
+            result = handler(**claimed.payload)
+            db.session.commit()
+        except LeaseLost:
+            # The worker that claimed the job again records its outcome.
+            db.session.rollback()
+            self.app.logger.warning("Job %s (%s) lost its lease", claimed.id, claimed.kind)
+        except Exception as e:
+            db.session.rollback()
+            self.app.logger.exception("Job %s (%s) failed", claimed.id, claimed.kind)
+            self.failed += 1
+            self._finish_failed(claimed, e, retry=handler is not None)
+        else:
+            self.succeeded += 1
+            self._finish(claimed, status="succeeded", result=result, error=None)
+        finally:
+            g.pop("job", None)
+        return True
+
+    def renew(self, claimed):
+        """
+        Extend the lease of a claimed job by ``lease`` seconds from now, and commit the
+        session.
+
+        Raises:
+            LeaseLost: The job was claimed again by another worker.
+        """
+        renewed = db.session.execute(
+            _owned(claimed).values(lease_until=utcnow() + timedelta(seconds=self.lease))).rowcount
+        db.session.commit()
+        if not renewed:
+            raise LeaseLost(f"Job {claimed.id} was claimed again")
+
+    def _claim(self):
+        # Polling only reads; the write lock is taken once there is a job to claim.
+        now = utcnow()
+        runnable = sa.or_(
+            sa.and_(job_table.c.status == "queued", job_table.c.run_after <= now),
+            sa.and_(job_table.c.status == "running", job_table.c.lease_until < now),
+        )
+        while True:
+            candidate = db.session.execute(
+                sa.select(job_table.c.id, job_table.c.attempts, job_table.c.max_attempts)
+                .where(runnable).order_by(job_table.c.id).limit(1)
+            ).first()
+            if candidate is None:
+                return None
+
+            claim = sa.update(job_table).where(job_table.c.id == candidate.id).where(runnable)
+            if candidate.attempts >= candidate.max_attempts:
+                # Its worker died during the last attempt.
+                db.session.execute(claim.values(
+                    status="failed", error="Lease expired", finished_at=now, lease_until=None))
+                db.session.commit()
+                continue
+
+            claimed = db.session.execute(
+                claim.values(
+                    status="running",
+                    attempts=job_table.c.attempts + 1,
+                    started_at=now,
+                    lease_until=now + timedelta(seconds=self.lease),
+                ).returning(job_table.c.id, job_table.c.kind, job_table.c.payload,
+                            job_table.c.attempts, job_table.c.max_attempts, job_table.c.started_at)
+            ).first()
+            db.session.commit()
+            if claimed is not None:
+                return claimed
+
+    def _finish_failed(self, claimed, error, retry=True):
+        if retry and claimed.attempts < claimed.max_attempts:
+            delay = self.retry_backoff * 2 ** (claimed.attempts - 1)
+            db.session.execute(_owned(claimed).values(
+                status="queued", run_after=utcnow() + timedelta(seconds=delay), lease_until=None, error=repr(error)))
+            db.session.commit()
+        else:
+            self.app.logger.error(
+                "Job %s (%s) failed for good after %s attempt(s); retry it with `flask jobs retry %s`",
+                claimed.id, claimed.kind, claimed.attempts, claimed.id)
+            self._finish(claimed, status="failed", result=None, error=repr(error))
+
+    def _finish(self, claimed, status, result, error):
+        db.session.execute(_owned(claimed).values(
+            status=status, result=result, error=error, finished_at=utcnow(), lease_until=None))
+        db.session.commit()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    ran = self.run_one()
+                except OperationalError:
+                    # e.g. the job table does not exist yet, or the database is locked.
+                    db.session.rollback()
+                    ran = False
+                finally:
+                    db.session.remove()
+            if not ran:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+
+def _owned(claimed):
+    # Matches the job only while this attempt still holds it: a claim after the lease
+    # expired, or a retry, changes the attempts or the start time.
+    return sa.update(job_table).where(
+        job_table.c.id == claimed.id,
+        job_table.c.status == "running",
+        job_table.c.attempts == claimed.attempts,
+        job_table.c.started_at == claimed.started_at,
+    )
+
+
+def heartbeat():
+    """
+    Renew the lease of the job running in the current app context, so that it is not
+    picked up by another worker while it is still making progress. Long handlers call
+    it between batches; it commits the session. Does nothing outside of a job.
+
+    Raises:
+        LeaseLost: The lease expired and the job was claimed again, so the handler
+            should stop.
+    """
+    running = g.get("job")
+    if running is not None:
+        queue, claimed = running
+        queue.renew(claimed)
+
+
+def retry(job_id):
+    """
+    Queue a failed job again, with a fresh set of attempts. The caller is responsible
+    for committing the session.
+
+    Args:
+        job_id (int): The ID of the job.
+
+    Returns:
+        bool: False if there is no failed job with this ID.
+    """
+    retried = db.session.execute(
+        sa.update(job_table)
+        .where(job_table.c.id == job_id, job_table.c.status == "failed")
+        .values(status="queued", attempts=0, run_after=utcnow(), finished_at=None, lease_until=None)
+    ).rowcount
+    if retried:
+        db.session.info["jobs_enqueued"] = True
+    return bool(retried)
+
+
+def get_queue():
+    """
+    Return the job queue of the current app.
+    """
+    return current_app.extensions["jobs"]
+
+
+def _jobs_committed(session):
+    if session.info.pop("jobs_enqueued", False) and has_app_context():
+        queue = current_app.extensions.get("jobs")
+        if queue is not None:
+            queue.wake()
+
+
+def _jobs_rolled_back(session, previous_transaction):
+    session.info.pop("jobs_enqueued", None)
+
+
+sa.event.listen(Session, "after_commit", _jobs_committed)
+sa.event.listen(Session, "after_soft_rollback", _jobs_rolled_back)
+
+
+@click.group('jobs')
+def jobs_command():
+    """
+    Run the background job queue.
+    """
+
+
+@jobs_command.command('work')
+@click.option('--burst', is_flag=True, help='Exit once no job is runnable instead of waiting for more.')
+@with_appcontext
+def jobs_work_command(burst):
+    """
+    Run queued jobs in this process, one at a time.
+    """
+    queue = get_queue()
+    ran = 0
+    while True:
+        try:
+            if queue.run_one():
+                ran += 1
+                continue
+        finally:
+            db.session.remove()
+        if burst:
+            break
+        time.sleep(queue.poll_interval)
+    click.echo(f"Ran {ran} job(s).")
+
+
+@jobs_command.command('failed')
+@with_appcontext
+def jobs_failed_command():
+    """
+    List the jobs that failed for good.
+    """
+    rows = db.session.execute(
+        sa.select(job_table).where(job_table.c.status == "failed").order_by(job_table.c.id)).all()
+    for row in rows:
+        click.echo(f"{row.id}  {row.kind}  {row.payload}  {row.attempts} attempt(s)  {row.error}")
+    click.echo(f"{len(rows)} failed job(s).")
+
+
+@jobs_command.command('retry')
+@click.argument('job_ids', nargs=-1, type=int, required=True)
+@with_appcontext
+def jobs_retry_command(job_ids):
+    """
+    Queue failed jobs again.
+    """
+    for job_id in job_ids:
+        if not retry(job_id):
+            raise click.UsageError(f"Job {job_id} does not exist or has not failed.")
+    db.session.commit()
+    click.echo(f"Queued {len(job_ids)} job(s) again.")
+
+
+def init_app(app):
+    """
+    Attach a job queue to the app. Its workers start with the first request, or
+    from the server's worker hook, so that queued jobs also resume after a restart.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.extensions["jobs"] = JobQueue(
+        app,
+        workers=app.config.get("JOB_WORKERS", 2),
+        poll_interval=app.config.get("JOB_POLL_INTERVAL", 1.0),
+        lease=app.config.get("JOB_LEASE", 300.0),
+        retry_backoff=app.config.get("JOB_RETRY_BACKOFF", 5.0),
+    )
+
+    @app.before_request
+    def start_job_workers():
+        app.extensions["jobs"].start()
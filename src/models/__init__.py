@@ -2,5 +2,15 @@ from .base import db
 from .role import Role
 from .user import User
 from .post import Post
+from .revoked_token import RevokedToken
+from .refresh_token import RefreshTokenFamily
+from .post_daily_summary import PostDailySummary
+from .post_change import PostChange
+from .role_version import RoleVersion
+from .backfill_checkpoint import BackfillCheckpoint
+from .job import Job
+from .analytics_version import AnalyticsVersion
+from .post_id_sequence import PostIdSequence
+from .post_event_cursor import PostEventCursor
 
-__all__ = ["db", "Role", "User", "Post"]
\ No newline at end of file
+__all__ = ["db", "Role", "User", "Post", "RevokedToken", "RefreshTokenFamily", "PostDailySummary", "PostChange", "RoleVersion", "BackfillCheckpoint", "Job", "AnalyticsVersion", "PostIdSequence", "PostEventCursor"]
\ No newline at end of file
@@ -0,0 +1,28 @@
+import sqlalchemy as sa
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.models.base import db
+
+class AnalyticsVersion(db.Model):
+    """
+    AnalyticsVersion model holding the single row that counts the changes that
+    invalidate cached post analytics.
+    
+    Attributes:
+        id (int): Always 1.
+        version (int): Incremented in the same transaction as every post update or deletion.
+    """
+    __tablename__ = "analytics_version"
+
+    id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the AnalyticsVersion object.
+        
+        Returns:
+            str: A string representation of the AnalyticsVersion object.
+        """
+        return f"AnalyticsVersion(version={self.version!r})"
@@ -0,0 +1,35 @@
+import sqlalchemy as sa
+
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional
+
+from src.models.base import db
+
+class BackfillCheckpoint(db.Model):
+    """
+    BackfillCheckpoint model recording how far a batched backfill has progressed.
+    
+    Attributes:
+        name (str): The name of the backfill.
+        last_key (int): The highest key of the batches committed so far.
+        rows (int): The number of rows updated so far.
+        updated_at (datetime): The UTC timestamp of the last committed batch.
+        finished_at (datetime): The UTC timestamp at which the backfill found no more rows.
+    """
+    __tablename__ = "backfill_checkpoint"
+
+    name: Mapped[str] = mapped_column(sa.String(64), primary_key=True)
+    last_key: Mapped[Optional[int]] = mapped_column(sa.Integer, nullable=True)
+    rows: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the BackfillCheckpoint object.
+        
+        Returns:
+            str: A string representation of the BackfillCheckpoint object.
+        """
+        return f"BackfillCheckpoint(name={self.name!r}, last_key={self.last_key!r}, rows={self.rows!r})"
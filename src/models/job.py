@@ -0,0 +1,53 @@
+import sqlalchemy as sa
+
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional
+
+from src.models.base import db
+
+class Job(db.Model):
+    """
+    Job model representing one entry of the persistent background job queue.
+    
+    Attributes:
+        id (int): The unique identifier for the job.
+        kind (str): The name of the registered handler that runs the job.
+        payload (dict): The keyword arguments of the handler.
+        status (str): "queued", "running", "succeeded" or "failed".
+        attempts (int): The number of times the job was started.
+        max_attempts (int): The number of attempts after which a failing job is given up.
+        run_after (datetime): The UTC time before which the job is not started, used for retries.
+        lease_until (datetime): The UTC time after which a running job is considered abandoned.
+        created_at (datetime): The UTC timestamp of the job creation.
+        started_at (datetime): The UTC timestamp of the last attempt.
+        finished_at (datetime): The UTC timestamp at which the job succeeded or failed.
+        error (str): The error of the last failed attempt.
+        result (dict): The value returned by the handler.
+    """
+    __tablename__ = "job"
+
+    id: Mapped[int] = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(sa.String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(sa.JSON, nullable=False)
+    status: Mapped[str] = mapped_column(sa.String(16), nullable=False, default="queued", server_default="queued")
+    attempts: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0, server_default="0")
+    max_attempts: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=3, server_default="3")
+    run_after: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    lease_until: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(sa.Text, nullable=True)
+    result: Mapped[Optional[dict]] = mapped_column(sa.JSON, nullable=True)
+
+    __table_args__ = (sa.Index("ix_job_status_run_after", "status", "run_after"),)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the Job object.
+        
+        Returns:
+            str: A string representation of the Job object.
+        """
+        return f"Job(id={self.id!r}, kind={self.kind!r}, status={self.status!r})"
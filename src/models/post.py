@@ -23,6 +23,13 @@ class Post(db.Model):
         sa.DateTime, server_default=sa.func.now())
     author_id: Mapped[int] = mapped_column(sa.ForeignKey("user.id"))
 
+    # AUTOINCREMENT: IDs are never handed out twice, even once the newest post was
+    # deleted or archived.
+    __table_args__ = (sa.Index("ix_post_author_id_created", "author_id", "created"), {"sqlite_autoincrement": True})
+    # Fetch the server generated ``created`` with RETURNING on insert, instead of
+    # a separate SELECT when it is first accessed.
+    __mapper_args__ = {"eager_defaults": True}
+
     def __repr__(self) -> str:
         """
         Return a string representation of the Post object.
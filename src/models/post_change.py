@@ -0,0 +1,36 @@
+import sqlalchemy as sa
+
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from src.models.base import db
+
+class PostChange(db.Model):
+    """
+    PostChange model representing one entry of the append-only post change log.
+    
+    Attributes:
+        seq (int): The monotonic sequence number of the change, used as a cursor.
+        post_id (int): The ID of the post that changed.
+        op (str): The kind of change: "create", "update" or "delete".
+        author_id (int): The ID of the author of the post after the change.
+        changed_at (datetime): The timestamp of the change.
+    """
+    __tablename__ = "post_change"
+
+    seq: Mapped[int] = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
+    post_id: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+    op: Mapped[str] = mapped_column(sa.String(6), nullable=False)
+    author_id: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False, server_default=sa.func.now())
+
+    __mapper_args__ = {"eager_defaults": True}
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the PostChange object.
+        
+        Returns:
+            str: A string representation of the PostChange object.
+        """
+        return f"PostChange(seq={self.seq!r}, post_id={self.post_id!r}, op={self.op!r})"
@@ -0,0 +1,32 @@
+import sqlalchemy as sa
+
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import date
+
+from src.models.base import db
+
+class PostDailySummary(db.Model):
+    """
+    PostDailySummary model holding the number and size of the posts of an author per day.
+    
+    Attributes:
+        day (date): The UTC day the posts were created.
+        author_id (int): The ID of the user who authored the posts.
+        count (int): The number of posts.
+        total_bytes (int): The total size of the post bodies, in UTF-8 bytes.
+    """
+    __tablename__ = "post_daily_summary"
+
+    day: Mapped[date] = mapped_column(sa.Date, primary_key=True)
+    author_id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
+    count: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0)
+    total_bytes: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the PostDailySummary object.
+        
+        Returns:
+            str: A string representation of the PostDailySummary object.
+        """
+        return f"PostDailySummary(day={self.day!r}, author_id={self.author_id!r}, count={self.count!r})"
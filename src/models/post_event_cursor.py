@@ -0,0 +1,28 @@
+import sqlalchemy as sa
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.models.base import db
+
+class PostEventCursor(db.Model):
+    """
+    PostEventCursor model holding, for each post shard, the last of its events that
+    was applied to the main database.
+    
+    Attributes:
+        shard (str): The path of the shard database.
+        seq (int): The sequence number of the last applied event of the shard.
+    """
+    __tablename__ = "post_event_cursor"
+
+    shard: Mapped[str] = mapped_column(sa.String, primary_key=True)
+    seq: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the PostEventCursor object.
+        
+        Returns:
+            str: A string representation of the PostEventCursor object.
+        """
+        return f"PostEventCursor(shard={self.shard!r}, seq={self.seq!r})"
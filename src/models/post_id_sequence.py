@@ -0,0 +1,28 @@
+import sqlalchemy as sa
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.models.base import db
+
+class PostIdSequence(db.Model):
+    """
+    PostIdSequence model holding the single row that hands out the IDs of sharded posts.
+    
+    Attributes:
+        id (int): Always 1.
+        block (int): The last block handed out. A sharded post ID is a block times
+            the number of shard buckets, plus the bucket of the post.
+    """
+    __tablename__ = "post_id_sequence"
+
+    id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
+    block: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the PostIdSequence object.
+        
+        Returns:
+            str: A string representation of the PostIdSequence object.
+        """
+        return f"PostIdSequence(block={self.block!r})"
@@ -0,0 +1,37 @@
+import sqlalchemy as sa
+
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from src.models.base import db
+
+class RefreshTokenFamily(db.Model):
+    """
+    RefreshTokenFamily model tracking the chain of rotated refresh tokens of one login.
+    
+    Only the identifier of the latest refresh token is kept, so each login session
+    costs a single row no matter how many times it was refreshed.
+    
+    Attributes:
+        id (str): The family identifier, carried in every refresh token of the chain.
+        user_id (int): The ID of the user who logged in.
+        current_jti (str): The identifier of the only refresh token that may be used next.
+        expires_at (datetime): The UTC timestamp at which the latest refresh token expires.
+        revoked (bool): Whether the family was revoked, e.g. after a reuse was detected.
+    """
+    __tablename__ = "refresh_token_family"
+
+    id: Mapped[str] = mapped_column(sa.String(36), primary_key=True)
+    user_id: Mapped[int] = mapped_column(sa.Integer, nullable=False, index=True)
+    current_jti: Mapped[str] = mapped_column(sa.String(36), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    revoked: Mapped[bool] = mapped_column(sa.Boolean, nullable=False, default=False)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the RefreshTokenFamily object.
+        
+        Returns:
+            str: A string representation of the RefreshTokenFamily object.
+        """
+        return f"RefreshTokenFamily(id={self.id!r}, user_id={self.user_id!r}, revoked={self.revoked!r})"
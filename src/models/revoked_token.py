@@ -0,0 +1,35 @@
+import sqlalchemy as sa
+
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional
+
+from src.models.base import db
+
+class RevokedToken(db.Model):
+    """
+    RevokedToken model representing a revoked access token, or every token of a user.
+    
+    Attributes:
+        id (int): Monotonic sequence number, used to refresh in-memory copies incrementally.
+        jti (str): The unique identifier of the revoked token, if a single token was revoked.
+        user_id (int): The ID of the user whose tokens issued up to revoked_at are revoked.
+        revoked_at (datetime): The UTC timestamp of the revocation.
+        expires_at (datetime): The UTC timestamp after which the entry is no longer needed.
+    """
+    __tablename__ = "revoked_token"
+
+    id: Mapped[int] = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
+    jti: Mapped[Optional[str]] = mapped_column(sa.String(36), unique=True, nullable=True)
+    user_id: Mapped[Optional[int]] = mapped_column(sa.Integer, nullable=True, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    expires_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the RevokedToken object.
+        
+        Returns:
+            str: A string representation of the RevokedToken object.
+        """
+        return f"RevokedToken(id={self.id!r}, jti={self.jti!r}, user_id={self.user_id!r})"
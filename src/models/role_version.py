@@ -0,0 +1,27 @@
+import sqlalchemy as sa
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.models.base import db
+
+class RoleVersion(db.Model):
+    """
+    RoleVersion model holding the single row that counts the changes of the role table.
+    
+    Attributes:
+        id (int): Always 1.
+        version (int): Incremented in the same transaction as every change to a role.
+    """
+    __tablename__ = "role_version"
+
+    id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the RoleVersion object.
+        
+        Returns:
+            str: A string representation of the RoleVersion object.
+        """
+        return f"RoleVersion(version={self.version!r})"
@@ -1,5 +1,7 @@
 import sqlalchemy as sa
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from datetime import datetime
+from typing import Optional
 
 from src.models.base import db
 
@@ -10,13 +12,17 @@ class User(db.Model):
     Attributes:
         id (int): The unique identifier for the user.
         username (str): The unique username for the user.
+        post_count (int): The number of posts authored by the user, maintained incrementally.
+        last_post_at (datetime): The creation time of the user's latest post.
     """
     id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
     username: Mapped[str] = mapped_column(sa.String, unique=True)
     password: Mapped[str] = mapped_column(sa.String, nullable=False)
     active: Mapped[bool] = mapped_column(sa.Boolean, default=True)
     role_id: Mapped[int] = mapped_column(sa.ForeignKey("role.id"))
-    role: Mapped["role.Role"] = relationship(back_populates="user")
+    role: Mapped["Role"] = relationship(back_populates="user")
+    post_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0, server_default="0")
+    last_post_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
 
     def __repr__(self) -> str:
         """
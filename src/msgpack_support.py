@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+
+from flask import Request, current_app, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MSGPACK_MIMETYPE = "application/msgpack"
+
+
+def _default(obj):
+    # Naive datetimes (e.g. Post.created) are stored in UTC by SQLite.
+    if isinstance(obj, datetime) and obj.tzinfo is None:
+        return obj.replace(tzinfo=timezone.utc)
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+
+def packb(obj):
+    """
+    Encode an object as MessagePack, with datetimes as native timestamps.
+    """
+    return msgpack.packb(obj, datetime=True, default=_default)
+
+
+def unpackb(data):
+    """
+    Decode MessagePack data, turning timestamps back into UTC datetimes.
+    """
+    return msgpack.unpackb(data, timestamp=3)
+
+
+def wants_msgpack():
+    """
+    Tell whether the current request prefers a MessagePack response.
+
+    JSON wins ties, so clients that send no Accept header, or ``*/*``, keep
+    getting JSON.
+    """
+    if msgpack is None or not has_request_context():
+        return False
+    best = request.accept_mimetypes.best_match(["application/json", MSGPACK_MIMETYPE])
+    return best == MSGPACK_MIMETYPE
+
+
+def _response_obj(args, kwargs):
+    # Same rules as jsonify: one positional argument is serialized as is, several
+    # become a list, and keyword arguments become a dict.
+    if args and kwargs:
+        raise TypeError("app.json.response() takes either args or kwargs, not both")
+    if not args and not kwargs:
+        return None
+    if len(args) == 1:
+        return args[0]
+    return args or kwargs
+
+
+class NegotiatingJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that answers in MessagePack when the client asks for it.
+
+    Every ``jsonify`` call and every dict returned by a view goes through
+    ``response``, so all blueprints get MessagePack support from the same
+    serializers that build their JSON.
+    """
+
+    def response(self, *args, **kwargs):
+        if not wants_msgpack():
+            response = super().response(*args, **kwargs)
+        else:
+            response = current_app.response_class(packb(_response_obj(args, kwargs)), mimetype=MSGPACK_MIMETYPE)
+        if msgpack is not None:
+            response.vary.add("Accept")
+        return response
+
+
+class MsgpackRequest(Request):
+    """
+    Request class that also decodes ``application/msgpack`` bodies in get_json.
+    """
+
+    # The decoded body, kept apart from the JSON cache of the base class.
+    _msgpack_body = Ellipsis
+
+    def get_json(self, force=False, silent=False, cache=True):
+        if msgpack is None or self.mimetype != MSGPACK_MIMETYPE:
+            return super().get_json(force=force, silent=silent, cache=cache)
+
+        if cache and self._msgpack_body is not Ellipsis:
+            return self._msgpack_body
+        try:
+            rv = unpackb(self.get_data(cache=cache))
+        except Exception as e:
+            if silent:
+                return None
+            return self.on_json_loading_failed(e)
+        if cache:
+            self._msgpack_body = rv
+        return rv
+
+
+def init_app(app):
+    """
+    Enable MessagePack request bodies and responses on the app.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.json = NegotiatingJSONProvider(app)
+    app.request_class = MsgpackRequest
@@ -0,0 +1,253 @@
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+
+SCRYPT = "scrypt"
+PBKDF2 = "pbkdf2_sha256"
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_dummy_hashes = {}
+
+
+class PasswordPoolSaturated(Exception):
+    """
+    Raised when the password hashing pool has no free slot for a new job.
+    """
+    pass
+
+
+def _settings():
+    """
+    Read the password hashing settings from the current app configuration.
+
+    Returns:
+        dict: The hashing method and its cost parameters.
+    """
+    config = current_app.config
+    return {
+        "method": config.get("PASSWORD_HASH_METHOD", SCRYPT),
+        "scrypt_n": config.get("PASSWORD_SCRYPT_N", 2 ** 14),
+        "scrypt_r": config.get("PASSWORD_SCRYPT_R", 8),
+        "scrypt_p": config.get("PASSWORD_SCRYPT_P", 1),
+        "pbkdf2_iterations": config.get("PASSWORD_PBKDF2_ITERATIONS", 600_000),
+    }
+
+
+def hash_password(password, method=SCRYPT, scrypt_n=2 ** 14, scrypt_r=8, scrypt_p=1,
+                  pbkdf2_iterations=600_000):
+    """
+    Hash a password with a salted key derivation function from the standard library.
+
+    The result embeds the method and its cost, so hashes made with older settings
+    can still be verified and detected by needs_rehash.
+
+    Args:
+        password (str): The plaintext password.
+        method (str): Either ``"scrypt"`` or ``"pbkdf2_sha256"``.
+
+    Returns:
+        str: The encoded hash, e.g. ``scrypt$16384$8$1$<salt>$<hash>``.
+    """
+    salt = os.urandom(16)
+    if method == SCRYPT and hasattr(hashlib, "scrypt"):
+        digest = hashlib.scrypt(password.encode(), salt=salt, n=scrypt_n, r=scrypt_r, p=scrypt_p,
+                                maxmem=256 * scrypt_n * scrypt_r)
+        return f"{SCRYPT}${scrypt_n}${scrypt_r}${scrypt_p}${salt.hex()}${digest.hex()}"
+
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, pbkdf2_iterations)
+    return f"{PBKDF2}${pbkdf2_iterations}${salt.hex()}${digest.hex()}"
+
+
+def is_hashed(stored):
+    """
+    Tell whether a stored password value is a hash produced by hash_password.
+
+    Args:
+        stored (str): The value of the password column.
+
+    Returns:
+        bool: False for legacy plaintext rows.
+    """
+    return stored.startswith((SCRYPT + "$", PBKDF2 + "$"))
+
+
+def verify_password(stored, password):
+    """
+    Check a plaintext password against a stored value.
+
+    Legacy plaintext values are compared in constant time so they keep working
+    until they are rehashed on the next successful login.
+
+    Args:
+        stored (str): The value of the password column.
+        password (str): The plaintext password to check.
+
+    Returns:
+        bool: True if the password matches.
+    """
+    if not is_hashed(stored):
+        return hmac.compare_digest(stored.encode(), password.encode())
+
+    method, *params = stored.split("$")
+    if method == SCRYPT:
+        n, r, p, salt, expected = params
+        n, r, p = int(n), int(r), int(p)
+        digest = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=n, r=r, p=p,
+                                maxmem=256 * n * r)
+    else:
+        iterations, salt, expected = params
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+def needs_rehash(stored):
+    """
+    Tell whether a stored value should be replaced with a hash using the current settings.
+
+    Args:
+        stored (str): The value of the password column.
+
+    Returns:
+        bool: True for plaintext rows and for hashes made with another method or cost.
+    """
+    if not is_hashed(stored):
+        return True
+
+    settings = _settings()
+    method, *params = stored.split("$")
+    if settings["method"] == SCRYPT and hasattr(hashlib, "scrypt"):
+        expected = [str(settings["scrypt_n"]), str(settings["scrypt_r"]), str(settings["scrypt_p"])]
+        return method != SCRYPT or params[:3] != expected
+    return method != PBKDF2 or params[0] != str(settings["pbkdf2_iterations"])
+
+
+def dummy_password():
+    """
+    Return a hash made with the current settings for a password nobody knows.
+
+    Logins with an unknown username are checked against it, so they cost as much as
+    a wrong password and the response time does not tell which usernames exist. It
+    is computed once per setting.
+
+    Returns:
+        str: The encoded hash.
+    """
+    settings = _settings()
+    key = tuple(sorted(settings.items()))
+    stored = _dummy_hashes.get(key)
+    if stored is None:
+        stored = _dummy_hashes[key] = hash_password(os.urandom(16).hex(), **settings)
+    return stored
+
+
+def _get_pool():
+    """
+    Return the process pool used for hashing, creating it on first use.
+
+    ``PASSWORD_POOL_WORKERS`` defaults to the number of CPUs. The pool and its
+    ``PASSWORD_POOL_MAX_PENDING`` queue bound the hashing work of the process, so a
+    burst of logins is shed instead of holding up every request thread. Each server
+    worker that hashes a password starts its own pool; set the option to 0 to hash
+    inline on the request threads, with no bound and no 503.
+
+    Returns:
+        tuple: The executor (or None when hashing runs inline) and its slot semaphore.
+    """
+    global _pool, _pool_slots
+    workers = current_app.config.get("PASSWORD_POOL_WORKERS", os.cpu_count() or 1)
+    if workers <= 0:
+        return None, None
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_slots = threading.BoundedSemaphore(
+                workers + current_app.config.get("PASSWORD_POOL_MAX_PENDING", workers))
+    return _pool, _pool_slots
+
+
+def _forget_pool():
+    # A forked child inherits the parent's executor, but not its management thread
+    # or worker processes, so it must start its own pool.
+    global _pool, _pool_slots, _pool_lock
+    _pool = None
+    _pool_slots = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_pool)
+
+
+def _run(fn, *args, **kwargs):
+    """
+    Run a CPU bound hashing function in the bounded process pool.
+
+    Raises:
+        PasswordPoolSaturated: If every slot of the pool is taken.
+    """
+    pool, slots = _get_pool()
+    if pool is None:
+        return fn(*args, **kwargs)
+
+    if not slots.acquire(blocking=False):
+        raise PasswordPoolSaturated()
+    try:
+        future = pool.submit(fn, *args, **kwargs)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result(timeout=current_app.config.get("PASSWORD_POOL_TIMEOUT", 10))
+
+
+def make_password(password):
+    """
+    Hash a password with the configured method and cost.
+
+    Args:
+        password (str): The plaintext password.
+
+    Returns:
+        str: The encoded hash.
+
+    Raises:
+        PasswordPoolSaturated: If the hashing pool is saturated.
+    """
+    return _run(hash_password, password, **_settings())
+
+
+def check_password(stored, password):
+    """
+    Verify a password against a stored value off the request thread.
+
+    Args:
+        stored (str): The value of the password column.
+        password (str): The plaintext password to check.
+
+    Returns:
+        bool: True if the password matches.
+
+    Raises:
+        PasswordPoolSaturated: If the hashing pool is saturated.
+    """
+    if not is_hashed(stored):
+        return verify_password(stored, password)
+    return _run(verify_password, stored, password)
+
+
+def shutdown_pool():
+    """
+    Shut down the hashing pool, if one was started.
+    """
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_slots = None
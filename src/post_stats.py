@@ -0,0 +1,203 @@
+import click
+import sqlalchemy as sa
+from flask.cli import with_appcontext
+
+from src.models import db, User
+from src import sharding
+
+
+def record_post_created(author_id, created, count=1):
+    """
+    Update the counters of an author after posts were created. The caller is
+    responsible for committing the session.
+
+    Args:
+        author_id (int): The ID of the author.
+        created (datetime): The creation time of the newest of the new posts.
+        count (int): The number of posts created.
+    """
+    db.session.execute(
+        sa.update(User)
+        .where(User.id == int(author_id))
+        .values(
+            post_count=User.post_count + count,
+            last_post_at=sa.case(
+                (User.last_post_at.is_(None) | (User.last_post_at < created), created),
+                else_=User.last_post_at,
+            ),
+        )
+    )
+
+
+def post_count_expression(author_id):
+    """
+    Return a SQL expression counting the posts of ``author_id`` in the post table
+    and the archive. The shards are not attached to the main database, so their
+    posts are not included.
+
+    Args:
+        author_id: The author ID, as a value or a column.
+    """
+    counts = [
+        sa.select(sa.func.count()).where(table.c.author_id == author_id).scalar_subquery()
+        for table in sharding.post_tables()
+    ]
+    total = counts[0]
+    for count in counts[1:]:
+        total = total + count
+    return total
+
+
+def latest_post_expression(author_id):
+    """
+    Return a SQL expression for the creation time of the newest post of
+    ``author_id`` in the post table and the archive, or NULL. The shards are not
+    attached to the main database, so their posts are not included.
+
+    Args:
+        author_id: The author ID, as a value or a column.
+    """
+    latest = [
+        sa.select(sa.func.max(table.c.created)).where(table.c.author_id == author_id).scalar_subquery()
+        for table in sharding.post_tables()
+    ]
+    if len(latest) == 1:
+        return latest[0]
+    # SQLite's scalar max() is NULL as soon as one argument is, so tables without
+    # a post of the author are counted as the empty string, which sorts first.
+    return sa.func.nullif(sa.func.max(*(sa.func.coalesce(value, "") for value in latest)), "")
+
+
+def record_post_count(author_id, count, last_post_at):
+    """
+    Add ``count`` to the post counter of an author and set last_post_at, after
+    posts of theirs were deleted or given to another author. The caller is
+    responsible for committing the session.
+
+    Args:
+        author_id (int): The ID of the author.
+        count (int): The change of the number of posts of the author.
+        last_post_at: The creation time of the newest post of the author, as a value
+            or a SQL expression, or None.
+    """
+    db.session.execute(
+        sa.update(User)
+        .where(User.id == int(author_id))
+        .values(post_count=User.post_count + count, last_post_at=last_post_at)
+    )
+
+
+def latest_posts(author_ids):
+    """
+    Return the creation time of the newest post of each author in the post table,
+    the shards and the archive, keyed by author ID. Authors without a post are left
+    out.
+
+    Args:
+        author_ids (iterable): The IDs of the authors.
+    """
+    author_ids = [int(author_id) for author_id in author_ids]
+    rows = []
+    for table in sharding.post_tables():
+        rows.extend(db.session.execute(
+            sa.select(table.c.author_id, sa.func.max(table.c.created))
+            .where(table.c.author_id.in_(author_ids))
+            .group_by(table.c.author_id)
+        ).all())
+    router = sharding.get_router()
+    if router is not None:
+        rows.extend(router.latest_posts(author_ids).items())
+    latest = {}
+    for author_id, created in rows:
+        if created is not None and (author_id not in latest or created > latest[author_id]):
+            latest[author_id] = created
+    return latest
+
+
+def record_post_deleted(author_id):
+    """
+    Update the counters of an author after one of their posts was deleted. The
+    caller is responsible for committing the session, and must have flushed the
+    deletion first.
+
+    last_post_at is recomputed with one (author_id, created) index lookup per table
+    that holds posts.
+
+    Args:
+        author_id (int): The ID of the author.
+    """
+    author_id = int(author_id)
+    if sharding.get_router() is None:
+        latest = latest_post_expression(author_id)
+    else:
+        # The shards are not attached to the main database, so the newest post is
+        # looked up in each of them.
+        latest = latest_posts([author_id]).get(author_id)
+    record_post_count(author_id, -1, latest)
+
+
+def reconcile_post_stats():
+    """
+    Recompute post_count and last_post_at of every user from the post table, the
+    shards and the archive.
+
+    Returns:
+        int: The number of users whose counters had drifted.
+    """
+    router = sharding.get_router()
+    if router is not None:
+        return _reconcile_sharded(router)
+    count = post_count_expression(User.id)
+    latest = latest_post_expression(User.id)
+    drifted = db.session.execute(
+        sa.update(User)
+        .where((User.post_count != count) | (User.last_post_at.is_distinct_from(latest)))
+        .values(post_count=count, last_post_at=latest)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return drifted
+
+
+def _reconcile_sharded(router):
+    # The shards are not attached, so the posts are counted per table and merged
+    # here. The events not applied yet are taken out of the shard counts, since
+    # applying them afterwards changes the counters again.
+    def per_author(table):
+        return sa.select(table.c.author_id, sa.func.count(), sa.func.max(table.c.created)).group_by(table.c.author_id)
+
+    rows, pending = [], []
+    for shard_rows, events in router.snapshot(per_author(sharding.post)):
+        rows.extend(shard_rows)
+        pending.extend(events)
+    for table in sharding.post_tables():
+        rows.extend(db.session.execute(per_author(table)).all())
+
+    counts, latest = {}, {}
+    for author_id, count, created in rows:
+        counts[author_id] = counts.get(author_id, 0) + count
+        if created is not None and (author_id not in latest or created > latest[author_id]):
+            latest[author_id] = created
+    for author_id, count in sharding.event_counts(pending)[0].items():
+        counts[author_id] = counts.get(author_id, 0) - count
+
+    drifted = [
+        {"id": user_id, "post_count": counts.get(user_id, 0), "last_post_at": latest.get(user_id)}
+        for user_id, post_count, last_post_at in db.session.execute(
+            sa.select(User.id, User.post_count, User.last_post_at)).all()
+        if (post_count, last_post_at) != (counts.get(user_id, 0), latest.get(user_id))
+    ]
+    if drifted:
+        db.session.execute(sa.update(User), drifted)
+    db.session.commit()
+    return len(drifted)
+
+
+@click.command('reconcile-post-stats')
+@with_appcontext
+def reconcile_post_stats_command():
+    """
+    Repair drift in the per-author post counters.
+    """
+    drifted = reconcile_post_stats()
+    click.echo(f"Reconciled post stats, {drifted} user(s) fixed.")
@@ -0,0 +1,210 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+from src.models import db, PostDailySummary
+from src import sharding
+
+
+def body_bytes(body):
+    """
+    Return the size of a post body in UTF-8 bytes.
+    """
+    return len(body.encode())
+
+
+def _day(created):
+    if isinstance(created, str):
+        created = datetime.fromisoformat(created)
+    return created.date() if isinstance(created, datetime) else created
+
+
+def record_summary(deltas):
+    """
+    Apply count and size changes to the daily summary with upserts. The caller is
+    responsible for committing the session.
+
+    Args:
+        deltas (iterable): ``(created, author_id, count, bytes)`` changes, merged per day.
+    """
+    merged = defaultdict(lambda: [0, 0])
+    for created, author_id, count, size in deltas:
+        entry = merged[(_day(created), int(author_id))]
+        entry[0] += count
+        entry[1] += size
+
+    table = PostDailySummary.__table__
+    for (day, author_id), (count, size) in merged.items():
+        if not count and not size:
+            continue
+        stmt = sqlite_insert(table).values(day=day, author_id=author_id, count=count, total_bytes=size)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.author_id],
+            set_={
+                "count": table.c.count + stmt.excluded.count,
+                "total_bytes": table.c.total_bytes + stmt.excluded.total_bytes,
+            },
+        ))
+    # Only the rows that were just decremented can have dropped to zero.
+    emptied = [key for key, (count, _) in merged.items() if count < 0]
+    if emptied:
+        db.session.execute(
+            sa.delete(table)
+            .where(sa.tuple_(table.c.day, table.c.author_id).in_(emptied))
+            .where(table.c.count <= 0)
+        )
+
+
+def _summary_query(table):
+    return (
+        sa.select(
+            sa.func.date(table.c.created),
+            table.c.author_id,
+            sa.func.count(),
+            sa.func.sum(sa.func.length(sa.cast(table.c.body, sa.LargeBinary))),
+        )
+        .where(table.c.created.is_not(None))
+        .group_by(sa.func.date(table.c.created), table.c.author_id)
+    )
+
+
+def _chunk_query(table, low, high):
+    return _summary_query(table).where(table.c.id >= low, table.c.id < high)
+
+
+def _summarize_chunk(app, table, low, high):
+    with app.app_context():
+        try:
+            rows = db.session.execute(_chunk_query(table, low, high)).all()
+        finally:
+            db.session.remove()
+    return rows
+
+
+def rebuild_summaries(workers=4, chunk_size=100_000):
+    """
+    Rebuild the daily summary from the post table, the shards and the archive.
+
+    The post ID range of each table of the main database is split into chunks that
+    are aggregated by SQLite in parallel threads, each with its own connection. Each
+    shard is aggregated in one query, and the shards in parallel. The partial
+    results are merged and written in a single transaction.
+
+    The summary table is emptied before the posts are read, which takes the
+    database write lock until the commit. Writers wait until the rebuild is done,
+    so no post is created or deleted between the read and the write, and no
+    update to the summary is lost. Writes to the shards go on, and their events
+    are applied once the rebuild is committed, so they are taken out of the shard
+    totals.
+
+    Args:
+        workers (int): The number of chunks aggregated at once.
+        chunk_size (int): The number of post IDs per chunk.
+
+    Returns:
+        int: The number of summary rows written.
+    """
+    db.session.execute(sa.delete(PostDailySummary))
+    chunks = []
+    for table in sharding.post_tables():
+        low, high = db.session.execute(sa.select(sa.func.min(table.c.id), sa.func.max(table.c.id))).one()
+        if low is not None:
+            chunks.extend((table, start, start + chunk_size) for start in range(low, high + 1, chunk_size))
+
+    results, pending = [], []
+    router = sharding.get_router()
+    if router is not None:
+        for rows, events in router.snapshot(_summary_query(sharding.post)):
+            results.append(rows)
+            pending.extend(events)
+    if chunks:
+        app = current_app._get_current_object()
+        if isinstance(db.engine.pool, (StaticPool, SingletonThreadPool)):
+            # An in-memory database has a single connection, which holds the
+            # uncommitted delete above, so its chunks are read in this session.
+            results.extend(db.session.execute(_chunk_query(*chunk)).all() for chunk in chunks)
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                results.extend(pool.map(lambda chunk: _summarize_chunk(app, *chunk), chunks))
+
+    totals = defaultdict(lambda: [0, 0])
+    for rows in results:
+        for day, author_id, count, size in rows:
+            entry = totals[(date.fromisoformat(day), author_id)]
+            entry[0] += count
+            entry[1] += size or 0
+    for event in pending:
+        for created, author_id, count, size in sharding.event_deltas(event):
+            entry = totals[(_day(created), author_id)]
+            entry[0] -= count
+            entry[1] -= size
+    totals = {key: value for key, value in totals.items() if value[0] > 0}
+
+    if totals:
+        db.session.execute(sa.insert(PostDailySummary), [
+            {"day": day, "author_id": author_id, "count": count, "total_bytes": size}
+            for (day, author_id), (count, size) in totals.items()
+        ])
+    db.session.commit()
+    return len(totals)
+
+
+def summary_stats(start=None, end=None, author_id=None):
+    """
+    Read post counts and sizes for a range of days from the summary table.
+
+    Args:
+        start (date, optional): The first day of the range.
+        end (date, optional): The last day of the range (inclusive).
+        author_id (int, optional): Restrict the stats to one author.
+
+    Returns:
+        dict: Totals per day, per author and for the whole range.
+    """
+    conditions = []
+    if start is not None:
+        conditions.append(PostDailySummary.day >= start)
+    if end is not None:
+        conditions.append(PostDailySummary.day <= end)
+    if author_id is not None:
+        conditions.append(PostDailySummary.author_id == author_id)
+
+    def grouped(column):
+        return db.session.execute(
+            sa.select(column, sa.func.sum(PostDailySummary.count), sa.func.sum(PostDailySummary.total_bytes))
+            .where(*conditions)
+            .group_by(column)
+            .order_by(column)
+        ).all()
+
+    days = grouped(PostDailySummary.day)
+    authors = grouped(PostDailySummary.author_id)
+    return {
+        "from": start.isoformat() if start else None,
+        "to": end.isoformat() if end else None,
+        "days": [{"day": day.isoformat(), "count": count, "total_bytes": size} for day, count, size in days],
+        "authors": [{"author_id": author, "count": count, "total_bytes": size} for author, count, size in authors],
+        "total": {
+            "count": sum(count for _, count, _ in days),
+            "total_bytes": sum(size for _, _, size in days),
+        },
+    }
+
+
+@click.command('rebuild-summaries')
+@click.option('--workers', default=4, show_default=True, help='Chunks aggregated in parallel.')
+@click.option('--chunk-size', default=100_000, show_default=True, help='Post IDs per chunk.')
+@with_appcontext
+def rebuild_summaries_command(workers, chunk_size):
+    """
+    Rebuild the post_daily_summary table from the post tables.
+    """
+    rows = rebuild_summaries(workers=workers, chunk_size=chunk_size)
+    click.echo(f"Rebuilt post_daily_summary, {rows} row(s) written.")
@@ -0,0 +1,263 @@
+import cProfile
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+from collections import defaultdict
+
+import click
+from flask import current_app, g, request
+from flask.cli import with_appcontext
+
+FILENAME = re.compile(r"^(?P<endpoint>.+)__(?P<stamp>\d+)-(?P<pid>\d+)-(?P<samples>\d+)\.prof$")
+
+
+class ProfileStore:
+    """
+    Aggregates the profiles of sampled requests per endpoint and writes them to disk.
+
+    The stats of each endpoint are merged in memory and written as one pstats file
+    every ``flush_every`` samples (or ``flush_interval`` seconds), so the overhead
+    on disk is one file per batch instead of one per request. Only the newest
+    ``max_files`` files are kept.
+
+    ``active`` is held while a request is profiled. Since Python 3.12 a profiler
+    sees every thread of the process, and only one can be enabled at a time, so at
+    most one request per process is profiled.
+    """
+
+    def __init__(self, directory, flush_every=20, flush_interval=60.0, max_files=200):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_files = max_files
+        self.active = threading.Lock()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, profiler, flush=False):
+        """
+        Add the profile of one request.
+
+        Args:
+            endpoint (str): The endpoint of the request.
+            profiler (cProfile.Profile): The disabled profiler.
+            flush (bool): Write the endpoint's stats right away.
+        """
+        with self._lock:
+            stats, samples, started = self._pending.get(endpoint) or (None, 0, time.monotonic())
+            if stats is None:
+                stats = pstats.Stats(profiler)
+            else:
+                stats.add(profiler)
+            samples += 1
+            if flush or samples >= self.flush_every or time.monotonic() - started >= self.flush_interval:
+                self._pending.pop(endpoint, None)
+            else:
+                self._pending[endpoint] = (stats, samples, started)
+                return None
+        return self._write(endpoint, stats, samples)
+
+    def flush(self):
+        """
+        Write the stats of every endpoint that has pending samples.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for endpoint, (stats, samples, _) in pending.items():
+            self._write(endpoint, stats, samples)
+
+    def forget_pending(self):
+        """
+        Drop the samples inherited from the parent, in a forked child.
+        """
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.active = threading.Lock()
+
+    def _write(self, endpoint, stats, samples):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(
+            self.directory, f"{endpoint}__{time.time_ns()}-{os.getpid()}-{samples}.prof")
+        stats.dump_stats(path)
+        self._prune()
+        return path
+
+    def _prune(self):
+        files = list_profiles(self.directory)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(directory):
+    """
+    Return the profile files of a directory, oldest first.
+    """
+    try:
+        names = [name for name in os.listdir(directory) if FILENAME.match(name)]
+    except FileNotFoundError:
+        return []
+    names.sort(key=lambda name: int(FILENAME.match(name)["stamp"]))
+    return [os.path.join(directory, name) for name in names]
+
+
+def _should_profile(app):
+    header = app.config.get("PROFILE_HEADER")
+    if header and header in request.headers:
+        return True
+    if request.endpoint in app.config.get("PROFILE_ENDPOINTS", ()):
+        return True
+    rate = app.config.get("PROFILE_SAMPLE_RATE", 0)
+    return rate > 0 and next(app.extensions["profile_counter"]) % rate == 0
+
+
+def _profile_directory(app):
+    return app.config.get("PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+
+
+def init_app(app):
+    """
+    Profile a sample of the requests with cProfile when ``PROFILING`` is enabled.
+
+    A request is profiled if it carries the ``PROFILE_HEADER`` header, if its
+    endpoint is listed in ``PROFILE_ENDPOINTS``, or if it is one in
+    ``PROFILE_SAMPLE_RATE`` requests. Stats are written under ``PROFILE_DIR``
+    (``instance/profiles`` by default). Requests profiled on demand through the
+    header are written right away.
+
+    At most one request per process is profiled at a time; requests selected while
+    another one is profiled are not. Errors of the profiler are logged and never
+    fail the request.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    if not app.config.get("PROFILING"):
+        return
+    app.extensions["profile_counter"] = itertools.count(1)
+    app.extensions["profile_store"] = ProfileStore(
+        _profile_directory(app),
+        flush_every=app.config.get("PROFILE_FLUSH_EVERY", 20),
+        flush_interval=app.config.get("PROFILE_FLUSH_INTERVAL", 60.0),
+        max_files=app.config.get("PROFILE_MAX_FILES", 200),
+    )
+
+    @app.before_request
+    def start_profiler():
+        if not _should_profile(app):
+            return
+        store = app.extensions["profile_store"]
+        # Skipped rather than waited for while another request is profiled.
+        if not store.active.acquire(blocking=False):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except Exception:
+            # E.g. another profiler or debugger is already active in the process.
+            store.active.release()
+            app.logger.warning("Could not start the request profiler", exc_info=True)
+            return
+        g._profiler = profiler
+
+    @app.teardown_request
+    def stop_profiler(exc=None):
+        profiler = g.pop("_profiler", None)
+        if profiler is None:
+            return
+        store = app.extensions["profile_store"]
+        try:
+            profiler.disable()
+            header = app.config.get("PROFILE_HEADER")
+            store.add(request.endpoint or "unmatched", profiler, flush=bool(header and header in request.headers))
+        except Exception:
+            # Profiling must never fail the request.
+            app.logger.exception("Could not save the request profile")
+        finally:
+            store.active.release()
+
+
+def _function_name(key):
+    filename, line, function = key
+    if filename == "~":
+        return function
+    return f"{function} ({_short_path(filename)}:{line})"
+
+
+def _short_path(filename):
+    parts = filename.replace(os.sep, "/").split("/")
+    for marker in ("site-packages", "src"):
+        if marker in parts:
+            return "/".join(parts[parts.index(marker) + (marker == "site-packages"):])
+    return "/".join(parts[-2:])
+
+
+def top_functions(paths, limit=15, sort="tottime"):
+    """
+    Merge profile files per endpoint and list their hottest functions.
+
+    Args:
+        paths (list): The profile files.
+        limit (int): The number of functions per endpoint.
+        sort (str): ``"tottime"`` (own time) or ``"cumtime"`` (including callees).
+
+    Returns:
+        dict: Maps each endpoint to its number of samples and its hottest
+        ``(function, calls, tottime, cumtime)`` rows.
+    """
+    by_endpoint = defaultdict(list)
+    for path in paths:
+        match = FILENAME.match(os.path.basename(path))
+        by_endpoint[match["endpoint"]].append((path, int(match["samples"])))
+
+    report = {}
+    index = 3 if sort == "cumtime" else 2
+    for endpoint, files in sorted(by_endpoint.items()):
+        stats = pstats.Stats(*(path for path, _ in files)).stats
+        rows = sorted(
+            ((_function_name(key), calls, tottime, cumtime) for key, (_, calls, tottime, cumtime, _) in stats.items()),
+            key=lambda row: row[index], reverse=True,
+        )
+        report[endpoint] = {"samples": sum(samples for _, samples in files), "functions": rows[:limit]}
+    return report
+
+
+@click.group('profiles')
+def profiles_command():
+    """
+    Inspect the request profiles written by the sampling profiler.
+    """
+
+
+@profiles_command.command('top')
+@click.option('--endpoint', help='Only report this endpoint, e.g. post.get_post.')
+@click.option('--limit', default=15, show_default=True, help='Functions shown per endpoint.')
+@click.option('--sort', type=click.Choice(['tottime', 'cumtime']), default='tottime', show_default=True)
+@with_appcontext
+def profiles_top_command(endpoint, limit, sort):
+    """
+    Merge the profile files and print the hottest functions of each route.
+    """
+    report = top_functions(list_profiles(_profile_directory(current_app)), limit=limit, sort=sort)
+    if endpoint is not None:
+        report = {name: entry for name, entry in report.items() if name == endpoint}
+    if not report:
+        click.echo("No profiles found.")
+        return
+
+    rules = defaultdict(list)
+    for rule in current_app.url_map.iter_rules():
+        methods = ",".join(sorted(rule.methods - {"HEAD", "OPTIONS"}))
+        rules[rule.endpoint].append(f"{methods} {rule.rule}")
+
+    for name, entry in report.items():
+        click.echo(f"{name}  [{'; '.join(rules.get(name, ['?']))}]  {entry['samples']} sample(s)")
+        click.echo(f"  {'tottime':>9} {'cumtime':>9} {'calls':>8}  function")
+        for function, calls, tottime, cumtime in entry["functions"]:
+            click.echo(f"  {tottime:9.4f} {cumtime:9.4f} {calls:8d}  {function}")
+        click.echo()
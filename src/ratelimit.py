@@ -0,0 +1,191 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+
+from flask import request
+
+
+class MemoryBackend:
+    """
+    In-process token buckets, one per key, kept in a bounded LRU.
+
+    Each bucket stores only its token count and the time of its last update, so a
+    check is O(1) and memory is bounded by ``maxsize`` buckets. Buckets that have
+    not been used recently are evicted first; an evicted bucket simply starts full.
+    """
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, rate, burst):
+        """
+        Take one token from the bucket of ``key``.
+
+        Args:
+            key (str): The bucket key.
+            rate (float): Tokens added per second.
+            burst (int): The bucket capacity.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise the seconds until a token is available.
+        """
+        return self.hit_many([(key, rate, burst)])
+
+    def hit_many(self, limits):
+        """
+        Take one token from each of several buckets, or from none of them.
+
+        Every bucket is checked before any is charged, so a request denied by one
+        limit does not use up the others.
+
+        Args:
+            limits (list): ``(key, rate, burst)`` triples.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise the seconds until every bucket has a token.
+        """
+        now = time.monotonic()
+        with self._lock:
+            refilled = []
+            retry_after = 0
+            for key, rate, burst in limits:
+                tokens, updated = self._buckets.pop(key, (burst, now))
+                tokens = min(burst, tokens + (now - updated) * rate)
+                if tokens < 1:
+                    retry_after = max(retry_after, (1 - tokens) / rate)
+                refilled.append((key, tokens))
+            for key, tokens in refilled:
+                self._buckets[key] = (tokens if retry_after else tokens - 1, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class RedisBackend:
+    """
+    Token buckets shared by every process through Redis.
+
+    Requires the optional ``redis`` package. The bucket update runs as a Lua script,
+    so it is atomic across processes.
+    """
+
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local refilled = {}
+    local retry_after = 0
+    for i, key in ipairs(KEYS) do
+        local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+        local tokens = tonumber(redis.call('HGET', key, 'tokens') or burst)
+        local updated = tonumber(redis.call('HGET', key, 'updated') or now)
+        tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+        if tokens < 1 then retry_after = math.max(retry_after, (1 - tokens) / rate) end
+        refilled[i] = tokens
+    end
+    for i, key in ipairs(KEYS) do
+        local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+        local tokens = refilled[i]
+        if retry_after == 0 then tokens = tokens - 1 end
+        redis.call('HSET', key, 'tokens', tokens, 'updated', now)
+        redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+    end
+    return tostring(retry_after)
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def hit(self, key, rate, burst):
+        return self.hit_many([(key, rate, burst)])
+
+    def hit_many(self, limits):
+        keys = [f"ratelimit:{key}" for key, _, _ in limits]
+        args = [time.time()]
+        for _, rate, burst in limits:
+            args.extend((rate, burst))
+        return float(self._script(keys=keys, args=args))
+
+
+def _client_key():
+    return request.remote_addr or "unknown"
+
+
+def _username_key():
+    # Per client as well, so failed logins from one address cannot lock the user
+    # out from every other address.
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and isinstance(data.get("username"), str):
+        return f"{_client_key()}:{data['username']}"
+    return None
+
+
+KEY_FUNCTIONS = {
+    "client": _client_key,
+    "username": _username_key,
+}
+
+
+def _validate(limits):
+    for blueprint, key_limits in limits.items():
+        for key_type, (rate, burst) in key_limits.items():
+            if key_type not in KEY_FUNCTIONS:
+                raise ValueError(f"Unknown rate limit key type {key_type!r} for {blueprint!r}")
+            if not rate > 0 or not burst >= 1:
+                raise ValueError(
+                    f"Rate limit {blueprint}.{key_type} needs a positive rate and a burst of at least 1")
+
+
+def init_app(app):
+    """
+    Register the rate limiter on the app.
+
+    Limits are read from ``RATELIMITS``, a mapping of blueprint name to a mapping of
+    key type (``"client"`` or ``"username"``) to a ``(rate_per_second, burst)`` pair,
+    for example ``{"auth": {"client": (5, 20), "username": (0.2, 5)}}``. When
+    ``RATELIMIT_STORAGE_URL`` is set, buckets are shared through Redis. A request
+    is charged to all of its buckets only when each of them allows it.
+
+    The ``"username"`` bucket is kept per username and client address. Keyed by
+    the username alone, it would also slow down guesses spread over many addresses,
+    but anyone could then keep a user locked out from anywhere with a few bad logins
+    per minute. Keyed per client, a lockout only affects the sender's own address,
+    and guesses from many addresses are bounded by each address's ``"client"`` limit.
+
+    Args:
+        app (Flask): The Flask application.
+
+    Raises:
+        ValueError: If a limit has a rate that is not positive or a burst below 1.
+    """
+    if not app.config.get("RATELIMIT_ENABLED", True):
+        return
+    _validate(app.config.get("RATELIMITS", {}))
+
+    storage_url = app.config.get("RATELIMIT_STORAGE_URL")
+    backend = RedisBackend(storage_url) if storage_url else MemoryBackend(
+        app.config.get("RATELIMIT_MAX_KEYS", 100_000))
+    app.extensions["ratelimit"] = backend
+
+    @app.before_request
+    def check_rate_limit():
+        limits = app.config.get("RATELIMITS", {}).get(request.blueprint)
+        if not limits:
+            return None
+
+        buckets = []
+        for key_type, (rate, burst) in limits.items():
+            key = KEY_FUNCTIONS[key_type]()
+            if key is not None:
+                buckets.append((f"{request.blueprint}:{key_type}:{key}", rate, burst))
+        retry_after = app.extensions["ratelimit"].hit_many(buckets) if buckets else 0
+
+        if retry_after:
+            return ({"error": "Too many requests"}, HTTPStatus.TOO_MANY_REQUESTS,
+                    {"Retry-After": str(math.ceil(retry_after))})
+        return None
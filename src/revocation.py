@@ -0,0 +1,322 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from src.models import db, RevokedToken, RefreshTokenFamily
+from src.utils import utcnow
+
+
+def _epoch(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _expiry(value):
+    return _epoch(value) if value is not None else float("inf")
+
+
+# A detached copy of a revoked_token row, safe to read after its session expired it.
+RevokedEntry = namedtuple("RevokedEntry", ["id", "jti", "user_id", "revoked_at", "expires_at"])
+
+
+class RevocationStore:
+    """
+    In-memory copy of the revoked_token table used by the JWT blocklist loader.
+
+    Checking a token only reads two dicts, so the request path never touches the
+    database. The copy is loaded at startup and refreshed incrementally by sequence
+    number, either in the background or after local revocations. Entries whose
+    tokens have all expired are dropped on every refresh.
+
+    Attributes:
+        jtis (dict): The identifiers of individually revoked tokens, to the epoch
+            time at which the token expires.
+        users (dict): User ID to a ``(revoked_at, expires_at)`` pair of epoch times:
+            the user's tokens issued up to revoked_at are revoked, and all of them
+            have expired by expires_at.
+        last_id (int): The highest revoked_token.id seen so far.
+        loaded (bool): Whether the table was loaded at least once. Until it is, no
+            token can be trusted.
+    """
+
+    def __init__(self):
+        self.jtis = {}
+        self.users = {}
+        self.last_id = 0
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def add(self, row):
+        """
+        Record a revoked_token row in memory.
+        """
+        expires_at = _expiry(row.expires_at)
+        with self._lock:
+            if row.jti is not None:
+                self.jtis[row.jti] = max(self.jtis.get(row.jti, 0), expires_at)
+            if row.user_id is not None:
+                revoked_at, expires = self.users.get(row.user_id, (0, 0))
+                self.users[row.user_id] = (max(revoked_at, _epoch(row.revoked_at)), max(expires, expires_at))
+            if row.id is not None:
+                self.last_id = max(self.last_id, row.id)
+
+    def prune(self, now=None):
+        """
+        Drop the entries whose tokens have all expired.
+
+        Args:
+            now (float, optional): The current epoch time.
+
+        Returns:
+            int: The number of entries dropped.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            jtis = {jti: expires for jti, expires in self.jtis.items() if expires > now}
+            users = {user: entry for user, entry in self.users.items() if entry[1] > now}
+            dropped = len(self.jtis) - len(jtis) + len(self.users) - len(users)
+            # Swapped rather than mutated, so is_revoked() never sees a dict being resized.
+            self.jtis, self.users = jtis, users
+        return dropped
+
+    def refresh(self):
+        """
+        Load the rows added since the last refresh, skipping expired entries.
+
+        Returns:
+            int: The number of rows loaded.
+        """
+        query = (
+            db.select(RevokedToken)
+            .where(RevokedToken.id > self.last_id)
+            .where((RevokedToken.expires_at.is_(None)) | (RevokedToken.expires_at > utcnow()))
+            .order_by(RevokedToken.id)
+        )
+        rows = db.session.execute(query).scalars().all()
+        for row in rows:
+            self.add(row)
+        self.prune()
+        self.loaded = True
+        return len(rows)
+
+    def load(self, attempts=1, delay=0.5):
+        """
+        Refresh the store, retrying when the database cannot be read. Must be called
+        within an app context.
+
+        Args:
+            attempts (int): The number of tries.
+            delay (float): Seconds to wait before the second try, doubled after each one.
+
+        Returns:
+            bool: True if the store was refreshed.
+        """
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(delay * 2 ** (attempt - 1))
+            try:
+                self.refresh()
+                return True
+            except OperationalError:
+                db.session.rollback()
+        current_app.logger.error("Could not load the token revocation store")
+        return False
+
+    def is_revoked(self, jwt_payload):
+        """
+        Tell whether a decoded token has been revoked.
+
+        Args:
+            jwt_payload (dict): The decoded claims of the token.
+
+        Returns:
+            bool: True if the token, or every token of its user, was revoked.
+        """
+        if jwt_payload.get("jti") in self.jtis:
+            return True
+        entry = self.users.get(_user_key(jwt_payload.get("sub")))
+        return entry is not None and jwt_payload.get("iat", 0) <= entry[0]
+
+    def start(self, app, interval):
+        """
+        Refresh the store every ``interval`` seconds in a daemon thread, so revocations
+        made by other processes are picked up.
+        """
+        if interval <= 0 or self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                with app.app_context():
+                    try:
+                        self.refresh()
+                    except OperationalError:
+                        app.logger.warning("Could not refresh the token revocation store")
+                    finally:
+                        db.session.remove()
+
+        self._thread = threading.Thread(target=run, name="revocation-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def _user_key(sub):
+    try:
+        return int(sub)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_store():
+    """
+    Return the revocation store of the current app.
+    """
+    return current_app.extensions["revocation_store"]
+
+
+def _track(row):
+    # The in-memory store only learns about the row once it is committed, so a
+    # rolled back revocation never rejects tokens that are still valid.
+    db.session.add(row)
+    db.session.info.setdefault("revoked_rows", []).append(row)
+
+
+def _snapshot_revocations(session, flush_context):
+    rows = session.info.pop("revoked_rows", None)
+    if rows:
+        session.info.setdefault("revoked_entries", []).extend(
+            RevokedEntry(row.id, row.jti, row.user_id, row.revoked_at, row.expires_at) for row in rows)
+
+
+def _revocations_committed(session):
+    entries = session.info.pop("revoked_entries", None)
+    if entries and has_app_context():
+        store = current_app.extensions.get("revocation_store")
+        if store is not None:
+            for entry in entries:
+                store.add(entry)
+
+
+def _revocations_rolled_back(session, previous_transaction):
+    session.info.pop("revoked_rows", None)
+    session.info.pop("revoked_entries", None)
+
+
+sa.event.listen(Session, "after_flush", _snapshot_revocations)
+sa.event.listen(Session, "after_commit", _revocations_committed)
+sa.event.listen(Session, "after_soft_rollback", _revocations_rolled_back)
+
+
+def revoke_token(jwt_payload):
+    """
+    Revoke a single token. The caller is responsible for committing the session;
+    the in-memory store is updated once the commit succeeds.
+
+    Args:
+        jwt_payload (dict): The decoded claims of the token to revoke.
+
+    Returns:
+        RevokedToken: The new row.
+    """
+    row = RevokedToken(
+        jti=jwt_payload["jti"],
+        user_id=None,
+        revoked_at=utcnow(),
+        expires_at=datetime.fromtimestamp(jwt_payload["exp"], timezone.utc).replace(tzinfo=None)
+        if "exp" in jwt_payload else None,
+    )
+    _track(row)
+    return row
+
+
+def revoke_refresh_families(user_id, family_id=None):
+    """
+    Revoke the refresh token families of a user, so none of their refresh tokens can
+    be rotated again. The caller is responsible for committing the session.
+
+    Args:
+        user_id (int): The ID of the user.
+        family_id (str, optional): Only revoke this family.
+
+    Returns:
+        int: The number of families revoked.
+    """
+    stmt = (
+        sa.update(RefreshTokenFamily)
+        .where(RefreshTokenFamily.user_id == user_id)
+        .where(RefreshTokenFamily.revoked.is_(False))
+        .values(revoked=True)
+    )
+    if family_id is not None:
+        stmt = stmt.where(RefreshTokenFamily.id == family_id)
+    return db.session.execute(stmt).rowcount
+
+
+def revoke_user_tokens(user_id):
+    """
+    Revoke every token issued to a user so far, access and refresh tokens alike,
+    and their refresh token families. The caller is responsible for committing the
+    session; the in-memory store is updated once the commit succeeds.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        RevokedToken: The new row.
+    """
+    # The entry must outlive the longest-lived token it covers, which is usually
+    # the refresh token.
+    lifetimes = [current_app.config.get(key) for key in ("JWT_ACCESS_TOKEN_EXPIRES", "JWT_REFRESH_TOKEN_EXPIRES")]
+    expires_in = None if not all(lifetimes) else max(lifetimes)
+    revoke_refresh_families(user_id)
+    now = utcnow()
+    row = RevokedToken(
+        user_id=user_id,
+        revoked_at=now,
+        expires_at=now + expires_in if expires_in else None,
+    )
+    _track(row)
+    return row
+
+
+def init_app(app, jwt):
+    """
+    Attach a revocation store to the app, load it and register it as the JWT blocklist.
+
+    If the store could not be loaded, e.g. before the first migration, it is loaded
+    on the next token check, and tokens are rejected until that succeeds.
+
+    Args:
+        app (Flask): The Flask application.
+        jwt (JWTManager): The JWT manager used by the application.
+    """
+    store = RevocationStore()
+    app.extensions["revocation_store"] = store
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        store = get_store()
+        if not store.loaded and not store.load():
+            # Fail closed: without the revoked tokens, no token can be trusted.
+            return True
+        return store.is_revoked(jwt_payload)
+
+    with app.app_context():
+        try:
+            store.refresh()
+        except OperationalError:
+            # The table does not exist yet, e.g. before the first migration.
+            pass
+        finally:
+            db.session.remove()
+
+    store.start(app, app.config.get("REVOCATION_REFRESH_INTERVAL", 0))
@@ -0,0 +1,184 @@
+import itertools
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from src.models import db, Role, RoleVersion
+
+RoleSnapshot = namedtuple("RoleSnapshot", ["version", "by_id", "by_name"])
+
+EMPTY = RoleSnapshot(None, MappingProxyType({}), MappingProxyType({}))
+
+
+def _read_version():
+    try:
+        return db.session.execute(sa.select(RoleVersion.version).where(RoleVersion.id == 1)).scalar()
+    except OperationalError:
+        # The table does not exist yet, e.g. before the first migration.
+        return None
+
+
+def load_snapshot():
+    """
+    Read the role table into a new snapshot.
+
+    The version is read before the roles, so a change committed in between makes
+    the snapshot look older than it is and it is simply loaded again.
+
+    Returns:
+        RoleSnapshot: The version and the id-to-name and name-to-id mappings.
+    """
+    version = _read_version()
+    rows = db.session.execute(sa.select(Role.id, Role.name).order_by(Role.id)).all()
+    by_id = {role_id: name for role_id, name in rows}
+    by_name = {name: role_id for role_id, name in reversed(rows)}
+    return RoleSnapshot(version, MappingProxyType(by_id), MappingProxyType(by_name))
+
+
+class RoleRegistry:
+    """
+    Holds the immutable role snapshot of an app.
+
+    Readers take ``snapshot`` as a whole, and a new snapshot replaces it with a single
+    assignment, so a reader never sees a half-updated table. The snapshot is reloaded
+    after every local commit that touches a role, and at most every
+    ``check_interval`` seconds the version row is read to pick up changes committed
+    by other processes.
+
+    Attributes:
+        snapshot (RoleSnapshot): The current roles.
+        check_interval (float): Seconds between two version checks.
+    """
+
+    def __init__(self, check_interval=5.0, snapshot=EMPTY):
+        self.snapshot = snapshot
+        self.check_interval = check_interval
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def current(self, check=False):
+        """
+        Return the current snapshot, revalidating it first if it is due.
+
+        Args:
+            check (bool): Check the version now, e.g. after a lookup missed.
+        """
+        if not check and time.monotonic() - self._checked_at < self.check_interval:
+            return self.snapshot
+        with self._lock:
+            if check or time.monotonic() - self._checked_at >= self.check_interval:
+                self._checked_at = time.monotonic()
+                if self.snapshot.version is None or _read_version() != self.snapshot.version:
+                    self._reload()
+        return self.snapshot
+
+    def reload(self):
+        """
+        Load a new snapshot and swap it in.
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            self._reload()
+        return self.snapshot
+
+    def invalidate(self):
+        """
+        Make the next read revalidate the snapshot.
+        """
+        self._checked_at = float("-inf")
+
+    def _reload(self):
+        try:
+            self.snapshot = load_snapshot()
+        except OperationalError:
+            pass
+
+
+def get_registry():
+    """
+    Return the role registry of the current app.
+    """
+    return current_app.extensions["roles"]
+
+
+def snapshot():
+    """
+    Return the current role snapshot of the app.
+    """
+    return get_registry().current()
+
+
+def name_of(role_id):
+    """
+    Resolve a role ID to its name without a query.
+
+    A miss revalidates the snapshot once, in case the role was created by a process
+    that has not been seen yet.
+
+    Args:
+        role_id (int): The ID of the role.
+
+    Returns:
+        str: The name of the role, or None if there is no such role.
+    """
+    name = snapshot().by_id.get(role_id)
+    if name is None and role_id is not None:
+        name = get_registry().current(check=True).by_id.get(role_id)
+    return name
+
+
+def _touches_roles(session):
+    return any(isinstance(obj, Role) for obj in itertools.chain(session.new, session.dirty, session.deleted))
+
+
+def _bump_version(session, flush_context):
+    if not _touches_roles(session):
+        return
+    connection = session.connection()
+    bumped = connection.execute(
+        sa.update(RoleVersion).where(RoleVersion.id == 1).values(version=RoleVersion.version + 1))
+    if bumped.rowcount == 0:
+        connection.execute(sa.insert(RoleVersion).values(id=1, version=1))
+    session.info["roles_changed"] = True
+
+
+def _roles_committed(session):
+    if session.info.pop("roles_changed", False) and has_app_context():
+        registry = current_app.extensions.get("roles")
+        if registry is not None:
+            registry.invalidate()
+
+
+def _roles_rolled_back(session, previous_transaction):
+    session.info.pop("roles_changed", None)
+
+
+sa.event.listen(Session, "after_flush", _bump_version)
+sa.event.listen(Session, "after_commit", _roles_committed)
+sa.event.listen(Session, "after_soft_rollback", _roles_rolled_back)
+
+
+def init_app(app):
+    """
+    Load the role snapshot of the app.
+
+    Every ORM flush that adds, changes or deletes a role also increments the
+    role_version row in the same transaction, which is how other processes notice
+    the change within ``ROLE_VERSION_CHECK_INTERVAL`` seconds.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    registry = RoleRegistry(app.config.get("ROLE_VERSION_CHECK_INTERVAL", 5.0))
+    app.extensions["roles"] = registry
+    with app.app_context():
+        try:
+            registry.reload()
+        finally:
+            db.session.remove()
@@ -0,0 +1,199 @@
+import os
+import threading
+
+import sqlalchemy as sa
+from flask import current_app
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+from src.models import db
+from src.post_stats import record_post_created, record_post_count, latest_posts
+from src.post_summary import record_summary
+from src.sharding import cursor, post_event, event_counts, event_deltas
+from src import change_feed, singleflight
+
+
+def apply_events(engine, shard, batch=500):
+    """
+    Apply the pending events of a shard to the main database, one batch per
+    transaction, until none is left. Must be called in an app context.
+
+    Args:
+        engine (Engine): The engine of the shard.
+        shard (str): The path of the shard, which identifies its cursor.
+        batch (int): The number of events applied per transaction.
+
+    Returns:
+        int: The number of events applied.
+    """
+    applied = 0
+    while True:
+        count = _apply_batch(engine, shard, batch)
+        if not count:
+            return applied
+        applied += count
+
+
+def _apply_batch(engine, shard, batch):
+    last = db.session.execute(sa.select(cursor.c.seq).where(cursor.c.shard == shard)).scalar()
+    with engine.connect() as connection:
+        events = connection.execute(
+            sa.select(post_event).where(post_event.c.seq > (last or 0)).order_by(post_event.c.seq).limit(batch)
+        ).mappings().all()
+    if not events:
+        return 0
+
+    seq = events[-1]["seq"]
+    if last is None:
+        claim = sqlite_insert(cursor).values(shard=shard, seq=seq).on_conflict_do_nothing()
+    else:
+        claim = sa.update(cursor).where(cursor.c.shard == shard, cursor.c.seq == last).values(seq=seq)
+    try:
+        # The cursor is moved first, which takes the write lock of the main
+        # database. If another process applied these events meanwhile, it matches
+        # no row and the batch is dropped.
+        if db.session.execute(claim).rowcount != 1:
+            db.session.rollback()
+            return 0
+        counts, newest, removed = event_counts(events)
+        latest = latest_posts(removed) if removed else {}
+        for author_id, count in counts.items():
+            if author_id in removed:
+                record_post_count(author_id, count, latest.get(author_id))
+            elif count:
+                record_post_created(author_id, newest.get(author_id), count)
+        record_summary(delta for event in events for delta in event_deltas(event))
+        for event in events:
+            change_feed.record_change(event["op"], event["post_id"], event["author_id"])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    singleflight.forget(*(("user", author_id) for author_id in counts))
+    change_feed.notify()
+
+    # Applied events are never read again, so a failure here only leaves them
+    # until the next batch deletes them.
+    with engine.begin() as connection:
+        connection.execute(sa.delete(post_event).where(post_event.c.seq <= seq))
+    return len(events)
+
+
+class ShardEventApplier:
+    """
+    Applies the events of the shard outboxes to the main database in a background
+    thread.
+
+    Writes to a shard wake the thread up through notify(), and it polls every
+    ``interval`` seconds for the events written by other processes. The events that
+    piled up while a batch was applied go in the next one, so the main database
+    takes one write lock per batch instead of one per post. Every process runs an
+    applier; the cursor of a shard is moved with a compare-and-set in the same
+    transaction as the changes, so each event is applied once.
+
+    Args:
+        app (Flask): The Flask application.
+        router (ShardRouter): The router of the shards.
+        interval (float): Seconds between polls.
+        batch (int): The number of events applied per transaction.
+    """
+
+    def __init__(self, app, router, interval=1.0, batch=500):
+        self.app = app
+        self.router = router
+        self.interval = interval
+        self.batch = batch
+        self._thread = None
+        self._pid = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the thread, once per process. An in-memory database is bound to a
+        single shared connection, so no thread is started for it; its events are
+        only applied through ``apply_pending``.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            with self.app.app_context():
+                if isinstance(db.engine.pool, StaticPool):
+                    return
+            self._thread = threading.Thread(target=self._run, name="post-shard-events", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def apply_pending(self):
+        """
+        Apply the pending events of every shard in the calling thread. Must be called
+        in an app context.
+
+        Returns:
+            int: The number of events applied.
+        """
+        return sum(
+            apply_events(engine, path, self.batch) for engine, path in zip(self.router.engines, self.router.paths))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    self.apply_pending()
+                except OperationalError:
+                    # e.g. the cursor table does not exist yet, or the database is locked.
+                    db.session.rollback()
+                except Exception:
+                    self.app.logger.exception("Could not apply the post shard events")
+                finally:
+                    db.session.remove()
+
+
+def notify():
+    """
+    Wake up the event applier of the current app after a write to a shard was committed.
+    """
+    applier = current_app.extensions.get("post_shard_events")
+    if applier is not None:
+        applier.wake()
+
+
+def init_app(app):
+    """
+    Attach an event applier to the app when sharding is enabled. Its thread starts
+    with the first request, or from the server's worker hook, so that the events
+    left by a previous run are applied too.
+
+    Must be called after sharding.init_app().
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    router = app.extensions.get("post_shards")
+    if router is None:
+        return
+    app.extensions["post_shard_events"] = ShardEventApplier(
+        app,
+        router,
+        interval=app.config.get("POST_SHARD_EVENTS_INTERVAL", 1.0),
+        batch=app.config.get("POST_SHARD_EVENTS_BATCH", 500),
+    )
+
+    @app.before_request
+    def start_shard_events():
+        app.extensions["post_shard_events"].start()
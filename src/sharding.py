@@ -0,0 +1,534 @@
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.models import db, Post, PostIdSequence, PostEventCursor
+from src import archive
+
+# Fixed number of logical shards. Authors are hashed to a bucket, and buckets are
+# spread over the shard files, so the number of files can change without
+# changing the bucket of any post.
+SHARD_BUCKETS = 64
+
+post = Post.__table__
+sequence = PostIdSequence.__table__
+cursor = PostEventCursor.__table__
+
+shard_metadata = sa.MetaData()
+
+# The outbox of a shard: every write to its posts adds a row here, in the same
+# transaction. The rows are applied to the counters, the daily summary and the
+# change log of the main database afterwards, then deleted. AUTOINCREMENT keeps
+# sequence numbers growing once the applied rows are gone.
+post_event = sa.Table(
+    "post_event",
+    shard_metadata,
+    sa.Column("seq", sa.Integer, primary_key=True),
+    sa.Column("op", sa.String(6), nullable=False),
+    sa.Column("post_id", sa.Integer, nullable=False),
+    sa.Column("author_id", sa.Integer, nullable=False),
+    sa.Column("created", sa.DateTime),
+    sa.Column("bytes", sa.Integer, nullable=False),
+    # The values before an update.
+    sa.Column("prev_author_id", sa.Integer),
+    sa.Column("prev_created", sa.DateTime),
+    sa.Column("prev_bytes", sa.Integer),
+    sqlite_autoincrement=True,
+)
+
+
+def _max_id(table):
+    return sa.select(sa.func.coalesce(sa.func.max(table.c.id), 0)).scalar_subquery()
+
+
+def _event(op, row, before=None):
+    # Sizes are counted like post_summary.body_bytes, which imports this module.
+    values = {
+        "op": op,
+        "post_id": row["id"],
+        "author_id": row["author_id"],
+        "created": row["created"],
+        "bytes": len(row["body"].encode()),
+    }
+    if before is not None:
+        values.update(
+            prev_author_id=before["author_id"],
+            prev_created=before["created"],
+            prev_bytes=len(before["body"].encode()),
+        )
+    return values
+
+
+def event_deltas(event):
+    """
+    Return the changes a shard event makes to the daily summary.
+
+    Returns:
+        list: ``(created, author_id, count, bytes)`` changes.
+    """
+    current = (event["created"], event["author_id"], 1, event["bytes"])
+    if event["op"] == "create":
+        return [current]
+    if event["op"] == "delete":
+        return [(event["created"], event["author_id"], -1, -event["bytes"])]
+    return [(event["prev_created"], event["prev_author_id"], -1, -event["prev_bytes"]), current]
+
+
+def event_counts(events):
+    """
+    Return the changes shard events make to the post counters of their authors.
+
+    Returns:
+        dict: The change of the number of posts, keyed by author ID.
+        dict: The creation time of the newest post added, keyed by author ID.
+        set: The authors who lost a post, whose newest post must be looked up again.
+    """
+    counts, newest, removed = {}, {}, set()
+    for event in events:
+        added = lost = None
+        if event["op"] == "create":
+            added = event["author_id"]
+        elif event["op"] == "delete":
+            lost = event["author_id"]
+        elif event["prev_author_id"] != event["author_id"]:
+            added, lost = event["author_id"], event["prev_author_id"]
+        if added is not None:
+            counts[added] = counts.get(added, 0) + 1
+            created = event["created"]
+            if created is not None and (added not in newest or created > newest[added]):
+                newest[added] = created
+        if lost is not None:
+            counts[lost] = counts.get(lost, 0) - 1
+            removed.add(lost)
+    return counts, newest, removed
+
+
+def raise_sequence(post_id):
+    """
+    Make sure the sequence never hands out ``post_id`` or a lower ID. The caller is
+    responsible for committing the session.
+    """
+    block = post_id // SHARD_BUCKETS
+    stmt = sqlite_insert(sequence).values(id=1, block=block)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[sequence.c.id],
+        set_={"block": sa.func.max(sequence.c.block, stmt.excluded.block)},
+    ))
+
+
+class ShardRouter:
+    """
+    Route posts to several SQLite files by author.
+
+    Post IDs carry their bucket in their low bits, so a post is found from its ID
+    alone, and IDs stay valid when a bucket moves to another file during
+    resharding. The IDs come from a single sequence row in the main database, which
+    each process reserves ``id_blocks`` blocks of at a time, so creating a post does
+    not touch the main database.
+
+    Each shard file has its own engine and write lock, and a write commits in its
+    shard only, together with an event in the shard's ``post_event`` outbox. The
+    counters of the authors, the daily summary and the change log are brought up to
+    date from the outboxes by ``shard_events``, in batches, so they lag the shards
+    by a moment. Reads that need every post query the files in parallel threads and
+    merge the results.
+
+    Posts written to the post table before sharding was enabled, and archived posts,
+    are still found by ID; ``flask reshard-posts`` moves the former into the shards.
+
+    Args:
+        urls (list): The SQLAlchemy URLs of the shard databases.
+        id_blocks (int): The number of ID blocks reserved at a time.
+    """
+
+    def __init__(self, urls, id_blocks=100):
+        self.engines = [sa.create_engine(url) for url in urls]
+        self.paths = [sa.engine.make_url(url).database for url in urls]
+        self.id_blocks = id_blocks
+        self._pool = ThreadPoolExecutor(max_workers=len(self.engines), thread_name_prefix="post-shard")
+        self._ids_lock = threading.Lock()
+        self._next_blocks = None
+        self._last_block = None
+        for engine in self.engines:
+            post.create(engine, checkfirst=True)
+            shard_metadata.create_all(engine)
+
+    def engine_for_id(self, post_id):
+        return self.engines[post_id % SHARD_BUCKETS % len(self.engines)]
+
+    def _candidates(self, post_id):
+        # The file the bucket maps to, then the other files, where the post can
+        # still be while a reshard is running.
+        mapped = self.engine_for_id(post_id)
+        return [mapped] + [engine for engine in self.engines if engine is not mapped]
+
+    def _reserve_blocks(self):
+        """
+        Reserve the next ``id_blocks`` blocks of the sequence, in a transaction of its
+        own, and return the last one. On first use the sequence starts above the
+        highest ID of every table that holds posts.
+        """
+        with db.engine.begin() as connection:
+            while True:
+                last = connection.execute(
+                    sa.update(sequence).where(sequence.c.id == 1)
+                    .values(block=sequence.c.block + self.id_blocks).returning(sequence.c.block)
+                ).scalar()
+                if last is not None:
+                    return last
+                start = max(
+                    [row[0] for rows in self.scatter(sa.select(_max_id(post))) for row in rows]
+                    + [connection.execute(sa.select(_max_id(table))).scalar() for table in post_tables()]
+                )
+                # Another process may have created the row meanwhile; then its value is used.
+                connection.execute(
+                    sqlite_insert(sequence).values(id=1, block=start // SHARD_BUCKETS).on_conflict_do_nothing())
+
+    def _next_id(self, bucket):
+        with self._ids_lock:
+            if self._next_blocks is None or self._next_blocks[bucket] > self._last_block:
+                self._last_block = self._reserve_blocks()
+                self._next_blocks = [self._last_block - self.id_blocks + 1] * SHARD_BUCKETS
+            block = self._next_blocks[bucket]
+            self._next_blocks[bucket] += 1
+        return block * SHARD_BUCKETS + bucket
+
+    def create(self, title, body, author_id):
+        """
+        Insert a post into the shard of its author, and commit it there with its event.
+
+        Returns:
+            dict: The new post.
+        """
+        post_id = self._next_id(int(author_id) % SHARD_BUCKETS)
+        with self.engine_for_id(post_id).begin() as connection:
+            row = connection.execute(
+                sa.insert(post).values(id=post_id, title=title, body=body, author_id=int(author_id)).returning(*post.c)
+            ).mappings().one()
+            connection.execute(sa.insert(post_event).values(_event("create", row)))
+        return dict(row)
+
+    def get(self, post_id):
+        """
+        Return a post as a dictionary, or None if it does not exist.
+
+        Posts that are in no shard are looked up in the post table.
+        """
+        for engine in self._candidates(post_id):
+            with engine.connect() as connection:
+                row = connection.execute(sa.select(post).where(post.c.id == post_id)).mappings().first()
+            if row is not None:
+                return dict(row)
+        row = db.session.execute(sa.select(post).where(post.c.id == post_id)).mappings().first()
+        return dict(row) if row is not None else None
+
+    def get_many(self, post_ids):
+        """
+        Return the posts among ``post_ids``, keyed by ID, with one query per shard.
+
+        IDs that are not in the shard their bucket maps to are looked up in the other
+        shards and in the post table, with one query per table.
+        """
+        by_engine = {}
+        for post_id in post_ids:
+            by_engine.setdefault(self.engine_for_id(post_id), []).append(post_id)
+
+        def fetch(item):
+            engine, ids = item
+            with engine.connect() as connection:
+                return connection.execute(sa.select(post).where(post.c.id.in_(ids))).mappings().all()
+
+        found = {row["id"]: dict(row) for rows in self._pool.map(fetch, by_engine.items()) for row in rows}
+        for engine in self.engines:
+            missing = [post_id for post_id in post_ids if post_id not in found]
+            if not missing:
+                return found
+            with engine.connect() as connection:
+                rows = connection.execute(sa.select(post).where(post.c.id.in_(missing))).mappings()
+                found.update((row["id"], dict(row)) for row in rows)
+        missing = [post_id for post_id in post_ids if post_id not in found]
+        if missing:
+            rows = db.session.execute(sa.select(post).where(post.c.id.in_(missing))).mappings()
+            found.update((row["id"], dict(row)) for row in rows)
+        return found
+
+    def update(self, post_id, values):
+        """
+        Update a post in its shard, and commit it there with its event. Posts never
+        move shard, even when their author changes.
+
+        Returns:
+            dict: The updated post, or None if it is in no shard.
+        """
+        for engine in self._candidates(post_id):
+            with engine.begin() as connection:
+                before = connection.execute(sa.select(post).where(post.c.id == post_id)).mappings().first()
+                if before is None:
+                    continue
+                if not values:
+                    return dict(before)
+                row = connection.execute(
+                    sa.update(post).where(post.c.id == post_id).values(**values).returning(*post.c)
+                ).mappings().one()
+                connection.execute(sa.insert(post_event).values(_event("update", row, before)))
+                return dict(row)
+        return None
+
+    def delete(self, post_id):
+        """
+        Delete a post from its shard, and commit it there with its event.
+
+        Returns:
+            dict: The deleted post, or None if it is in no shard.
+        """
+        for engine in self._candidates(post_id):
+            with engine.begin() as connection:
+                row = connection.execute(
+                    sa.delete(post).where(post.c.id == post_id).returning(*post.c)).mappings().first()
+                if row is not None:
+                    connection.execute(sa.insert(post_event).values(_event("delete", row)))
+                    return dict(row)
+        return None
+
+    def delete_by_author(self, author_id, limit):
+        """
+        Delete up to ``limit`` posts of an author from each shard, each shard in one
+        transaction with the events of its deleted posts.
+
+        Returns:
+            list: The deleted posts.
+        """
+        ids = sa.select(post.c.id).where(post.c.author_id == int(author_id)).order_by(post.c.id).limit(limit)
+        stmt = sa.delete(post).where(post.c.id.in_(ids.scalar_subquery())).returning(*post.c)
+        deleted = []
+        for engine in self.engines:
+            with engine.begin() as connection:
+                rows = connection.execute(stmt).mappings().all()
+                if rows:
+                    connection.execute(sa.insert(post_event), [_event("delete", row) for row in rows])
+            deleted.extend(dict(row) for row in rows)
+        return deleted
+
+    def scatter(self, query):
+        """
+        Run a query on every shard in parallel.
+
+        Returns:
+            list: The rows of each shard, in the order of the shards.
+        """
+        def fetch(engine):
+            with engine.connect() as connection:
+                return connection.execute(query).all()
+
+        return list(self._pool.map(fetch, self.engines))
+
+    def cursors(self):
+        """
+        Return the sequence number of the last applied event of each shard, keyed by
+        the path of the shard.
+        """
+        return dict(db.session.execute(sa.select(cursor.c.shard, cursor.c.seq)).all())
+
+    def snapshot(self, query):
+        """
+        Run a query on every shard, in one read transaction with the events of the
+        shard that were not applied to the main database yet.
+
+        The write lock of the main database is taken first, in the current
+        transaction, so no event is applied until the caller commits or rolls back.
+        Subtracting the pending events from the rows then gives the state that the
+        counters and the summary of the main database reflect.
+
+        Returns:
+            list: ``(rows, events)`` for each shard.
+        """
+        db.session.execute(sa.update(cursor).values(seq=cursor.c.seq))
+        cursors = self.cursors()
+
+        def fetch(index):
+            with self.engines[index].connect() as connection:
+                # pysqlite only opens a transaction before a write, so the two reads
+                # are put in one explicitly to see the same state.
+                connection.exec_driver_sql("BEGIN")
+                rows = connection.execute(query).all()
+                events = connection.execute(
+                    sa.select(post_event).where(post_event.c.seq > cursors.get(self.paths[index], 0))
+                ).mappings().all()
+                connection.rollback()
+            return rows, events
+
+        return list(self._pool.map(fetch, range(len(self.engines))))
+
+    def latest_posts(self, author_ids):
+        """
+        Return the creation time of the newest post of each author in the shards,
+        keyed by author ID. Authors without a sharded post are left out.
+        """
+        query = (
+            sa.select(post.c.author_id, sa.func.max(post.c.created))
+            .where(post.c.author_id.in_(author_ids))
+            .group_by(post.c.author_id)
+        )
+        latest = {}
+        for rows in self.scatter(query):
+            for author_id, created in rows:
+                if created is not None and (author_id not in latest or created > latest[author_id]):
+                    latest[author_id] = created
+        return latest
+
+    def list_posts(self):
+        """
+        Return every post of the shards and of the post table, ordered by
+        ``(created, id)``.
+
+        Each shard sorts its own posts and the sorted results are merged.
+        """
+        query = sa.select(post).order_by(post.c.created, post.c.id)
+        results = [[row._mapping for row in rows] for rows in self.scatter(query)]
+        results.append(db.session.execute(query).mappings().all())
+        return [dict(row) for row in heapq.merge(*results, key=lambda row: (row["created"], row["id"]))]
+
+    def _copy(self, rows):
+        # A post that is already in its target, because an earlier run was
+        # interrupted after the copy, is left as is.
+        by_engine = {}
+        for row in rows:
+            by_engine.setdefault(self.engine_for_id(row["id"]), []).append(row)
+        for engine, engine_rows in by_engine.items():
+            with engine.begin() as connection:
+                connection.execute(sqlite_insert(post).on_conflict_do_nothing(), engine_rows)
+
+    def reshard(self, sources=(), batch_size=1000):
+        """
+        Move every post that is not in the file its bucket maps to, and every post
+        of the post table, into the shards.
+
+        Run this after changing the list of shards. Files that are no longer part of
+        the list are passed as ``sources`` and are emptied; their pending events are
+        applied first. Each batch is copied to its target files before it is deleted
+        from its source, so a post is never lost, and an interrupted run can simply
+        be started again. Moving a post changes no counter, so it records no event.
+        The ID sequence is raised above the IDs of the retired files before
+        anything is moved.
+
+        Args:
+            sources (list): The URLs of retired shard databases.
+            batch_size (int): The number of posts moved per batch.
+
+        Returns:
+            int: The number of posts moved.
+        """
+        from src import shard_events
+
+        count = len(self.engines)
+        source_engines = [sa.create_engine(url) for url in sources]
+        moved = 0
+        try:
+            for url, engine in zip(sources, source_engines):
+                shard_events.apply_events(engine, sa.engine.make_url(url).database)
+                with engine.connect() as connection:
+                    raise_sequence(connection.execute(sa.select(_max_id(post))).scalar())
+            db.session.commit()
+
+            for index, engine in enumerate(self.engines):
+                misplaced = (
+                    sa.select(post).where(post.c.id % SHARD_BUCKETS % count != index)
+                    .order_by(post.c.id).limit(batch_size)
+                )
+                moved += self._drain(engine, misplaced)
+            for engine in source_engines:
+                moved += self._drain(engine, sa.select(post).order_by(post.c.id).limit(batch_size))
+
+            batch = sa.select(post).order_by(post.c.id).limit(batch_size)
+            while True:
+                rows = [dict(row) for row in db.session.execute(batch).mappings()]
+                if not rows:
+                    break
+                self._copy(rows)
+                db.session.execute(sa.delete(post).where(post.c.id.in_([row["id"] for row in rows])))
+                db.session.commit()
+                moved += len(rows)
+        finally:
+            for engine in source_engines:
+                engine.dispose()
+        return moved
+
+    def _drain(self, engine, batch):
+        moved = 0
+        while True:
+            with engine.connect() as connection:
+                rows = [dict(row) for row in connection.execute(batch).mappings()]
+            if not rows:
+                return moved
+            self._copy(rows)
+            with engine.begin() as connection:
+                connection.execute(sa.delete(post).where(post.c.id.in_([row["id"] for row in rows])))
+            moved += len(rows)
+
+    def forget_connections(self):
+        """
+        Drop the pooled connections without closing them, in a forked child, and
+        replace the worker threads, which do not survive a fork. The reserved IDs
+        are dropped too, so the child does not hand out the parent's.
+        """
+        for engine in self.engines:
+            engine.dispose(close=False)
+        self._pool = ThreadPoolExecutor(max_workers=len(self.engines), thread_name_prefix="post-shard")
+        self._ids_lock = threading.Lock()
+        self._next_blocks = None
+        self._last_block = None
+
+    def dispose(self):
+        self._pool.shutdown(wait=False)
+        for engine in self.engines:
+            engine.dispose()
+
+
+def get_router():
+    """
+    Return the shard router of the current app, or None when sharding is disabled.
+    """
+    return current_app.extensions.get("post_shards")
+
+
+def post_tables():
+    """
+    Return the tables of the main database that hold posts: the post table and the
+    archive. The shards are not attached, so they are queried through the router.
+    """
+    return [post] + archive.tables()
+
+
+@click.command('reshard-posts')
+@click.option('--source', 'sources', multiple=True, help='URL of a retired shard database to empty. Repeatable.')
+@click.option('--batch-size', default=1000, show_default=True, help='Posts moved per batch.')
+@with_appcontext
+def reshard_posts_command(sources, batch_size):
+    """
+    Move posts to the shard their ID maps to after POST_SHARDS changed, and move
+    the posts of the post table into the shards.
+    """
+    router = get_router()
+    if router is None:
+        raise click.UsageError("POST_SHARDS is not configured.")
+    moved = router.reshard(sources, batch_size=batch_size)
+    click.echo(f"Moved {moved} post(s).")
+
+
+def init_app(app):
+    """
+    Route posts to the databases listed in ``POST_SHARDS``, if any.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    urls = app.config.get("POST_SHARDS")
+    if not urls:
+        return
+    app.extensions["post_shards"] = ShardRouter(urls, id_blocks=app.config.get("POST_ID_BLOCKS", 100))
@@ -0,0 +1,169 @@
+import copy
+import threading
+from http import HTTPStatus
+
+from flask import current_app
+
+
+class FlightTimeout(Exception):
+    """
+    Raised when a coalesced lookup waited longer than the group's timeout.
+    """
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical lookups into a single call.
+
+    The first caller of a key runs the lookup; callers arriving while it is in flight
+    wait for it and receive the same result, or a copy of the same exception. Nothing
+    is kept once the call returns, so this is not a cache: the next lookup of the key
+    runs again. Calls are only shared within one process.
+
+    Writers call ``forget(key)`` after committing. A lookup that started before the
+    write could return the old value, so later callers start a new call instead of
+    joining it.
+
+    Attributes:
+        timeout (float): How long a waiting caller waits for the call, in seconds.
+        calls (int): The number of lookups that ran.
+        shared (int): The number of callers served by another caller's lookup.
+    """
+
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        self.calls = 0
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Run ``fn()``, or wait for the call of ``key`` that is already in flight.
+
+        Args:
+            key (hashable): Identifies the lookup, e.g. ``("post", 42)``.
+            fn (callable): The lookup. Its result is shared, so it must not be mutated.
+
+        Returns:
+            The result of the call.
+
+        Raises:
+            FlightTimeout: If the call in flight did not finish within ``timeout``.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.calls += 1
+            else:
+                call.waiters += 1
+                leader = False
+                self.shared += 1
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                raise FlightTimeout(key)
+            if call.error is not None:
+                # Each waiter raises its own copy, so their tracebacks do not pile
+                # up on one shared exception object. The original, with the
+                # traceback of the call, is chained as its cause.
+                error = _copy_error(call.error)
+                if error is None:
+                    raise call.error
+                raise error from call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # The key may have been forgotten, and taken by a newer call.
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def forget(self, key):
+        """
+        Make the next callers of ``key`` start a new call instead of joining the one
+        in flight, e.g. after the data it reads was written. The call in flight still
+        answers the callers already waiting for it.
+        """
+        with self._lock:
+            self._calls.pop(key, None)
+
+
+def _copy_error(error):
+    try:
+        return copy.copy(error)
+    except Exception:
+        # Exceptions whose constructor takes other arguments than their args.
+        return None
+
+
+def do(key, fn):
+    """
+    Run a read through the app's single-flight group.
+
+    Args:
+        key (hashable): Identifies the lookup.
+        fn (callable): The lookup.
+
+    Returns:
+        The result of the call, shared with concurrent callers of the same key.
+    """
+    group = current_app.extensions.get("single_flight")
+    if group is None:
+        return fn()
+    return group.do(key, fn)
+
+
+def forget(*keys):
+    """
+    Make the next reads of ``keys`` start a new call, after a write was committed.
+
+    Args:
+        *keys (hashable): The keys of the lookups, e.g. ``("post", 42)``.
+    """
+    group = current_app.extensions.get("single_flight")
+    if group is None:
+        return
+    for key in keys:
+        group.forget(key)
+
+
+def init_app(app):
+    """
+    Coalesce concurrent identical reads of the read handlers.
+
+    Callers that wait longer than ``SINGLE_FLIGHT_TIMEOUT`` seconds for the call in
+    flight are answered with 503, like requests turned away by admission control.
+    A timeout of 0 disables coalescing.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    timeout = app.config.get("SINGLE_FLIGHT_TIMEOUT", 5.0)
+    if not timeout:
+        app.extensions.pop("single_flight", None)
+        return
+    app.extensions["single_flight"] = SingleFlight(timeout)
+
+    @app.errorhandler(FlightTimeout)
+    def flight_timeout(e):
+        return {"error": "Server busy, try again later"}, HTTPStatus.SERVICE_UNAVAILABLE, {"Retry-After": "1"}
@@ -0,0 +1,122 @@
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import click
+
+MARKER = "--- startup-profile: import src.app"
+
+# Runs in a fresh interpreter, so that nothing is imported yet.
+CHILD = f"""
+import cProfile, sys, time
+sys.stderr.write({MARKER!r} + "\\n")
+start = time.perf_counter()
+from src.app import create_app
+imported = time.perf_counter()
+profiler = cProfile.Profile()
+profiler.runcall(create_app)
+created = time.perf_counter()
+profiler.dump_stats(sys.argv[1])
+print(imported - start, created - imported)
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parse the ``-X importtime`` output of the imports made after MARKER.
+
+    Returns:
+        list: ``(module, self_seconds, cumulative_seconds)`` tuples, in import order.
+    """
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(own) / 1e6, int(cumulative) / 1e6))
+    return modules
+
+
+def _module_name(filename):
+    path = os.path.abspath(filename)
+    for name, module in list(sys.modules.items()):
+        if os.path.abspath(getattr(module, "__file__", None) or "") == path:
+            return name
+    for root in sorted((os.path.abspath(p) for p in sys.path if p), key=len, reverse=True):
+        if path.startswith(root + os.sep):
+            name = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, ".")
+            return name.removesuffix(".__init__")
+    return filename
+
+
+def factory_times(stats_path):
+    """
+    Read the cumulative time of every ``init_app`` called by ``create_app``.
+
+    Returns:
+        list: ``(module, seconds)`` pairs, slowest first.
+    """
+    stats = pstats.Stats(stats_path).stats
+    times = defaultdict(float)
+    for (filename, _, function), (_, _, _, cumulative, _) in stats.items():
+        if function == "init_app":
+            times[_module_name(filename)] += cumulative
+    return sorted(times.items(), key=lambda item: item[1], reverse=True)
+
+
+def profile_startup():
+    """
+    Import the app and run ``create_app()`` in a fresh interpreter.
+
+    Returns:
+        dict: The import and factory wall times, the imported modules and the
+        time spent in each extension's ``init_app``.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_path = os.path.join(tmp, "create_app.prof")
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD, stats_path],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        if result.returncode != 0:
+            raise click.ClickException(result.stderr.strip().splitlines()[-1])
+        import_time, factory_time = map(float, result.stdout.split()[-2:])
+        return {
+            "import": import_time,
+            "factory": factory_time,
+            "modules": parse_importtime(result.stderr),
+            "init_app": factory_times(stats_path),
+        }
+
+
+@click.command('startup-profile')
+@click.option('--limit', default=15, show_default=True, help='Rows shown per section.')
+def startup_profile_command(limit):
+    """
+    Report where the start of the app spends its time.
+    """
+    started = time.perf_counter()
+    profile = profile_startup()
+
+    packages = defaultdict(float)
+    for name, own, _ in profile["modules"]:
+        packages[name.split(".")[0]] += own
+
+    click.echo(f"import src.app: {profile['import'] * 1000:.1f} ms")
+    click.echo("  by package (self time):")
+    for name, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]:
+        click.echo(f"    {seconds * 1000:8.1f} ms  {name}")
+    click.echo("  slowest modules (cumulative):")
+    for name, _, cumulative in sorted(profile["modules"], key=lambda m: m[2], reverse=True)[:limit]:
+        click.echo(f"    {cumulative * 1000:8.1f} ms  {name}")
+    click.echo(f"create_app(): {profile['factory'] * 1000:.1f} ms (profiled)")
+    for name, seconds in profile["init_app"][:limit]:
+        click.echo(f"    {seconds * 1000:8.1f} ms  {name}.init_app")
+    click.echo(f"Profiled in {time.perf_counter() - started:.2f} s")
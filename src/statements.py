@@ -0,0 +1,125 @@
+import threading
+
+import sqlalchemy as sa
+from flask import abort, current_app
+from flask_jwt_extended import jwt_required
+from sqlalchemy.engine import default
+from sqlalchemy.orm.util import identity_key
+
+from src.models import db, User
+
+# Statements of the hot paths, built once at import. Values are passed as bound
+# parameters at execution time, so every execution reuses the same statement
+# object, its memoized cache key and the engine's compiled form.
+USER_BY_USERNAME = sa.select(User).where(User.username == sa.bindparam("username"))
+
+_by_id = {}
+
+
+def by_id(model):
+    """
+    Return the prebuilt ``SELECT`` of a model by primary key, with an ``ident`` parameter.
+    """
+    stmt = _by_id.get(model)
+    if stmt is None:
+        stmt = _by_id[model] = sa.select(model).where(model.id == sa.bindparam("ident"))
+    return stmt
+
+
+def user_by_username(username):
+    """
+    Return the user with the given username, or None.
+    """
+    return db.session.execute(USER_BY_USERNAME, {"username": username}).scalar()
+
+
+def get_or_404(model, ident, description=None):
+    """
+    Like ``db.get_or_404``, but loads the row with a prebuilt statement.
+
+    Objects already in the session's identity map are returned without a query.
+
+    Args:
+        model (type): The mapped class.
+        ident (int): The primary key. Values that are not integers give a 404.
+        description (str, optional): A custom message for the 404 error.
+
+    Returns:
+        The instance of ``model``.
+    """
+    try:
+        ident = int(ident)
+    except (TypeError, ValueError):
+        abort(404, description=description)
+    instance = db.session.identity_map.get(identity_key(model, ident))
+    if instance is None or sa.inspect(instance).expired:
+        instance = db.session.execute(by_id(model), {"ident": ident}).scalar()
+    if instance is None:
+        abort(404, description=description)
+    return instance
+
+
+class CacheStats:
+    """
+    Counts how executions were served by the SQLAlchemy compiled statement cache.
+
+    Attributes:
+        hits (int): Executions that reused a compiled statement.
+        misses (int): Executions that had to compile their statement.
+        uncached (int): Executions that cannot be cached, such as textual SQL.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+        self._lock = threading.Lock()
+
+    def record(self, cache_hit):
+        with self._lock:
+            if cache_hit is default.CACHE_HIT:
+                self.hits += 1
+            elif cache_hit is default.CACHE_MISS:
+                self.misses += 1
+            else:
+                self.uncached += 1
+
+    def as_dict(self):
+        with self._lock:
+            cached = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncached": self.uncached,
+                "hit_ratio": self.hits / cached if cached else None,
+            }
+
+
+def cache_stats():
+    """
+    Return the statement cache counters of the current app.
+    """
+    return current_app.extensions["statement_cache_stats"].as_dict()
+
+
+def init_app(app):
+    """
+    Count statement cache hits on the app's engine and expose them to admins at
+    ``GET /metrics/statement-cache``.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.extensions["statement_cache_stats"] = CacheStats()
+    with app.app_context():
+        engine = db.engine
+
+    @sa.event.listens_for(engine, "after_cursor_execute")
+    def count_cache_hit(conn, cursor, statement, parameters, context, executemany):
+        app.extensions["statement_cache_stats"].record(getattr(context, "cache_hit", None))
+
+    # src.utils imports this module.
+    from src.utils import requires_roles
+
+    app.add_url_rule("/metrics/statement-cache", "statement_cache_stats",
+                     jwt_required()(requires_roles("admin")(cache_stats)))
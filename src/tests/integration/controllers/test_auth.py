@@ -4,6 +4,9 @@ from flask.testing import FlaskClient
 from flask_jwt_extended import JWTManager
 from src.controllers.auth import app as auth_bp
 from src.app import db, User
+import os
+from src.passwords import hash_password, is_hashed, shutdown_pool
+from src import passwords, revocation
 
 @pytest.fixture
 def app():
@@ -22,7 +25,8 @@ def app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = 'super-secret'
     db.init_app(app)
-    JWTManager(app)
+    jwt = JWTManager(app)
+    revocation.init_app(app, jwt)
     app.register_blueprint(auth_bp)
     with app.app_context():
         db.create_all()
@@ -78,4 +82,209 @@ def test_login_invalid_username(client: FlaskClient):
         'username': 'wronguser',
         'password': 'testpassword'
     })
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+def test_login_unknown_username_runs_kdf(client: FlaskClient, mocker):
+    """
+    Test case for the password check done for an unknown username.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The response status code is 401.
+        The password is checked against the dummy hash, like a wrong password would be.
+    """
+    check = mocker.patch('src.controllers.auth.check_password', return_value=True)
+    response = client.post('/auth/login', json={
+        'username': 'wronguser',
+        'password': 'testpassword'
+    })
+    assert response.status_code == 401
+    check.assert_called_once_with(mocker.ANY, 'testpassword')
+
+def test_login_rehashes_plaintext_password(client: FlaskClient, app):
+    """
+    Test case for the transparent rehash of a legacy plaintext password.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+    
+    Asserts:
+        The stored password is hashed after the first login.
+        The user can still log in with the same password.
+    """
+    response = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'})
+    assert response.status_code == 200
+    with app.app_context():
+        user = db.session.execute(db.select(User).where(User.username == 'testuser')).scalar()
+        assert user.password != 'testpassword'
+        assert is_hashed(user.password)
+
+    response = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'})
+    assert response.status_code == 200
+
+def test_login_pool_saturated(client: FlaskClient, mocker):
+    """
+    Test case for login while the password hashing pool is saturated.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The response status code is 503 and carries a Retry-After header.
+    """
+    user = mocker.Mock(password=hash_password('testpassword', pbkdf2_iterations=1000, method='pbkdf2_sha256'))
+    mocker.patch('src.controllers.auth.db.session.execute').return_value.scalar.return_value = user
+    mocker.patch('src.passwords._get_pool', return_value=(mocker.Mock(), mocker.Mock(**{'acquire.return_value': False})))
+    response = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+def test_login_hashes_in_pool_by_default(client: FlaskClient, mocker):
+    """
+    Test case for the password hashing pool with the default configuration.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The login succeeds and its key derivation runs in a pool with one worker per CPU.
+    """
+    shutdown_pool()
+    executor = mocker.spy(passwords, 'ProcessPoolExecutor')
+    response = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'})
+    assert response.status_code == 200
+    executor.assert_called_once_with(max_workers=os.cpu_count() or 1)
+
+def test_logout_revokes_token(client: FlaskClient):
+    """
+    Test case for revoking an access token through logout.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The first logout succeeds and the revoked token is rejected afterwards.
+    """
+    token = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'}).json['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/auth/logout', headers=headers)
+    assert response.status_code == 200
+
+    response = client.post('/auth/logout', headers=headers)
+    assert response.status_code == 401
+
+def test_refresh_rotates_token(client: FlaskClient):
+    """
+    Test case for exchanging a refresh token for new tokens.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The refresh returns new tokens and the new refresh token can be used again.
+    """
+    tokens = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'}).json
+
+    response = client.post('/auth/refresh', headers={'Authorization': f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == 200
+    assert 'access_token' in response.json
+    assert response.json['refresh_token'] != tokens['refresh_token']
+
+    response = client.post('/auth/refresh', headers={'Authorization': f"Bearer {response.json['refresh_token']}"})
+    assert response.status_code == 200
+
+def test_refresh_reuse_revokes_family(client: FlaskClient):
+    """
+    Test case for presenting an already rotated refresh token.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The reused token is rejected and the whole family is revoked.
+    """
+    first = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'}).json['refresh_token']
+    second = client.post('/auth/refresh', headers={'Authorization': f'Bearer {first}'}).json['refresh_token']
+
+    response = client.post('/auth/refresh', headers={'Authorization': f'Bearer {first}'})
+    assert response.status_code == 401
+
+    response = client.post('/auth/refresh', headers={'Authorization': f'Bearer {second}'})
+    assert response.status_code == 401
+
+def test_refresh_rejects_access_token(client: FlaskClient):
+    """
+    Test case for calling /auth/refresh with an access token.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The response status code is 422.
+    """
+    access = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'}).json['access_token']
+    response = client.post('/auth/refresh', headers={'Authorization': f'Bearer {access}'})
+    assert response.status_code == 422
+
+def test_logout_revokes_refresh_family(client: FlaskClient):
+    """
+    Test case for the refresh token of a session that logged out.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The refresh token issued with the revoked access token can no longer be used.
+    """
+    tokens = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'}).json
+
+    response = client.post('/auth/logout', headers={'Authorization': f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 200
+
+    response = client.post('/auth/refresh', headers={'Authorization': f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == 401
+
+def test_refresh_rejects_deleted_user(client: FlaskClient, app):
+    """
+    Test case for refreshing the tokens of a user who no longer exists.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+    
+    Asserts:
+        The response status code is 401.
+    """
+    refresh = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'}).json['refresh_token']
+    with app.app_context():
+        db.session.execute(db.delete(User))
+        db.session.commit()
+
+    response = client.post('/auth/refresh', headers={'Authorization': f'Bearer {refresh}'})
+    assert response.status_code == 401
+
+def test_revoke_user_tokens_outlives_refresh_tokens(client: FlaskClient, app):
+    """
+    Test case for the lifetime of a user-wide revocation.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+    
+    Asserts:
+        The revocation lasts as long as a refresh token, and the user's refresh
+        token families are revoked.
+    """
+    refresh = client.post('/auth/login', json={'username': 'testuser', 'password': 'testpassword'}).json['refresh_token']
+    with app.app_context():
+        user_id = db.session.execute(db.select(User.id)).scalar()
+        row = revocation.revoke_user_tokens(user_id)
+        db.session.commit()
+        assert row.expires_at - row.revoked_at == app.config['JWT_REFRESH_TOKEN_EXPIRES']
+
+    response = client.post('/auth/refresh', headers={'Authorization': f'Bearer {refresh}'})
+    assert response.status_code == 401
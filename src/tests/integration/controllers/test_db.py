@@ -1,34 +1,121 @@
 import sqlite3
 import pytest
-from flask import Flask, g
-from src.db import get_db, close_db, init_db
+from src.app import create_app, db, User, Role, Post
+from src.controllers.post import _post_to_dict
+from src.controllers.user import _user_to_dict
+from src.passwords import hash_password
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     """
-    Fixture to create a Flask application instance for testing.
-    
-    Configures the application for testing, initializes the in-memory database,
-    and sets up the teardown context to close the database after each test.
-    
+    Fixture to create a Flask application instance backed by a SQLite file.
+
+    The raw sqlite3 fast path is only enabled for file databases, so the in-memory
+    database of the other tests cannot be used here.
+
     Yields:
         Flask: The Flask application instance.
     """
-    app = Flask(__name__)
-    app.config['DATABASE'] = ':memory:'
-    app.config['TESTING'] = True
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'blog.sqlite'}",
+        'REVOCATION_REFRESH_INTERVAL': 0,
+        'PASSWORD_POOL_WORKERS': 0,
+        'RAW_SQLITE_READS': True,
+    })
+    with app.app_context():
+        db.create_all()
+        role = Role(name='admin')
+        db.session.add(role)
+        db.session.commit()
+        user = User(username='test', password=hash_password('test', pbkdf2_iterations=1000, method='pbkdf2_sha256'),
+                    role_id=role.id)
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Post(title='t', body='b', author_id=user.id))
+        db.session.commit()
+
+    yield app
+
+    app.extensions['raw_sqlite'].close()
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+def test_raw_reads_match_orm(app):
+    """
+    Test case for the raw sqlite3 fast path returning the same data as the ORM.
 
-    @app.teardown_appcontext
-    def teardown(exception):
-        """
-        Teardown function to close the database after each test.
-        
-        Args:
-            exception (Exception): The exception that caused the teardown, if any.
-        """
-        close_db()
+    Args:
+        app (Flask): The Flask application instance.
 
+    Asserts:
+        get_post, get_user and the login lookup return what the ORM returns, and misses return None.
+    """
+    reader = app.extensions['raw_sqlite']
     with app.app_context():
-        init_db()
+        user = db.session.get(User, 1)
+        assert reader.get_post(1) == _post_to_dict(db.session.get(Post, 1))
+        assert reader.get_user(1) == _user_to_dict(user)
+        assert "password" not in reader.get_user(1)
+        assert reader.get_credentials('test') == (user.id, user.password, True)
+    assert reader.get_post(2) is None
+    assert reader.get_user(2) is None
+    assert reader.get_credentials('nobody') is None
+
+def test_raw_reads_endpoints(app):
+    """
+    Test case for the endpoints answering identically with and without the fast path.
+
+    Args:
+        app (Flask): The Flask application instance.
+
+    Asserts:
+        The responses of GET /posts/1, GET /users/1 and POST /auth/login do not depend on the read path.
+    """
+    client = app.test_client()
+
+    def responses():
+        login = client.post('/auth/login', json={'username': 'test', 'password': 'test'})
+        return [
+            client.get('/posts/1').json,
+            client.get('/users/1').json,
+            client.get('/posts/2').status_code,
+            login.status_code,
+            sorted(login.json),
+            client.post('/auth/login', json={'username': 'test', 'password': 'wrong'}).status_code,
+        ]
+
+    fast = responses()
+    reader = app.extensions.pop('raw_sqlite')
+    orm = responses()
+    app.extensions['raw_sqlite'] = reader
+
+    assert fast == orm
+    assert fast[3] == 200
+
+def test_raw_reader_pool_is_bounded(app):
+    """
+    Test case for the raw reader keeping a bounded number of idle connections.
+
+    Args:
+        app (Flask): The Flask application instance.
+
+    Asserts:
+        Connections are reused, the ones beyond the pool size are closed when handed back,
+        and close() closes the idle ones.
+    """
+    reader = app.extensions['raw_sqlite']
+    reader.close()
+    reader.pool_size = 1
+
+    with reader.connection() as first, reader.connection() as second:
+        assert first is not second
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.execute("SELECT 1")
+    with reader.connection() as reused:
+        assert reused is second
+    reader.close()
 
-    return app
\ No newline at end of file
+    assert reader._idle == []
+    with pytest.raises(sqlite3.ProgrammingError):
+        second.execute("SELECT 1")
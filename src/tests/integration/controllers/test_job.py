@@ -0,0 +1,160 @@
+from http import HTTPStatus
+from src.app import db, User, Role, Post
+
+def test_delete_user_runs_in_background(client, access_token, app):
+    """
+    Test case for deleting a user with posts through a background job.
+
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for authentication.
+        app (Flask): The Flask application instance.
+
+    Asserts:
+        The request answers 202 with the queued job, and once the job has run
+        the user and their posts are gone and the job reports the deleted posts.
+    """
+    # Given
+    app.config['DELETE_BATCH_SIZE'] = 2
+    role = db.session.execute(db.select(Role)).scalar()
+    other = User(username='other', password='other', role_id=role.id)
+    db.session.add(other)
+    db.session.commit()
+    other_id = other.id
+    db.session.add_all([Post(title=f'post {i}', body='body', author_id=other_id) for i in range(5)])
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    # When
+    response = client.delete(f'/users/{other_id}', headers=headers)
+    queued = client.get(response.headers['Location'], headers=headers)
+    app.extensions['jobs'].run_pending()
+    finished = client.get(response.headers['Location'], headers=headers)
+
+    # Then
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.json['job']['kind'] == 'delete-user'
+    assert queued.json['status'] == 'queued'
+    assert finished.status_code == HTTPStatus.OK
+    assert finished.json['status'] == 'succeeded'
+    assert finished.json['attempts'] == 1
+    assert finished.json['result'] == {"deleted_posts": 5}
+    assert db.session.get(User, other_id) is None
+    assert db.session.execute(db.select(Post).where(Post.author_id == other_id)).first() is None
+    assert client.get('/posts/changes').json['changes'][-1]['op'] == 'delete'
+
+def test_delete_role_runs_in_background(client, access_token, app):
+    """
+    Test case for deleting a role through a background job.
+
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for authentication.
+        app (Flask): The Flask application instance.
+
+    Asserts:
+        The request answers 202 and the role is deleted once the job has run.
+    """
+    # Given
+    client.post('/roles/', json={"name": "editor"})
+    role_id = db.session.execute(db.select(Role.id).where(Role.name == "editor")).scalar()
+
+    # When
+    response = client.delete(f'/roles/{role_id}')
+    app.extensions['jobs'].run_pending()
+
+    # Then
+    assert response.status_code == HTTPStatus.ACCEPTED
+    job = client.get(f"/jobs/{response.json['job']['id']}", headers={'Authorization': f'Bearer {access_token}'})
+    assert job.json['status'] == 'succeeded'
+    assert [role["name"] for role in client.get('/roles/').json] == ["admin"]
+
+def test_get_job_not_found(client, access_token):
+    """
+    Test case for the status of a job that does not exist.
+
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for authentication.
+
+    Asserts:
+        The response status code is 404.
+    """
+    response = client.get('/jobs/42', headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+def test_failed_job_is_listed_and_retried(client, access_token, app, mocker):
+    """
+    Test case for a user deletion that failed for good and is retried.
+
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for authentication.
+        app (Flask): The Flask application instance.
+        mocker (MockerFixture): The pytest-mock fixture.
+
+    Asserts:
+        The failed job is listed at /jobs/?status=failed, an unknown status is
+        rejected, a job that has not failed cannot be retried, and the retried
+        job runs again and deletes the user.
+    """
+    # Given
+    app.config['JOB_MAX_ATTEMPTS'] = 1
+    mocker.patch('src.controllers.user.delete_posts_by_author', side_effect=[RuntimeError("disk full"), 0])
+    role = db.session.execute(db.select(Role)).scalar()
+    other = User(username='other', password='other', role_id=role.id)
+    db.session.add(other)
+    db.session.commit()
+    other_id = other.id
+    headers = {'Authorization': f'Bearer {access_token}'}
+    job_id = client.delete(f'/users/{other_id}', headers=headers).json['job']['id']
+    app.extensions['jobs'].run_pending()
+
+    # When
+    failed = client.get('/jobs/?status=failed', headers=headers)
+    invalid = client.get('/jobs/?status=bogus', headers=headers)
+    retried = client.post(f'/jobs/{job_id}/retry', headers=headers)
+    again = client.post(f'/jobs/{job_id}/retry', headers=headers)
+    app.extensions['jobs'].run_pending()
+
+    # Then
+    assert [(job['id'], job['status']) for job in failed.json['jobs']] == [(job_id, 'failed')]
+    assert "disk full" in failed.json['jobs'][0]['error']
+    assert invalid.status_code == HTTPStatus.BAD_REQUEST
+    assert retried.status_code == HTTPStatus.ACCEPTED
+    assert again.status_code == HTTPStatus.CONFLICT
+    assert client.get(f'/jobs/{job_id}', headers=headers).json['status'] == 'succeeded'
+    assert db.session.get(User, other_id) is None
+
+def test_get_job_requires_admin(client, access_token, app):
+    """
+    Test case for the status of a job requested by a user who is not an admin.
+
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for authentication.
+        app (Flask): The Flask application instance.
+
+    Asserts:
+        The response status code is 403, and 200 for an admin.
+    """
+    # Given
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.post('/roles/', json={"name": "editor"})
+    role_id = db.session.execute(db.select(Role.id).where(Role.name == "editor")).scalar()
+    editor = User(username='editor', password='editor', role_id=role_id)
+    db.session.add(editor)
+    db.session.commit()
+    editor_id = editor.id
+    job_url = client.delete(f'/users/{editor_id}', headers=headers).headers['Location']
+    other = User(username='other', password='other', role_id=role_id)
+    db.session.add(other)
+    db.session.commit()
+    token = client.post('/auth/login', json={"username": "other", "password": "other"}).json['access_token']
+
+    # When
+    response = client.get(job_url, headers={'Authorization': f'Bearer {token}'})
+
+    # Then
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    assert client.get(job_url, headers=headers).status_code == HTTPStatus.OK
@@ -1,8 +1,15 @@
 from flask import Flask
 from flask_jwt_extended import JWTManager, create_access_token
-from src.controllers.post import app as post_bp
+from src.controllers.post import app as post_bp, delete_posts_by_author
 from src.app import db, User, Post
+from src.models import PostDailySummary
 import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.group_commit import GroupCommitWriter
+from src.post_summary import rebuild_summaries, record_summary
+from datetime import datetime, timedelta
+from src import analytics, archive, change_feed, sharding, shard_events
 
 @pytest.fixture
 def app():
@@ -62,4 +69,626 @@ def access_token(app):
     """
     with app.app_context():
         user = User.query.filter_by(username='testuser').first()
-        return create_access_token(identity=str(user.id))
\ No newline at end of file
+        return create_access_token(identity=str(user.id))
+
+def test_get_posts_by_ids(client, app):
+    """
+    Test case for retrieving several posts by ID in one request.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+    
+    Asserts:
+        The response status code is 200.
+        The posts are returned in the requested order and missing IDs are reported.
+    """
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        first = Post(title='first', body='first body', author_id=user.id)
+        second = Post(title='second', body='second body', author_id=user.id)
+        db.session.add_all([first, second])
+        db.session.commit()
+        first_id, second_id = first.id, second.id
+
+    response = client.get(f'/posts/?ids={second_id},99,{first_id}')
+    assert response.status_code == 200
+    assert [post['id'] for post in response.json['posts']] == [second_id, first_id]
+    assert response.json['missing'] == [99]
+
+
+def test_get_posts_by_ids_invalid(client):
+    """
+    Test case for retrieving posts with a malformed ID list.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The response status code is 400 and the message does not echo the input.
+    """
+    response = client.get('/posts/?ids=1,abc')
+    assert response.status_code == 400
+    assert response.json == {"message": "ids must be a comma-separated list of integers"}
+
+
+def test_create_post_group_commit(app, access_token):
+    """
+    Test case for creating posts concurrently through the group commit writer.
+    
+    Args:
+        app (Flask): The Flask application instance.
+        access_token (str): The access token for the test user.
+    
+    Asserts:
+        Every request gets its own post ID and the posts share fewer transactions.
+    """
+    writer = GroupCommitWriter(app, window=0.05)
+    app.extensions["post_writer"] = writer
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    def create(i):
+        return app.test_client().post('/posts/', json={'title': f't{i}', 'body': 'b'}, headers=headers)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(create, range(8)))
+    writer.stop()
+
+    assert [r.status_code for r in responses] == [201] * 8
+    assert len({r.json['id'] for r in responses}) == 8
+    assert [r.json['title'] for r in responses] == [f't{i}' for i in range(8)]
+    assert writer.rows == 8
+    assert writer.batches < 8
+
+
+def test_group_commit_isolates_failed_row(app):
+    """
+    Test case for a batch containing a post that cannot be inserted.
+    
+    Args:
+        app (Flask): The Flask application instance.
+    
+    Asserts:
+        Only the invalid post fails; the posts batched with it are still created.
+    """
+    with app.app_context():
+        user_id = User.query.filter_by(username='testuser').first().id
+    writer = GroupCommitWriter(app, window=0.2)
+
+    futures = [writer.submit('a', 'b', user_id), writer.submit(None, 'b', user_id), writer.submit('c', 'b', user_id)]
+    writer.stop()
+
+    assert [future.result()['title'] for future in (futures[0], futures[2])] == ['a', 'c']
+    with pytest.raises(Exception):
+        futures[1].result()
+    with app.app_context():
+        assert sorted(db.session.execute(db.select(Post.title)).scalars()) == ['a', 'c']
+
+
+def test_create_post_group_commit_timeout(client, app, access_token, mocker):
+    """
+    Test case for a post the group commit writer does not confirm in time.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+        access_token (str): The access token for the test user.
+    
+    Asserts:
+        The response status code is 503 and carries a Retry-After header.
+    """
+    writer = mocker.Mock()
+    writer.submit.return_value.result.side_effect = TimeoutError
+    app.extensions["post_writer"] = writer
+
+    response = client.post('/posts/', json={'title': 't', 'body': 'b'}, headers={'Authorization': f'Bearer {access_token}'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_post_analytics(client, app, mocker, vectorized):
+    """
+    Test case for the post analytics endpoint, with and without NumPy.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+        vectorized (bool): Whether NumPy is used for the aggregation.
+    
+    Asserts:
+        Buckets, per-author counts and body length stats match the posts, and new
+        posts are picked up by the cached range.
+    """
+    if vectorized:
+        pytest.importorskip("numpy")
+    else:
+        mocker.patch('src.analytics.np', None)
+    with app.app_context():
+        user_id = User.query.filter_by(username='testuser').first().id
+        db.session.add_all([
+            Post(title='a', body='x' * 10, author_id=user_id, created=datetime(2025, 1, 6, 10)),
+            Post(title='b', body='x' * 20, author_id=user_id, created=datetime(2025, 1, 6, 12)),
+            Post(title='c', body='x' * 30, author_id=99, created=datetime(2025, 1, 8, 9)),
+        ])
+        db.session.commit()
+
+    response = client.get('/posts/analytics?bucket=day&from=2025-01-01T00:00:00')
+    assert response.status_code == 200
+    data = response.json
+    assert data['total'] == 3
+    assert [b['count'] for b in data['buckets']] == [2, 1]
+    assert data['authors'] == [
+        {'author_id': user_id, 'count': 2, 'total_length': 30},
+        {'author_id': 99, 'count': 1, 'total_length': 30},
+    ]
+    assert data['body_length']['p50'] == 20
+    assert data['body_length']['max'] == 30
+
+    with app.app_context():
+        db.session.add(Post(title='d', body='x', author_id=99, created=datetime(2025, 1, 9)))
+        db.session.commit()
+
+    data = client.get('/posts/analytics?bucket=week&from=2025-01-01T00:00:00').json
+    assert data['total'] == 4
+    assert data['buckets'] == [{'start': 'Mon, 06 Jan 2025 00:00:00 GMT', 'count': 4}]
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_post_analytics_exact_bounds_and_version(client, app, mocker, vectorized):
+    """
+    Test case for analytics over bounds inside a bucket, after a change made elsewhere.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+        vectorized (bool): Whether NumPy is used for the aggregation.
+    
+    Asserts:
+        Posts outside the exact bounds are left out even though the cached range is
+        widened to whole days, and a deletion that only bumped the analytics version,
+        as another process would, is seen by the cached range.
+    """
+    if vectorized:
+        pytest.importorskip("numpy")
+    else:
+        mocker.patch('src.analytics.np', None)
+    with app.app_context():
+        user_id = User.query.filter_by(username='testuser').first().id
+        db.session.add_all([
+            Post(title='a', body='x' * 10, author_id=user_id, created=datetime(2025, 1, 6, 10)),
+            Post(title='b', body='x' * 20, author_id=user_id, created=datetime(2025, 1, 6, 12)),
+            Post(title='c', body='x' * 30, author_id=user_id, created=datetime(2025, 1, 6, 14)),
+        ])
+        db.session.commit()
+
+    url = '/posts/analytics?bucket=day&from=2025-01-06T11:00:00&to=2025-01-06T20:00:00'
+    assert client.get(url).json['total'] == 2
+
+    with app.app_context():
+        db.session.execute(db.delete(Post).where(Post.title == 'c'))
+        analytics.mark_stale()
+        db.session.commit()
+
+    data = client.get(url).json
+    assert data['total'] == 1
+    assert data['body_length']['max'] == 20
+    assert app.extensions['analytics_cache'].nbytes > 0
+
+
+def test_post_analytics_cold_range_does_not_block_others(client, app, mocker):
+    """
+    Test case for an analytics request while another one scans a range that is not cached.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+    
+    Asserts:
+        A request for another range is answered while the cold scan is still running,
+        and both ranges are cached afterwards.
+    """
+    started, release = threading.Event(), threading.Event()
+    fetch = analytics._fetch_columns
+
+    def slow_fetch(start, end, after_id):
+        if start is None:
+            started.set()
+            release.wait(5)
+        return fetch(start, end, after_id)
+
+    mocker.patch('src.analytics._fetch_columns', side_effect=slow_fetch)
+
+    def cold():
+        with app.app_context():
+            return client.get('/posts/analytics').status_code
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(cold)
+        assert started.wait(5)
+        other = client.get('/posts/analytics?from=2025-01-06T00:00:00')
+        blocked = not pending.done()
+        release.set()
+        assert pending.result() == 200
+
+    assert other.status_code == 200
+    assert blocked
+    assert len(app.extensions['analytics_cache']._entries) == 2
+
+
+def test_post_analytics_invalid_bucket(client):
+    """
+    Test case for the post analytics endpoint with an unknown bucket.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The response status code is 400.
+    """
+    assert client.get('/posts/analytics?bucket=year').status_code == 400
+
+
+def test_post_stats_summary(client, app, access_token):
+    """
+    Test case for the daily summary maintained on create and delete, and its rebuild.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+        access_token (str): The access token for the test user.
+    
+    Asserts:
+        /posts/stats follows creations and deletions, and a rebuild gives the same rows.
+    """
+    headers = {'Authorization': f'Bearer {access_token}'}
+    ids = [
+        client.post('/posts/', json={'title': 't', 'body': body}, headers=headers).json['id']
+        for body in ('abc', 'ção', 'xy')
+    ]
+    client.delete(f'/posts/{ids[-1]}')
+
+    stats = client.get('/posts/stats?from=2000-01-01').json
+    assert stats['total'] == {'count': 2, 'total_bytes': 8}
+    assert len(stats['days']) == 1
+    assert stats['authors'][0]['count'] == 2
+
+    with app.app_context():
+        rebuilt = rebuild_summaries(workers=2, chunk_size=1)
+    assert rebuilt == 1
+    assert client.get('/posts/stats?from=2000-01-01').json == stats
+    assert client.get('/posts/stats?to=2000-01-01').json['total'] == {'count': 0, 'total_bytes': 0}
+
+
+def test_post_stats_invalid_author(client):
+    """
+    Test case for the post stats endpoint with a malformed author ID.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+    
+    Asserts:
+        The response status code is 400.
+    """
+    assert client.get('/posts/stats?author_id=abc').status_code == 400
+
+
+def test_record_summary_only_deletes_touched_rows(app):
+    """
+    Test case for the removal of emptied summary rows.
+    
+    Args:
+        app (Flask): The Flask application instance.
+    
+    Asserts:
+        A decrement removes its own row once it reaches zero and leaves the other
+        rows alone, even those with a zero count.
+    """
+    with app.app_context():
+        record_summary([(datetime(2025, 1, 1), 1, 1, 5), (datetime(2025, 1, 2), 2, 0, 3)])
+        db.session.commit()
+
+        record_summary([(datetime(2025, 1, 1), 1, -1, -5)])
+        db.session.commit()
+
+        rows = db.session.execute(db.select(PostDailySummary.author_id, PostDailySummary.count)).all()
+    assert rows == [(2, 0)]
+
+
+def test_post_changes(client, access_token):
+    """
+    Test case for polling the post change log with a cursor.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for the test user.
+    
+    Asserts:
+        Creations, updates and deletions are logged in order and the cursor advances.
+    """
+    headers = {'Authorization': f'Bearer {access_token}'}
+    post_id = client.post('/posts/', json={'title': 't', 'body': 'b'}, headers=headers).json['id']
+    client.patch(f'/posts/{post_id}', json={'title': 'u'})
+    client.delete(f'/posts/{post_id}')
+
+    first = client.get('/posts/changes?since=0&limit=2').json
+    second = client.get(f"/posts/changes?since={first['next']}").json
+
+    assert [c['op'] for c in first['changes']] == ['create', 'update']
+    assert [c['op'] for c in second['changes']] == ['delete']
+    assert all(c['post_id'] == post_id for c in first['changes'] + second['changes'])
+    assert client.get(f"/posts/changes?since={second['next']}").json == {'changes': [], 'next': second['next']}
+
+
+def test_post_changes_stream(client, app, access_token):
+    """
+    Test case for the Server-Sent Events stream of the post change log.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+        access_token (str): The access token for the test user.
+    
+    Asserts:
+        The stream replays the backlog, then delivers live changes to every subscriber.
+    """
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.post('/posts/', json={'title': 'old', 'body': 'b'}, headers=headers)
+
+    streams = [iter(client.get('/posts/changes/stream?since=0', buffered=False).response) for _ in range(2)]
+    backlog = [next(stream) for stream in streams]
+    client.post('/posts/', json={'title': 'new', 'body': 'b'}, headers=headers)
+    live = [next(stream) for stream in streams]
+
+    assert all(b'id: 1\nevent: create\n' in event for event in backlog)
+    assert all(b'id: 2\nevent: create\n' in event for event in live)
+    for stream in streams:
+        stream.close()
+
+
+def test_change_hub_restarts_from_head(client, app, access_token):
+    """
+    Test case for a change hub whose poller stopped after the last subscriber left.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        app (Flask): The Flask application instance.
+        access_token (str): The access token for the test user.
+    
+    Asserts:
+        A new subscriber only receives the changes written after it subscribed,
+        not the ones written while the poller was stopped.
+    """
+    headers = {'Authorization': f'Bearer {access_token}'}
+    hub = change_feed.ChangeHub(app, interval=0.01)
+    with app.app_context():
+        hub.unsubscribe(hub.subscribe())
+    for _ in range(500):
+        if hub._thread is None:
+            break
+        threading.Event().wait(0.01)
+    assert hub._thread is None
+
+    client.post('/posts/', json={'title': 'unseen', 'body': 'b'}, headers=headers)
+    with app.app_context():
+        subscriber = hub.subscribe()
+    client.post('/posts/', json={'title': 'seen', 'body': 'b'}, headers=headers)
+    hub.notify()
+
+    assert subscriber.get(timeout=5)['seq'] == 2
+    hub.unsubscribe(subscriber)
+
+
+def test_archived_posts_remain_readable(tmp_path):
+    """
+    Test case for reading posts after they were moved to the archive database.
+    
+    Args:
+        tmp_path (Path): A temporary directory for the archive database.
+    
+    Asserts:
+        Old posts leave the post table but are still returned by get, multi-get and,
+        when asked for, list, and their IDs are not handed out again.
+    """
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['POST_ARCHIVE_PATH'] = str(tmp_path / 'archive.sqlite')
+    db.init_app(app)
+    archive.init_app(app)
+    app.register_blueprint(post_bp)
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='testuser', password='testpassword', role_id=1)
+        db.session.add(user)
+        db.session.flush()
+        old = datetime(2020, 1, 1)
+        db.session.add_all([Post(title=f'old {i}', body='b', author_id=user.id, created=old) for i in range(4)])
+        db.session.add(Post(title='new', body='b', author_id=user.id))
+        db.session.commit()
+        db.session.execute(db.delete(Post).where(Post.title == 'new'))
+        db.session.commit()
+
+        moved = archive.archive_posts(timedelta(days=30), batch_size=2)
+        db.session.add(Post(title='newer', body='b', author_id=user.id))
+        db.session.commit()
+        hot = db.session.execute(db.select(Post.id)).scalars().all()
+
+    assert moved == 4
+    assert hot == [6]
+    assert client.get('/posts/1').json['title'] == 'old 0'
+    assert client.get('/posts/9').status_code == 404
+    assert [p['id'] for p in client.get('/posts/').json['posts']] == [6]
+    assert [p['id'] for p in client.get('/posts/?archived=true').json['posts']] == [1, 2, 3, 4, 6]
+    assert client.get('/posts/?ids=6,2,9').json == {
+        'posts': [client.get('/posts/6').json, client.get('/posts/2').json],
+        'missing': [9],
+    }
+
+    with app.app_context():
+        db.drop_all()
+
+
+def test_sharded_posts(tmp_path):
+    """
+    Test case for creating, reading, updating and deleting posts across shards.
+    
+    Args:
+        tmp_path (Path): A temporary directory for the shard databases.
+    
+    Asserts:
+        Posts are routed by author, listed in (created, id) order, and the author counters are
+        correct once the shard events are applied. Posts of the post table stay readable.
+    """
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['JWT_SECRET_KEY'] = 'super-secret'
+    app.config['POST_SHARDS'] = [f"sqlite:///{tmp_path / f'posts-{i}.sqlite'}" for i in range(2)]
+    db.init_app(app)
+    JWTManager(app)
+    sharding.init_app(app)
+    shard_events.init_app(app)
+    app.register_blueprint(post_bp)
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f'user{i}', password='p', role_id=1) for i in range(2)]
+        db.session.add_all(users)
+        db.session.commit()
+        tokens = [create_access_token(identity=str(user.id)) for user in users]
+
+    created = [
+        client.post('/posts/', json={'title': f't{i}', 'body': 'b'},
+                    headers={'Authorization': f'Bearer {tokens[i % 2]}'}).json
+        for i in range(4)
+    ]
+    router = app.extensions['post_shards']
+
+    assert {router.engine_for_id(p['id']) for p in created} == set(router.engines)
+    assert client.get(f"/posts/{created[1]['id']}").json['title'] == 't1'
+    assert [p['id'] for p in client.get('/posts/').json['posts']] == [p['id'] for p in created]
+    assert client.patch(f"/posts/{created[0]['id']}", json={'title': 'u'}).json['title'] == 'u'
+    assert client.delete(f"/posts/{created[2]['id']}").status_code == 204
+    assert client.get(f"/posts/{created[2]['id']}").status_code == 404
+
+    with app.app_context():
+        assert [db.session.get(User, user.id).post_count for user in users] == [0, 0]
+        assert app.extensions['post_shard_events'].apply_pending() == 6
+        db.session.expire_all()
+        assert [db.session.get(User, user.id).post_count for user in users] == [1, 2]
+        legacy = Post(title='legacy', body='b', author_id=users[0].id)
+        db.session.add(legacy)
+        db.session.commit()
+        legacy_id = legacy.id
+    assert client.get(f"/posts/{legacy_id}").json['title'] == 'legacy'
+    assert legacy_id in [p['id'] for p in client.get('/posts/').json['posts']]
+
+    with app.app_context():
+        db.drop_all()
+    router.dispose()
+
+
+def test_sharded_post_analytics(tmp_path):
+    """
+    Test case for the post analytics endpoint when sharding is enabled.
+
+    Args:
+        tmp_path (Path): A temporary directory for the shard databases.
+
+    Asserts:
+        Posts of every shard and of the post table are counted, and new posts are seen
+        by the next request.
+    """
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['POST_SHARDS'] = [f"sqlite:///{tmp_path / f'posts-{i}.sqlite'}" for i in range(2)]
+    db.init_app(app)
+    sharding.init_app(app)
+    app.register_blueprint(post_bp)
+    client = app.test_client()
+    router = app.extensions['post_shards']
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(Post(title='legacy', body='x' * 30, author_id=3, created=datetime(2025, 1, 8, 9)))
+        db.session.commit()
+        for author_id, size in ((1, 10), (2, 20)):
+            post = router.create('t', 'x' * size, author_id)
+            router.update(post['id'], {'created': datetime(2025, 1, 6, 10)})
+
+    data = client.get('/posts/analytics?bucket=day&from=2025-01-01T00:00:00').json
+    assert data['total'] == 3
+    assert [b['count'] for b in data['buckets']] == [2, 1]
+    assert data['authors'] == [
+        {'author_id': 1, 'count': 1, 'total_length': 10},
+        {'author_id': 2, 'count': 1, 'total_length': 20},
+        {'author_id': 3, 'count': 1, 'total_length': 30},
+    ]
+
+    with app.app_context():
+        post = router.create('t', 'x', 2)
+        router.update(post['id'], {'created': datetime(2025, 1, 9)})
+    assert client.get('/posts/analytics?bucket=week&from=2025-01-01T00:00:00').json['total'] == 4
+
+    with app.app_context():
+        db.drop_all()
+    router.dispose()
+
+
+def test_sharded_delete_posts_by_author_retry(tmp_path, mocker):
+    """
+    Test case for deleting the posts of an author across shards when applying the events fails once.
+
+    Args:
+        tmp_path (Path): A temporary directory for the shard databases.
+        mocker (MockerFixture): The pytest-mock fixture.
+
+    Asserts:
+        Every post is deleted, a batch of events that fails while recording the summaries
+        is kept, and applying it again brings the summaries back to zero.
+    """
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['JWT_SECRET_KEY'] = 'super-secret'
+    app.config['POST_SHARDS'] = [f"sqlite:///{tmp_path / f'posts-{i}.sqlite'}" for i in range(2)]
+    db.init_app(app)
+    JWTManager(app)
+    sharding.init_app(app)
+    shard_events.init_app(app)
+    app.register_blueprint(post_bp)
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='user', password='p', role_id=1)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        token = create_access_token(identity=str(user_id))
+    for i in range(3):
+        client.post('/posts/', json={'title': f't{i}', 'body': 'b'}, headers={'Authorization': f'Bearer {token}'})
+    router = app.extensions['post_shards']
+    applier = app.extensions['post_shard_events']
+
+    with app.app_context():
+        applier.apply_pending()
+        assert delete_posts_by_author(user_id, batch_size=2) == 3
+        assert router.list_posts() == []
+
+        failing = mocker.patch('src.shard_events.record_summary', side_effect=RuntimeError("disk full"))
+        with pytest.raises(RuntimeError):
+            applier.apply_pending()
+        mocker.stop(failing)
+        assert applier.apply_pending() == 3
+        counts = db.session.execute(db.select(PostDailySummary.count).where(PostDailySummary.author_id == user_id))
+        assert sum(counts.scalars()) == 0
+        assert db.session.get(User, user_id).post_count == 0
+        db.drop_all()
+    router.dispose()
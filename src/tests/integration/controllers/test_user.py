@@ -13,7 +13,7 @@ def test_get_user_success(client):
     
     Asserts:
         The response status code is 200 (OK).
-        The response JSON matches the expected user data.
+        The response JSON matches the expected user data, without the password hash.
     """
     # Given
     role = Role(name='admin')
@@ -31,10 +31,12 @@ def test_get_user_success(client):
     assert response.status_code == HTTPStatus.OK 
     assert response.json == {"id": user.id, 
                              "username": user.username, 
-                             "password": user.password,
                              "role": 
-                                 {"id": role.id, "name": role.name}
+                                 {"id": role.id, "name": role.name},
+                             "post_count": 0,
+                             "last_post_at": None,
                              }
+    assert "password" not in response.json
 
 def test_get_user_not_found(client):
     """
@@ -92,13 +94,13 @@ def test_list_users(client, access_token):
     
     Asserts:
         The response status code is 200 (OK).
-        The response JSON matches the expected list of users.
+        The response JSON matches the expected list of users, without password hashes.
     """
     # Given
     role = db.session.execute(db.select(Role)).scalar()
     user = db.session.execute(db.select(User).where(User.username == "test")).scalar()
     
-    response = client.post('/auth/login', json={"username": user.username, "password": user.password})
+    response = client.post('/auth/login', json={"username": user.username, "password": "test"})
     access_token = response.json['access_token']
     
     # When
@@ -111,11 +113,151 @@ def test_list_users(client, access_token):
             {
                 "id": user.id, 
                 "username": user.username, 
-                "password": user.password,
                 "role": {
                     "id": role.id, 
                     "name": role.name
-                }
+                },
+                "post_count": 0,
+                "last_post_at": None,
             }
         ]
-    }
\ No newline at end of file
+    }
+    assert all("password" not in user for user in response.json["users"])
+
+def test_get_users_by_ids(client, access_token):
+    """
+    Test case for retrieving several users by ID in one request.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for authentication.
+    
+    Asserts:
+        The response status code is 200 (OK).
+        The users are returned in the requested order and missing IDs are reported.
+    """
+    # Given
+    role = db.session.execute(db.select(Role)).scalar()
+    other = User(username='other', password='other', role_id=role.id)
+    db.session.add(other)
+    db.session.commit()
+    admin = db.session.execute(db.select(User).where(User.username == "test")).scalar()
+    
+    # When
+    response = client.get(f'/users/?ids={other.id},42,{admin.id}', headers={'Authorization': f'Bearer {access_token}'})
+    
+    # Then
+    assert response.status_code == HTTPStatus.OK
+    assert [user["username"] for user in response.json["users"]] == ["other", "test"]
+    assert response.json["missing"] == [42]
+
+def test_delete_user_revokes_tokens(client, access_token, app):
+    """
+    Test case for revoking the tokens of a deleted user.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for authentication.
+        app (Flask): The Flask application instance.
+    
+    Asserts:
+        The deletion is accepted, the user's existing token is rejected right away,
+        and the user is deleted once the job has run.
+    """
+    # Given
+    role = db.session.execute(db.select(Role)).scalar()
+    other = User(username='other', password='other', role_id=role.id)
+    db.session.add(other)
+    db.session.commit()
+    other_id = other.id
+    other_token = client.post('/auth/login', json={"username": "other", "password": "other"}).json['access_token']
+    
+    # When
+    response = client.delete(f'/users/{other_id}', headers={'Authorization': f'Bearer {access_token}'})
+    
+    # Then
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert app.extensions["revocation_store"].is_revoked({"sub": str(other_id), "iat": 0})
+    response = client.get('/users/', headers={'Authorization': f'Bearer {other_token}'})
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert app.extensions["jobs"].run_pending() == 1
+    assert db.session.get(User, other_id) is None
+
+def test_delete_user_pending_cannot_log_in(client, access_token, app):
+    """
+    Test case for a user whose deletion is queued but has not run yet.
+
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for authentication.
+        app (Flask): The Flask application instance.
+
+    Asserts:
+        The user is marked inactive by the request, and can neither log in nor
+        refresh a token until the job deletes them.
+    """
+    # Given
+    role = db.session.execute(db.select(Role)).scalar()
+    other = User(username='other', password='other', role_id=role.id)
+    db.session.add(other)
+    db.session.commit()
+    other_id = other.id
+    refresh_token = client.post('/auth/login', json={"username": "other", "password": "other"}).json['refresh_token']
+
+    # When
+    client.delete(f'/users/{other_id}', headers={'Authorization': f'Bearer {access_token}'})
+    login = client.post('/auth/login', json={"username": "other", "password": "other"})
+    refresh = client.post('/auth/refresh', headers={'Authorization': f'Bearer {refresh_token}'})
+
+    # Then
+    assert login.status_code == HTTPStatus.UNAUTHORIZED
+    assert refresh.status_code == HTTPStatus.UNAUTHORIZED
+    db.session.expire_all()
+    assert db.session.get(User, other_id).active is False
+
+def test_post_stats_and_order(client, access_token):
+    """
+    Test case for the per-author post counters and the post_count ordering.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for authentication.
+    
+    Asserts:
+        The counters follow post creation and deletion, and users are sorted by post count.
+    """
+    # Given
+    role = db.session.execute(db.select(Role)).scalar()
+    other = User(username='other', password='other', role_id=role.id)
+    db.session.add(other)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {access_token}'}
+    
+    # When
+    for title in ("a", "b"):
+        client.post('/posts/', json={"title": title, "body": "body"}, headers=headers)
+    admin = db.session.execute(db.select(User).where(User.username == "test")).scalar()
+    stats = client.get(f'/users/{admin.id}').json
+    listing = client.get('/users/?order=post_count', headers=headers).json
+    post_id = client.get('/posts/').json["posts"][0]["id"]
+    client.delete(f'/posts/{post_id}')
+    
+    # Then
+    assert stats["post_count"] == 2
+    assert stats["last_post_at"] is not None
+    assert [user["username"] for user in listing["users"]] == ["test", "other"]
+    assert client.get(f'/users/{admin.id}').json["post_count"] == 1
+
+def test_list_users_invalid_order(client, access_token):
+    """
+    Test case for listing users with an unknown ordering.
+    
+    Args:
+        client (FlaskClient): The test client for the Flask app.
+        access_token (str): The access token for authentication.
+    
+    Asserts:
+        The response status code is 400 (Bad Request).
+    """
+    response = client.get('/users/?order=password', headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
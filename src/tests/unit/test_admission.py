@@ -0,0 +1,84 @@
+import threading
+from flask import Flask, Blueprint
+from src.admission import ConcurrencyLimiter, get_limiter, init_app
+
+def test_concurrency_limiter_fila_cheia():
+    # Given
+    limiter = ConcurrencyLimiter(limit=1, queue=0)
+
+    # When
+    first = limiter.acquire()
+    second = limiter.acquire()
+
+    # Then
+    assert first is True
+    assert second is False
+    assert limiter.rejected == 1
+
+def test_concurrency_limiter_espera_na_fila():
+    # Given
+    limiter = ConcurrencyLimiter(limit=1, queue=1, timeout=5)
+    limiter.acquire()
+    result = []
+    queued = threading.Event()
+    wait_for = limiter._cond.wait_for
+
+    def enter_queue(predicate, timeout):
+        queued.set()
+        return wait_for(predicate, timeout)
+
+    limiter._cond.wait_for = enter_queue
+
+    # When
+    waiter = threading.Thread(target=lambda: result.append(limiter.acquire()))
+    waiter.start()
+    assert queued.wait(5)
+    limiter.release()
+    waiter.join()
+
+    # Then
+    assert result == [True]
+    assert limiter.active == 1
+
+def test_concurrency_limiter_aimd():
+    # Given
+    limiter = ConcurrencyLimiter(limit=10, adaptive=True, target_latency=0.1, decrease=0.5)
+
+    # When
+    limiter.acquire()
+    limiter.release(latency=1.0)
+    slow = limiter.limit
+    limiter.acquire()
+    limiter.release(latency=0.01)
+
+    # Then
+    assert slow == 5
+    assert limiter.limit == 5.2
+
+def test_admission_isola_endpoints():
+    # Given
+    app = Flask(__name__)
+    app.config["ADMISSION_LIMITS"] = {"post": {"limit": 1, "queue": 0}, "role.index": {"limit": 1, "queue": 0}}
+    init_app(app)
+    bp = Blueprint("post", __name__, url_prefix="/post")
+    bp.add_url_rule("/", "index", lambda: "ok")
+    bp.add_url_rule("/<int:post_id>", "show", lambda post_id: "ok")
+    app.register_blueprint(bp)
+    bp = Blueprint("role", __name__, url_prefix="/role")
+    bp.add_url_rule("/", "index", lambda: "ok")
+    bp.add_url_rule("/<int:role_id>", "show", lambda role_id: "ok")
+    app.register_blueprint(bp)
+    client = app.test_client()
+
+    # When
+    get_limiter(app, "post.index").acquire()
+    saturated = client.get("/post/")
+    cheap = client.get("/post/1")
+    unlimited = client.get("/role/1")
+
+    # Then
+    assert saturated.status_code == 503
+    assert cheap.status_code == 200
+    assert unlimited.status_code == 200
+    assert get_limiter(app, "post.show").active == 0
+    assert get_limiter(app, "role.show") is None
@@ -0,0 +1,145 @@
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from src.app import create_app, db, User, Role, Post
+from src.backfill import Backfill, run_in_migration, backfill_command
+
+@pytest.fixture()
+def file_app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'blog.sqlite'}",
+        'REVOCATION_REFRESH_INTERVAL': 0,
+    })
+    with app.app_context():
+        db.create_all()
+        role = Role(name='admin')
+        db.session.add(role)
+        db.session.commit()
+        db.session.add_all([User(username=f'user{i}', password='test', role_id=role.id) for i in range(5)])
+        db.session.commit()
+        db.session.add_all([Post(title='title', body='body', author_id=author_id) for author_id in (1, 1, 3)])
+        db.session.commit()
+        db.session.execute(sa.update(User).values(post_count=0, active=False))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+def _activate():
+    user = sa.table('user', sa.column('id'), sa.column('active'))
+    return Backfill('user-activate', user, {'active': True}, where=user.c.active.is_(False), batch_size=2)
+
+def _active_users():
+    return db.session.execute(sa.select(User.id).where(User.active).order_by(User.id)).scalars().all()
+
+def test_backfill_em_lotes_sucesso(file_app):
+    # Given
+    backfill = _activate()
+
+    # When
+    first = backfill.run(db.engine, max_batches=1)
+    partial = _active_users()
+    db.session.commit()
+    second = backfill.run(db.engine)
+
+    # Then
+    assert first == (2, 1, False)
+    assert partial == [1, 2]
+    assert second == (3, 2, True)
+    assert _active_users() == [1, 2, 3, 4, 5]
+    checkpoint = backfill.checkpoint(db.engine)
+    assert (checkpoint.last_key, checkpoint.rows) == (5, 5)
+    assert checkpoint.finished_at is not None
+    assert backfill.run(db.engine) == (0, 0, True)
+
+def test_backfill_retoma_apos_interrupcao_erro(file_app):
+    # Given
+    backfill = _activate()
+
+    def interrupt(last_key, rows):
+        if last_key >= 4:
+            raise KeyboardInterrupt
+
+    # When
+    with pytest.raises(KeyboardInterrupt):
+        backfill.run(db.engine, progress=interrupt)
+    interrupted_at = backfill.checkpoint(db.engine).last_key
+    result = backfill.run(db.engine)
+
+    # Then
+    assert interrupted_at == 4
+    assert result == (1, 1, True)
+    assert _active_users() == [1, 2, 3, 4, 5]
+    assert backfill.run(db.engine, restart=True) == (0, 0, True)
+
+def test_run_in_migration_sucesso(file_app):
+    # Given
+    backfill = _activate()
+
+    # When
+    with db.engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        with Operations.context(context), context.begin_transaction():
+            result = run_in_migration(backfill)
+
+    # Then
+    assert result == (5, 3, True)
+    assert _active_users() == [1, 2, 3, 4, 5]
+
+def test_backfill_command_sucesso(file_app):
+    # Given
+    runner = file_app.test_cli_runner()
+
+    # When
+    paused = runner.invoke(backfill_command, ['run', 'user-post-stats', '--batch-size', '2', '--max-batches', '1'])
+    listed = runner.invoke(backfill_command, ['list'])
+    finished = runner.invoke(backfill_command, ['run', 'user-post-stats', '--batch-size', '2'])
+
+    # Then
+    assert paused.exit_code == 0, paused.output
+    assert 'paused, run again to resume' in paused.output
+    assert 'user-post-stats: stopped after key 2, 2 row(s)' in listed.output
+    assert 'Backfill user-post-stats: 3 row(s) in 2 batch(es), finished.' in finished.output
+    counts = db.session.execute(sa.select(User.id, User.post_count).order_by(User.id)).all()
+    assert counts == [(1, 2), (2, 0), (3, 1), (4, 0), (5, 0)]
+
+def test_backfill_command_erro(file_app):
+    result = file_app.test_cli_runner().invoke(backfill_command, ['run', 'missing'])
+    assert result.exit_code != 0
+    assert 'unknown backfill' in result.output
+
+def test_backfill_user_post_stats_com_shards_erro(tmp_path):
+    # Given
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'blog.sqlite'}",
+        'POST_SHARDS': [f"sqlite:///{tmp_path / 'posts-0.sqlite'}"],
+        'REVOCATION_REFRESH_INTERVAL': 0,
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='test', password='test', role_id=1))
+        db.session.commit()
+
+    # When
+    result = app.test_cli_runner().invoke(backfill_command, ['run', 'user-post-stats'])
+
+    # Then
+    assert result.exit_code != 0
+    assert 'reconcile-post-stats' in result.output
+    app.extensions['post_shards'].dispose()
+
+def test_run_in_migration_lote_atomico_erro(file_app, mocker):
+    # Given
+    backfill = _activate()
+    mocker.patch.object(Backfill, '_save', side_effect=RuntimeError('disk full'))
+
+    # When
+    with db.engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        with Operations.context(context), context.begin_transaction():
+            with pytest.raises(RuntimeError):
+                run_in_migration(backfill)
+
+    # Then
+    assert _active_users() == []
@@ -0,0 +1,76 @@
+import gzip
+import zlib
+from flask import Flask
+from src.compression import init_app
+
+def _app():
+    app = Flask(__name__)
+    app.config.update(COMPRESS_MIN_SIZE=100)
+    init_app(app)
+
+    @app.route("/big")
+    def big():
+        return {"items": [{"name": "item", "value": i} for i in range(100)]}
+
+    @app.route("/small")
+    def small():
+        return {"ok": True}
+
+    @app.route("/stream")
+    def stream():
+        def generate():
+            yield '{"items": ['
+            for i in range(100):
+                yield ('' if i == 0 else ',') + f'{{"value": {i}}}'
+            yield ']}'
+        return app.response_class(generate(), mimetype="application/json")
+
+    return app
+
+def test_compressao_gzip():
+    # When
+    response = _app().test_client().get("/big", headers={"Accept-Encoding": "gzip"})
+
+    # Then
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert b'"value":99' in gzip.decompress(response.data).replace(b" ", b"")
+
+def test_compressao_abaixo_do_limite(mocker):
+    # Given
+    compressobj = mocker.spy(zlib, "compressobj")
+
+    # When
+    response = _app().test_client().get("/small", headers={"Accept-Encoding": "gzip"})
+
+    # Then
+    assert "Content-Encoding" not in response.headers
+    assert compressobj.call_count == 0
+
+def test_compressao_sem_accept_encoding():
+    response = _app().test_client().get("/big", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+
+def test_compressao_streaming():
+    # When
+    response = _app().test_client().get("/stream", headers={"Accept-Encoding": "gzip"}, buffered=False)
+    chunks = list(response.response)
+
+    # Then
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(chunks) > 1
+    assert gzip.decompress(b"".join(chunks)).endswith(b'{"value": 99}]}')
+
+def test_compressao_nivel_por_encoding(mocker):
+    # Given
+    compressobj = mocker.spy(zlib, "compressobj")
+    app = Flask(__name__)
+    app.config.update(COMPRESS_MIN_SIZE=0, COMPRESS_LEVELS={"gzip": 1, "br": 11})
+    init_app(app)
+    app.add_url_rule("/", "index", lambda: {"ok": True})
+
+    # When
+    app.test_client().get("/", headers={"Accept-Encoding": "gzip"})
+
+    # Then
+    assert compressobj.call_args.args[0] == 1
@@ -0,0 +1,111 @@
+import json
+import os
+from src.app import create_app, db, User, Role
+from src import forking
+
+def _fork(run):
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        try:
+            result = run()
+        except Exception as e:
+            result = {"error": repr(e)}
+        with os.fdopen(write, "w") as out:
+            json.dump(result, out)
+        os._exit(0)
+    os.close(write)
+    return pid, read
+
+def test_workers_nao_compartilham_conexoes(tmp_path):
+    # Given
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'blog.sqlite'}",
+        'REVOCATION_REFRESH_INTERVAL': 0,
+        'PASSWORD_POOL_WORKERS': 0,
+        # Like the revocation refresh thread, job workers are started after the fork.
+        'JOB_WORKERS': 0,
+        'RAW_SQLITE_READS': True,
+    })
+    with app.app_context():
+        db.create_all()
+        role = Role(name='admin')
+        db.session.add(role)
+        db.session.commit()
+        db.session.add(User(username='test', password='test', role_id=role.id))
+        db.session.commit()
+    client = app.test_client()
+    assert client.get('/users/1').status_code == 200
+    reader = app.extensions['raw_sqlite']
+    with reader.connection() as connection:
+        parent_reader_connection = connection
+
+    def worker():
+        response = client.get('/users/1')
+        with app.app_context(), db.engine.connect() as connection:
+            connection_pid = connection.info['pid']
+        with reader.connection() as connection:
+            reader_shared = connection is parent_reader_connection
+        return {
+            "status": response.status_code,
+            "connection_pid": connection_pid,
+            "reader_shared": reader_shared,
+            "started": app.extensions['forking']['pid'] == os.getpid(),
+            "pid": os.getpid(),
+        }
+
+    # When
+    with app.app_context(), db.engine.connect() as held:
+        parent_pid = held.info['pid']
+        children = []
+        for _ in range(2):
+            # What the server's pre-fork hook does.
+            forking.before_fork()
+            children.append(_fork(worker))
+        results = []
+        for pid, read in children:
+            with os.fdopen(read) as out:
+                results.append(json.load(out))
+            os.waitpid(pid, 0)
+
+    # Then
+    assert parent_pid == os.getpid()
+    assert len({result.get("pid") for result in results}) == 2
+    for result in results:
+        assert result == {
+            "status": 200,
+            "connection_pid": result["pid"],
+            "reader_shared": False,
+            "started": True,
+            "pid": result["pid"],
+        }
+    assert client.get('/users/1').status_code == 200
+
+    reader.close()
+    with app.app_context():
+        db.engine.dispose()
+
+def test_fork_sem_pre_fork_mantem_conexoes(tmp_path):
+    # Given
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'blog.sqlite'}",
+        'REVOCATION_REFRESH_INTERVAL': 0,
+        'PASSWORD_POOL_WORKERS': 0,
+        'JOB_WORKERS': 0,
+    })
+    with app.app_context():
+        db.create_all()
+        idle = db.engine.pool.checkedin()
+
+    # When
+    pid, read = _fork(lambda: {"pid": os.getpid()})
+    with os.fdopen(read) as out:
+        json.load(out)
+    os.waitpid(pid, 0)
+
+    # Then
+    with app.app_context():
+        assert idle > 0
+        assert db.engine.pool.checkedin() == idle
+        db.engine.dispose()
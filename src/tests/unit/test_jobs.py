@@ -0,0 +1,208 @@
+import threading
+import time
+from datetime import timedelta
+import pytest
+import sqlalchemy as sa
+from src.app import create_app, db, Role
+from src.models import Job
+from src import jobs
+from src.utils import utcnow
+
+running = {"now": 0, "max": 0}
+running_lock = threading.Lock()
+attempts = {}
+
+@jobs.job("test-slow")
+def _slow(n):
+    with running_lock:
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+    time.sleep(0.05)
+    with running_lock:
+        running["now"] -= 1
+    return {"n": n}
+
+@jobs.job("test-flaky")
+def _flaky(key, failures):
+    attempts[key] = attempts.get(key, 0) + 1
+    if attempts[key] <= failures:
+        raise RuntimeError(f"attempt {attempts[key]}")
+    db.session.add(Role(name=key))
+
+@jobs.job("test-long")
+def _long(steps, pause):
+    stolen = []
+    for _ in range(steps):
+        time.sleep(pause)
+        jobs.heartbeat()
+        # Another worker polling now.
+        stolen.append(jobs.get_queue()._claim() is not None)
+    return {"stolen": stolen}
+
+@jobs.job("test-lost")
+def _lost(pause):
+    time.sleep(pause)
+    queue = jobs.get_queue()
+    queue.lease = 60
+    claimed_again.append(queue._claim())
+    jobs.heartbeat()
+    db.session.add(Role(name='lost'))
+
+claimed_again = []
+
+def _app(tmp_path, **config):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'blog.sqlite'}",
+        'REVOCATION_REFRESH_INTERVAL': 0,
+        'JOB_RETRY_BACKOFF': 0,
+        'JOB_POLL_INTERVAL': 0.05,
+        **config,
+    })
+    with app.app_context():
+        db.create_all()
+    return app
+
+def _statuses(app):
+    with app.app_context():
+        try:
+            return db.session.execute(sa.select(Job.status, Job.result).order_by(Job.id)).all()
+        finally:
+            db.session.remove()
+
+def test_fila_sobrevive_reinicio_com_limite_de_concorrencia_sucesso(tmp_path):
+    # Given
+    producer = _app(tmp_path, JOB_WORKERS=0)
+    with producer.app_context():
+        for n in range(6):
+            jobs.enqueue("test-slow", n=n)
+        db.session.commit()
+        db.session.remove()
+    producer.extensions['jobs'].start()
+    assert [status for status, _ in _statuses(producer)] == ['queued'] * 6
+
+    # When
+    restarted = _app(tmp_path, JOB_WORKERS=2)
+    restarted.test_client().get('/roles/')
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and any(status != 'succeeded' for status, _ in _statuses(restarted)):
+        time.sleep(0.02)
+    restarted.extensions['jobs'].stop()
+
+    # Then
+    assert _statuses(restarted) == [('succeeded', {"n": n}) for n in range(6)]
+    assert running["max"] == 2
+    for app in (producer, restarted):
+        with app.app_context():
+            db.engine.dispose()
+
+def test_retentativa_apos_falha_sucesso(app):
+    # Given
+    app.extensions['jobs'].retry_backoff = 0
+    job_id = jobs.enqueue("test-flaky", key="retried", failures=1).id
+    db.session.commit()
+
+    # When
+    ran = app.extensions['jobs'].run_pending()
+
+    # Then
+    job = db.session.get(Job, job_id)
+    assert ran == 2
+    assert (job.status, job.attempts) == ('succeeded', 2)
+    assert db.session.execute(sa.select(Role.name)).scalars().all() == ['retried']
+
+def test_retentativas_esgotadas_erro(app):
+    # Given
+    app.extensions['jobs'].retry_backoff = 0
+    job_id = jobs.enqueue("test-flaky", max_attempts=2, key="failing", failures=5).id
+    db.session.commit()
+
+    # When
+    app.extensions['jobs'].run_pending()
+
+    # Then
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts) == ('failed', 2)
+    assert "attempt 2" in job.error
+    assert db.session.execute(sa.select(Role.name)).scalars().all() == []
+
+def test_lease_expirado_retoma_job_sucesso(app):
+    # Given
+    job = jobs.enqueue("test-slow", n=7)
+    job.status, job.attempts, job.lease_until = 'running', 1, utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    # When
+    ran = app.extensions['jobs'].run_pending()
+
+    # Then
+    db.session.refresh(job)
+    assert ran == 1
+    assert (job.status, job.attempts, job.result) == ('succeeded', 2, {"n": 7})
+
+def test_heartbeat_renova_lease_de_job_longo_sucesso(app):
+    # Given
+    app.extensions['jobs'].lease = 0.05
+    job_id = jobs.enqueue("test-long", steps=3, pause=0.1).id
+    db.session.commit()
+
+    # When
+    ran = app.extensions['jobs'].run_one()
+
+    # Then
+    job = db.session.get(Job, job_id)
+    assert ran
+    assert (job.status, job.attempts, job.result) == ('succeeded', 1, {"stolen": [False, False, False]})
+    assert jobs.heartbeat() is None
+
+def test_heartbeat_lease_perdido_erro(app):
+    # Given
+    queue = app.extensions['jobs']
+    queue.lease = 0.05
+    job_id = jobs.enqueue("test-lost", pause=0.1).id
+    db.session.commit()
+
+    # When
+    ran = queue.run_one()
+
+    # Then
+    job = db.session.get(Job, job_id)
+    db.session.refresh(job)
+    assert ran
+    assert claimed_again[-1].id == job_id
+    assert (job.status, job.attempts, job.error) == ('running', 2, None)
+    assert queue.failed == 0
+    assert db.session.execute(sa.select(Role.name).where(Role.name == 'lost')).first() is None
+
+def test_enqueue_tipo_desconhecido_erro(app):
+    with pytest.raises(ValueError):
+        jobs.enqueue("missing")
+
+def test_retry_job_falho_sucesso(app):
+    # Given
+    app.extensions['jobs'].retry_backoff = 0
+    job_id = jobs.enqueue("test-flaky", max_attempts=1, key="retry-cli", failures=1).id
+    db.session.commit()
+    app.extensions['jobs'].run_pending()
+
+    # When
+    result = app.test_cli_runner().invoke(args=['jobs', 'retry', str(job_id)])
+    ran = app.extensions['jobs'].run_pending()
+
+    # Then
+    job = db.session.get(Job, job_id)
+    db.session.refresh(job)
+    assert result.exit_code == 0
+    assert ran == 1
+    assert (job.status, job.attempts) == ('succeeded', 1)
+
+def test_retry_job_nao_falho_erro(app):
+    # Given
+    job_id = jobs.enqueue("test-slow", n=1).id
+    db.session.commit()
+
+    # When
+    result = app.test_cli_runner().invoke(args=['jobs', 'retry', str(job_id)])
+
+    # Then
+    assert result.exit_code != 0
+    assert db.session.get(Job, job_id).status == 'queued'
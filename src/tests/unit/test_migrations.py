@@ -0,0 +1,14 @@
+from pathlib import Path
+from alembic.script import ScriptDirectory
+
+MIGRATIONS = Path(__file__).resolve().parents[3] / "migrations"
+
+def test_migracoes_com_uma_unica_head_sucesso():
+    # Given
+    script = ScriptDirectory(str(MIGRATIONS))
+
+    # When
+    heads = script.get_heads()
+
+    # Then
+    assert len(heads) == 1
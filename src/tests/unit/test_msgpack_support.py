@@ -0,0 +1,45 @@
+import pytest
+from datetime import datetime, timezone
+from flask import Flask, request
+from src.msgpack_support import init_app, packb, unpackb
+
+msgpack = pytest.importorskip("msgpack")
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_app(app)
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return {"received": request.json, "created": datetime(2025, 1, 24, 18, 40)}
+
+    return app.test_client()
+
+def test_resposta_msgpack(client):
+    # When
+    response = client.post("/echo", json={"a": 1}, headers={"Accept": "application/msgpack"})
+
+    # Then
+    assert response.mimetype == "application/msgpack"
+    assert unpackb(response.data) == {
+        "received": {"a": 1},
+        "created": datetime(2025, 1, 24, 18, 40, tzinfo=timezone.utc),
+    }
+
+def test_requisicao_msgpack(client):
+    # When
+    response = client.post("/echo", data=packb({"title": "t"}), content_type="application/msgpack")
+
+    # Then
+    assert response.mimetype == "application/json"
+    assert response.json["received"] == {"title": "t"}
+
+def test_fallback_json(client):
+    response = client.post("/echo", json={"a": 1}, headers={"Accept": "*/*"})
+    assert response.mimetype == "application/json"
+    assert "Accept" in response.headers["Vary"]
+
+def test_requisicao_msgpack_invalida(client):
+    response = client.post("/echo", data=b"\xc1", content_type="application/msgpack")
+    assert response.status_code == 400
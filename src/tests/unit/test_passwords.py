@@ -0,0 +1,32 @@
+import pytest
+from flask import Flask
+from src.passwords import hash_password, verify_password, is_hashed, needs_rehash, SCRYPT, PBKDF2
+
+@pytest.fixture
+def app_context():
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_METHOD=SCRYPT, PASSWORD_SCRYPT_N=2 ** 10)
+    with app.app_context():
+        yield app
+
+@pytest.mark.parametrize("method, params", [
+    (SCRYPT, {"scrypt_n": 2 ** 10}),
+    (PBKDF2, {"pbkdf2_iterations": 1000}),
+])
+def test_hash_password_sucesso(method, params):
+    stored = hash_password("secret", method=method, **params)
+    assert stored.startswith(method + "$")
+    assert is_hashed(stored)
+    assert verify_password(stored, "secret")
+    assert not verify_password(stored, "wrong")
+
+def test_verify_password_plaintext_legado():
+    assert not is_hashed("secret")
+    assert verify_password("secret", "secret")
+    assert not verify_password("secret", "wrong")
+
+def test_needs_rehash(app_context):
+    assert needs_rehash("secret")
+    assert needs_rehash(hash_password("secret", method=SCRYPT, scrypt_n=2 ** 11))
+    assert needs_rehash(hash_password("secret", method=PBKDF2, pbkdf2_iterations=1000))
+    assert not needs_rehash(hash_password("secret", method=SCRYPT, scrypt_n=2 ** 10))
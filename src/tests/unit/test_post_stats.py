@@ -0,0 +1,23 @@
+from src.app import db, User, Role, Post
+from src.post_stats import reconcile_post_stats
+
+def test_reconcile_post_stats(app):
+    # Given
+    role = Role(name='admin')
+    db.session.add(role)
+    db.session.commit()
+    user = User(username='test', password='test', role_id=role.id, post_count=5)
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(Post(title='t', body='b', author_id=user.id))
+    db.session.commit()
+
+    # When
+    drifted = reconcile_post_stats()
+    db.session.refresh(user)
+
+    # Then
+    assert drifted == 1
+    assert user.post_count == 1
+    assert user.last_post_at is not None
+    assert reconcile_post_stats() == 0
@@ -0,0 +1,116 @@
+import os
+import pytest
+from src.app import create_app, db, User, Role
+from src.profiling import list_profiles, profiles_command
+
+@pytest.fixture()
+def profiled_app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'REVOCATION_REFRESH_INTERVAL': 0,
+        'PROFILING': True,
+        'PROFILE_DIR': str(tmp_path),
+        'PROFILE_SAMPLE_RATE': 2,
+        'PROFILE_FLUSH_EVERY': 2,
+        'PROFILE_MAX_FILES': 3,
+    })
+    with app.app_context():
+        db.create_all()
+        role = Role(name='admin')
+        db.session.add(role)
+        db.session.commit()
+        db.session.add(User(username='test', password='test', role_id=role.id))
+        db.session.commit()
+        yield app
+        db.drop_all()
+
+def test_profiling_amostragem_sucesso(profiled_app, tmp_path):
+    # Given
+    client = profiled_app.test_client()
+
+    # When
+    for _ in range(4):
+        client.get('/users/1')
+
+    # Then
+    files = list_profiles(str(tmp_path))
+    assert [os.path.basename(path).split('__')[0] for path in files] == ['user.get_user']
+    assert files[0].endswith('-2.prof')
+
+def test_profiling_retencao_sucesso(profiled_app, tmp_path):
+    # Given
+    client = profiled_app.test_client()
+
+    # When
+    for _ in range(5):
+        client.get('/users/1', headers={'X-Profile': '1'})
+
+    # Then
+    assert len(list_profiles(str(tmp_path))) == 3
+
+def test_profiling_desativado_sucesso(app, client, tmp_path):
+    # Given
+    app.config['PROFILE_DIR'] = str(tmp_path)
+
+    # When
+    client.get('/users/1', headers={'X-Profile': '1'})
+
+    # Then
+    assert 'profile_store' not in app.extensions
+    assert list_profiles(str(tmp_path)) == []
+
+def test_profiles_top_command_sucesso(profiled_app):
+    # Given
+    profiled_app.test_client().get('/users/1', headers={'X-Profile': '1'})
+
+    # When
+    result = profiled_app.test_cli_runner().invoke(profiles_command, ['top', '--limit', '5'])
+
+    # Then
+    assert result.exit_code == 0, result.output
+    assert 'user.get_user  [GET /users/<int:user_id>]  1 sample(s)' in result.output
+    assert 'tottime' in result.output
+
+def test_profiles_top_command_erro(app, tmp_path):
+    # Given
+    app.config['PROFILE_DIR'] = str(tmp_path)
+
+    # When
+    result = app.test_cli_runner().invoke(profiles_command, ['top'])
+
+    # Then
+    assert result.exit_code == 0
+    assert 'No profiles found.' in result.output
+
+def test_profiling_um_perfil_por_processo(profiled_app, tmp_path):
+    # Given
+    client = profiled_app.test_client()
+    store = profiled_app.extensions['profile_store']
+
+    # When
+    with store.active:
+        skipped = client.get('/users/1', headers={'X-Profile': '1'})
+    profiled = client.get('/users/1', headers={'X-Profile': '1'})
+
+    # Then
+    assert skipped.status_code == profiled.status_code == 200
+    assert len(list_profiles(str(tmp_path))) == 1
+    assert not store.active.locked()
+
+def test_profiling_erro_nao_falha_requisicao(profiled_app, tmp_path, mocker):
+    # Given
+    client = profiled_app.test_client()
+    store = profiled_app.extensions['profile_store']
+    enable = mocker.patch('src.profiling.cProfile.Profile.enable', side_effect=ValueError('already active'))
+
+    # When
+    not_started = client.get('/users/1', headers={'X-Profile': '1'})
+    enable.stop()
+    mocker.patch.object(store, 'add', side_effect=OSError('disk full'))
+    not_saved = client.get('/users/1', headers={'X-Profile': '1'})
+
+    # Then
+    assert not_started.status_code == not_saved.status_code == 200
+    assert list_profiles(str(tmp_path)) == []
+    assert not store.active.locked()
@@ -0,0 +1,92 @@
+import pytest
+from flask import Flask, Blueprint
+from src.ratelimit import MemoryBackend, init_app
+
+def test_memory_backend_burst_e_recarga(mocker):
+    # Given
+    clock = mocker.patch('src.ratelimit.time.monotonic', return_value=100.0)
+    backend = MemoryBackend()
+
+    # When
+    allowed = [backend.hit("k", rate=1, burst=3) for _ in range(3)]
+    denied = backend.hit("k", rate=1, burst=3)
+    clock.return_value = 101.0
+    refilled = backend.hit("k", rate=1, burst=3)
+
+    # Then
+    assert allowed == [0, 0, 0]
+    assert denied == 1
+    assert refilled == 0
+
+def test_memory_backend_limite_de_chaves():
+    # Given
+    backend = MemoryBackend(maxsize=2)
+
+    # When
+    for key in ("a", "b", "c"):
+        backend.hit(key, rate=1, burst=1)
+
+    # Then
+    assert len(backend._buckets) == 2
+
+def test_rate_limit_por_username():
+    # Given
+    app = Flask(__name__)
+    app.config["RATELIMITS"] = {"auth": {"username": (0.5, 2)}}
+    init_app(app)
+    bp = Blueprint("auth", __name__)
+    bp.add_url_rule("/login", "login", lambda: "ok", methods=["POST"])
+    app.register_blueprint(bp)
+    client = app.test_client()
+
+    # When
+    responses = [client.post("/login", json={"username": "alice"}) for _ in range(3)]
+    other = client.post("/login", json={"username": "bob"})
+
+    # Then
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[-1].headers["Retry-After"] == "2"
+    assert other.status_code == 200
+
+def test_memory_backend_negado_nao_consome_outros_buckets(mocker):
+    # Given
+    mocker.patch('src.ratelimit.time.monotonic', return_value=100.0)
+    backend = MemoryBackend()
+    backend.hit("user", rate=1, burst=1)
+
+    # When
+    denied = backend.hit_many([("client", 1, 2), ("user", 1, 1)])
+    allowed = [backend.hit("client", rate=1, burst=2) for _ in range(2)]
+
+    # Then
+    assert denied == 1
+    assert allowed == [0, 0]
+
+def test_rate_limit_taxa_invalida_erro():
+    # Given
+    app = Flask(__name__)
+    app.config["RATELIMITS"] = {"auth": {"client": (0, 5)}}
+
+    # When / Then
+    with pytest.raises(ValueError):
+        init_app(app)
+
+def test_rate_limit_username_por_cliente():
+    # Given
+    app = Flask(__name__)
+    app.config["RATELIMITS"] = {"auth": {"username": (0.5, 2)}}
+    init_app(app)
+    bp = Blueprint("auth", __name__)
+    bp.add_url_rule("/login", "login", lambda: "ok", methods=["POST"])
+    app.register_blueprint(bp)
+    attacker = app.test_client()
+    victim = app.test_client()
+    victim.environ_base["REMOTE_ADDR"] = "10.0.0.2"
+
+    # When
+    responses = [attacker.post("/login", json={"username": "alice"}) for _ in range(3)]
+    other_client = victim.post("/login", json={"username": "alice"})
+
+    # Then
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert other_client.status_code == 200
@@ -0,0 +1,92 @@
+import time
+from datetime import timedelta
+from sqlalchemy.exc import OperationalError
+from src.app import db
+from src.revocation import RevocationStore, revoke_token
+from src.utils import utcnow
+
+def test_revocation_store_jti(mocker):
+    # Given
+    store = RevocationStore()
+
+    # When
+    store.add(mocker.Mock(id=1, jti="abc", user_id=None, expires_at=None))
+
+    # Then
+    assert store.is_revoked({"jti": "abc", "sub": "1", "iat": 0})
+    assert not store.is_revoked({"jti": "def", "sub": "1", "iat": 0})
+    assert store.last_id == 1
+
+def test_revocation_store_usuario(mocker):
+    # Given
+    store = RevocationStore()
+    revoked_at = utcnow()
+
+    # When
+    store.add(mocker.Mock(id=2, jti=None, user_id=7, revoked_at=revoked_at, expires_at=None))
+
+    # Then
+    assert store.is_revoked({"jti": "x", "sub": "7", "iat": 0})
+    assert not store.is_revoked({"jti": "x", "sub": "8", "iat": 0})
+    assert not store.is_revoked({"jti": "x", "sub": "7", "iat": 2 ** 40})
+
+def test_revocation_store_remove_expirados_sucesso(mocker):
+    # Given
+    store = RevocationStore()
+    now = utcnow()
+    store.add(mocker.Mock(id=1, jti="old", user_id=None, expires_at=now - timedelta(seconds=1)))
+    store.add(mocker.Mock(id=2, jti="new", user_id=None, expires_at=now + timedelta(hours=1)))
+    store.add(mocker.Mock(id=3, jti=None, user_id=7, revoked_at=now, expires_at=now - timedelta(seconds=1)))
+
+    # When
+    dropped = store.prune()
+
+    # Then
+    assert dropped == 2
+    assert list(store.jtis) == ["new"]
+    assert store.users == {}
+    assert store.last_id == 3
+
+def test_revoke_token_apos_commit_sucesso(app):
+    # Given
+    store = app.extensions["revocation_store"]
+    payload = {"jti": "abc", "exp": time.time() + 60}
+
+    # When
+    revoke_token(payload)
+    pending = store.is_revoked(payload)
+    db.session.commit()
+
+    # Then
+    assert not pending
+    assert store.is_revoked(payload)
+
+def test_revoke_token_rollback_erro(app):
+    # Given
+    store = app.extensions["revocation_store"]
+    payload = {"jti": "abc", "exp": time.time() + 60}
+
+    # When
+    revoke_token(payload)
+    db.session.flush()
+    db.session.rollback()
+
+    # Then
+    assert not store.is_revoked(payload)
+
+def test_revocation_store_nao_carregado_rejeita_tokens(app, client, access_token, mocker):
+    # Given
+    store = app.extensions["revocation_store"]
+    store.loaded = False
+    mocker.patch.object(store, "refresh", side_effect=OperationalError("SELECT", {}, Exception("locked")))
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    # When
+    rejected = client.get('/users/', headers=headers)
+    mocker.stopall()
+    accepted = client.get('/users/', headers=headers)
+
+    # Then
+    assert rejected.status_code == 401
+    assert accepted.status_code == 200
+    assert store.loaded
@@ -0,0 +1,96 @@
+import time
+import pytest
+from sqlalchemy import event
+from src.app import create_app, db, Role
+from src import roles
+
+def _count_queries(app):
+    queries = []
+    event.listen(db.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: queries.append(statement))
+    return queries
+
+def test_list_roles_sem_sql_sucesso(app, client):
+    # Given
+    db.session.add_all([Role(name='admin'), Role(name='normal')])
+    db.session.commit()
+    client.get('/roles/')
+    queries = _count_queries(app)
+
+    # When
+    response = client.get('/roles/')
+
+    # Then
+    assert response.json == [{"id": 1, "name": "admin"}, {"id": 2, "name": "normal"}]
+    assert queries == []
+
+def test_snapshot_trocado_apos_create_e_delete_sucesso(app, client):
+    # Given
+    before = roles.snapshot()
+
+    # When
+    client.post('/roles/', json={"name": "editor"})
+    created = roles.snapshot()
+    client.delete(f'/roles/{created.by_name["editor"]}')
+    app.extensions['jobs'].run_pending()
+    deleted = roles.snapshot()
+
+    # Then
+    assert dict(before.by_id) == {}
+    assert dict(created.by_id) == {1: 'editor'}
+    assert dict(deleted.by_id) == {}
+    assert created.version < deleted.version
+
+def test_snapshot_imutavel_erro(app):
+    # Given
+    db.session.add(Role(name='admin'))
+    db.session.commit()
+    snapshot = roles.snapshot()
+
+    # When / Then
+    with pytest.raises(TypeError):
+        snapshot.by_id[1] = 'normal'
+    with pytest.raises(TypeError):
+        snapshot.by_name['normal'] = 1
+
+def test_resolucao_de_role_sem_sql_sucesso(app, client, access_token):
+    # Given
+    client.get('/users/1')
+    queries = _count_queries(app)
+
+    # When
+    response = client.get('/users/1')
+    name = roles.name_of(1)
+
+    # Then
+    assert response.json["role"] == {"id": 1, "name": "admin"}
+    assert name == 'admin'
+    assert not any('FROM role' in query for query in queries)
+
+def test_processos_convergem_pela_versao_sucesso(tmp_path):
+    # Given
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'blog.sqlite'}",
+        'REVOCATION_REFRESH_INTERVAL': 0,
+        'ROLE_VERSION_CHECK_INTERVAL': 0.5,
+    }
+    first = create_app(config)
+    with first.app_context():
+        db.create_all()
+        db.session.add(Role(name='admin'))
+        db.session.commit()
+    second = create_app(config)
+    first.test_client().get('/roles/')
+
+    # When
+    second.test_client().post('/roles/', json={"name": "editor"})
+    stale = first.test_client().get('/roles/').json
+    time.sleep(0.6)
+    fresh = first.test_client().get('/roles/').json
+
+    # Then
+    assert stale == [{"id": 1, "name": "admin"}]
+    assert fresh == [{"id": 1, "name": "admin"}, {"id": 2, "name": "editor"}]
+    for app in (first, second):
+        with app.app_context():
+            db.engine.dispose()
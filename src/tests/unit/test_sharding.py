@@ -0,0 +1,164 @@
+import pytest
+import sqlalchemy as sa
+from flask import Flask
+from src.models import db, Post, User
+from src import sharding, shard_events
+from src.models import PostDailySummary
+from src.post_stats import reconcile_post_stats
+from src.post_summary import rebuild_summaries
+from src.sharding import ShardRouter, SHARD_BUCKETS, post_event
+
+
+def _urls(tmp_path, count, prefix='posts'):
+    return [f"sqlite:///{tmp_path / f'{prefix}-{i}.sqlite'}" for i in range(count)]
+
+
+@pytest.fixture()
+def make_app(tmp_path):
+    apps = []
+
+    def make(urls):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'blog.sqlite'}"
+        app.config['POST_SHARDS'] = urls
+        db.init_app(app)
+        sharding.init_app(app)
+        shard_events.init_app(app)
+        apps.append(app)
+        context = app.app_context()
+        context.push()
+        db.create_all()
+        return app, context
+
+    yield make
+    for app in apps:
+        app.extensions['post_shards'].dispose()
+
+
+def test_shard_router_roteia_por_autor_sucesso(tmp_path, make_app):
+    # Given
+    app, context = make_app(_urls(tmp_path, 2))
+    router = sharding.get_router()
+
+    # When
+    first = router.create('a', 'b', author_id=1)
+    second = router.create('c', 'd', author_id=2)
+    third = router.create('e', 'f', author_id=1)
+    db.session.commit()
+
+    # Then
+    assert [first['id'] % SHARD_BUCKETS, second['id'] % SHARD_BUCKETS, third['id'] % SHARD_BUCKETS] == [1, 2, 1]
+    assert router.engine_for_id(first['id']) is router.engines[1]
+    assert router.engine_for_id(second['id']) is router.engines[0]
+    assert router.get(third['id']) == third
+    assert [p['id'] for p in router.list_posts()] == [first['id'], second['id'], third['id']]
+    context.pop()
+
+
+def test_shard_router_aplica_eventos_depois_do_commit_sucesso(tmp_path, make_app):
+    # Given
+    app, context = make_app(_urls(tmp_path, 2))
+    router = sharding.get_router()
+    users = [User(username=f'user{i}', password='p', role_id=1) for i in range(2)]
+    db.session.add_all(users)
+    db.session.commit()
+    first = router.create('a', 'bb', author_id=users[0].id)
+    second = router.create('c', 'd', author_id=users[1].id)
+    router.update(second['id'], {'author_id': users[0].id})
+    router.delete(first['id'])
+
+    # When
+    before = [user.post_count for user in users]
+    applied = app.extensions['post_shard_events'].apply_pending()
+    db.session.expire_all()
+
+    # Then
+    assert before == [0, 0]
+    assert applied == 4
+    assert [user.post_count for user in users] == [1, 0]
+    assert users[0].last_post_at == second['created']
+    assert [(row.author_id, row.count) for row in db.session.query(PostDailySummary)] == [(users[0].id, 1)]
+    assert router.cursors() == {path: 2 for path in router.paths}
+    for engine in router.engines:
+        with engine.connect() as connection:
+            assert connection.execute(sa.select(post_event)).all() == []
+    assert app.extensions['post_shard_events'].apply_pending() == 0
+    context.pop()
+
+
+def test_shard_router_reshard_sucesso(tmp_path, make_app):
+    # Given
+    urls = _urls(tmp_path, 4)
+    old_app, context = make_app(urls[:1])
+    posts = [sharding.get_router().create(f'title {i}', 'body', author_id=i) for i in range(1, 9)]
+    db.session.commit()
+    context.pop()
+    app, context = make_app(urls[1:])
+    router = sharding.get_router()
+    db.session.add(Post(id=3, title='unsharded', body='body', author_id=3))
+    db.session.commit()
+    unsharded = router.get(3)
+
+    # When
+    moved = router.reshard(sources=urls[:1], batch_size=3)
+    created = router.create('new', 'body', author_id=1)
+    db.session.commit()
+
+    # Then
+    assert moved == len(posts) + 1
+    assert [router.get(p['id']) for p in posts] == posts
+    assert router.get(3) == unsharded
+    assert db.session.execute(db.select(Post)).scalars().all() == []
+    assert created['id'] > max(p['id'] for p in posts)
+    assert router.reshard() == 0
+    context.pop()
+
+
+def test_reconcile_post_stats_conta_shards(tmp_path, make_app):
+    # Given
+    app, context = make_app(_urls(tmp_path, 2))
+    router = sharding.get_router()
+    user = User(username='test', password='test', role_id=1)
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(Post(title='t', body='b', author_id=user.id))
+    router.create('a', 'b', author_id=user.id)
+    db.session.commit()
+    app.extensions['post_shard_events'].apply_pending()
+
+    # When
+    drifted = reconcile_post_stats()
+    db.session.refresh(user)
+
+    # Then
+    assert drifted == 1
+    assert user.post_count == 2
+    assert user.last_post_at is not None
+    assert reconcile_post_stats() == 0
+    context.pop()
+
+
+def test_reconcile_e_rebuild_ignoram_eventos_pendentes(tmp_path, make_app):
+    # Given
+    app, context = make_app(_urls(tmp_path, 2))
+    router = sharding.get_router()
+    user = User(username='test', password='test', role_id=1)
+    db.session.add(user)
+    db.session.commit()
+    router.create('a', 'b', author_id=user.id)
+    app.extensions['post_shard_events'].apply_pending()
+    router.create('c', 'd', author_id=user.id)
+
+    # When
+    drifted = reconcile_post_stats()
+    rebuild_summaries()
+    applied = app.extensions['post_shard_events'].apply_pending()
+    db.session.expire_all()
+
+    # Then
+    assert drifted == 0
+    assert applied == 1
+    assert user.post_count == 2
+    assert db.session.query(PostDailySummary).one().count == 2
+    assert reconcile_post_stats() == 0
+    context.pop()
@@ -0,0 +1,223 @@
+import threading
+import time
+import pytest
+from sqlalchemy import event
+from src.app import db, User, Role, Post
+from src.singleflight import SingleFlight
+
+BURST = 8
+
+def _seed():
+    role = Role(name='admin')
+    db.session.add(role)
+    db.session.commit()
+    user = User(username='test', password='test', role_id=role.id)
+    db.session.add(user)
+    db.session.commit()
+    post = Post(title='title', body='body', author_id=user.id)
+    db.session.add(post)
+    db.session.commit()
+    return user.id, post.id
+
+def _burst(app, url):
+    barrier = threading.Barrier(BURST)
+    responses = [None] * BURST
+
+    def request(i):
+        client = app.test_client()
+        barrier.wait()
+        responses[i] = client.get(url)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(BURST)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+def test_uma_consulta_por_chave_por_rajada_sucesso(app):
+    # Given
+    user_id, post_id = _seed()
+    app.extensions['roles'].current()
+    queries = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            queries.append(statement)
+            # Keeps the first lookup in flight while the others arrive.
+            time.sleep(0.2)
+
+    def burst(url):
+        db.session.expunge_all()
+        queries.clear()
+        responses = _burst(app, url)
+        return responses, list(queries)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        # When
+        posts, post_queries = burst(f'/posts/{post_id}')
+        users, user_queries = burst(f'/users/{user_id}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+    # Then
+    assert [r.status_code for r in posts + users] == [200] * BURST * 2
+    assert len({r.data for r in posts}) == len({r.data for r in users}) == 1
+    assert len(post_queries) == 1
+    assert len(user_queries) == 1
+    assert app.extensions['single_flight'].shared == (BURST - 1) * 2
+
+def test_single_flight_propaga_erro():
+    # Given
+    group = SingleFlight(timeout=1)
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def lookup():
+        started.set()
+        release.wait()
+        raise LookupError('boom')
+
+    def follower():
+        try:
+            group.do('key', lambda: 'never')
+        except LookupError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=lambda: pytest.raises(LookupError, group.do, 'key', lookup))
+    leader.start()
+    started.wait()
+    thread = threading.Thread(target=follower)
+    thread.start()
+
+    # When
+    while group.shared == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    thread.join()
+
+    # Then
+    assert [str(e) for e in errors] == ['boom']
+    assert group.calls == 1
+    assert group.do('key', lambda: 'again') == 'again'
+
+def test_single_flight_timeout_erro(app, client):
+    # Given
+    _, post_id = _seed()
+    group = app.extensions['single_flight']
+    group.timeout = 0.05
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+
+    leader = threading.Thread(target=group.do, args=(('post', post_id), slow))
+    leader.start()
+    started.wait()
+
+    # When
+    response = client.get(f'/posts/{post_id}')
+    release.set()
+    leader.join()
+
+    # Then
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert client.get(f'/posts/{post_id}').status_code == 200
+
+def _in_flight(group, key, release):
+    started = threading.Event()
+
+    def lookup():
+        started.set()
+        release.wait()
+        return 'old'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(group.do(key, lookup)))
+    leader.start()
+    started.wait()
+    return leader, results
+
+def test_single_flight_forget_inicia_nova_chamada():
+    # Given
+    group = SingleFlight(timeout=1)
+    release = threading.Event()
+    leader, results = _in_flight(group, 'key', release)
+
+    # When
+    group.forget('key')
+    fresh = group.do('key', lambda: 'new')
+    release.set()
+    leader.join()
+
+    # Then
+    assert fresh == 'new'
+    assert results == ['old']
+    assert group.calls == 2
+    assert group.shared == 0
+    assert group.do('key', lambda: 'again') == 'again'
+
+def test_criar_post_inicia_nova_consulta_do_autor(app, client, access_token):
+    # Given
+    user_id = User.query.filter_by(username='test').first().id
+    group = app.extensions['single_flight']
+    release = threading.Event()
+    leader, results = _in_flight(group, ('user', user_id), release)
+
+    # When
+    response = client.post('/posts/', json={'title': 't', 'body': 'b'},
+                           headers={'Authorization': f'Bearer {access_token}'})
+    fresh = group.do(('user', user_id), lambda: 'new')
+    release.set()
+    leader.join()
+
+    # Then
+    assert response.status_code == 201
+    assert response.json['author_id'] == user_id
+    assert fresh == 'new'
+    assert results == ['old']
+
+def test_single_flight_copia_erro_por_seguidor():
+    # Given
+    group = SingleFlight(timeout=1)
+    started = threading.Event()
+    release = threading.Event()
+    original = LookupError('boom')
+    errors = []
+
+    def lookup():
+        started.set()
+        release.wait()
+        raise original
+
+    def follower():
+        try:
+            group.do('key', lambda: 'never')
+        except LookupError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=lambda: pytest.raises(LookupError, group.do, 'key', lookup))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=follower) for _ in range(2)]
+    for thread in followers:
+        thread.start()
+
+    # When
+    while group.shared < 2:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    for thread in followers:
+        thread.join()
+
+    # Then
+    assert [str(e) for e in errors] == ['boom', 'boom']
+    assert errors[0] is not errors[1]
+    assert all(e is not original and e.__cause__ is original for e in errors)
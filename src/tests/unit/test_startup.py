@@ -0,0 +1,87 @@
+import json
+import subprocess
+import sys
+import time
+from src.app import create_app
+from src.startup import parse_importtime, startup_profile_command
+
+# Wall time budget of create_app() once its modules are imported. It currently
+# takes about 10 ms; the budget leaves room for slow CI machines.
+CREATE_APP_BUDGET = 0.1
+
+TEST_CONFIG = {
+    'TESTING': True,
+    'REVOCATION_REFRESH_INTERVAL': 0,
+}
+
+def test_create_app_dentro_do_orcamento():
+    # Given
+    create_app(TEST_CONFIG)
+
+    # When
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        create_app(TEST_CONFIG)
+        timings.append(time.perf_counter() - start)
+
+    # Then
+    assert min(timings) < CREATE_APP_BUDGET
+
+def test_create_app_nao_importa_dependencias_de_cli():
+    # Given
+    code = (
+        "import json, sys\n"
+        "from src.app import create_app\n"
+        f"create_app({TEST_CONFIG!r})\n"
+        "print(json.dumps([m for m in ('flask_migrate', 'alembic', 'numpy') if m in sys.modules]))\n"
+    )
+
+    # When
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    # Then
+    assert json.loads(result.stdout) == []
+
+def test_create_app_preload_importa_numpy():
+    # Given
+    code = (
+        "import sys\n"
+        "from src.app import create_app\n"
+        f"create_app({dict(TEST_CONFIG, ANALYTICS_PRELOAD=True)!r})\n"
+        "print('numpy' in sys.modules)\n"
+    )
+
+    # When
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    # Then
+    assert result.stdout.strip() == "True"
+
+def test_parse_importtime_sucesso():
+    # Given
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 | json\n"
+        "--- startup-profile: import src.app\n"
+        "import time:      2000 |       2000 |   flask.app\n"
+        "import time:      1500 |       3500 | flask\n"
+    )
+
+    # When
+    modules = parse_importtime(stderr)
+
+    # Then
+    assert modules == [("flask.app", 0.002, 0.002), ("flask", 0.0015, 0.0035)]
+
+def test_startup_profile_command_sucesso(app, monkeypatch):
+    # Given
+    monkeypatch.setenv('DATABASE_URL', 'sqlite://')
+
+    # When
+    result = app.test_cli_runner().invoke(startup_profile_command, ['--limit', '3'])
+
+    # Then
+    assert result.exit_code == 0, result.output
+    assert 'import src.app:' in result.output
+    assert 'src.revocation.init_app' in result.output
@@ -0,0 +1,69 @@
+import pytest
+from werkzeug.exceptions import NotFound
+from src.app import db, User, Role
+from src.statements import get_or_404, user_by_username
+
+def _create_user():
+    role = Role(name='admin')
+    db.session.add(role)
+    db.session.commit()
+    user = User(username='test', password='test', role_id=role.id)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+def test_get_or_404_sucesso(app):
+    # Given
+    user_id = _create_user()
+    db.session.expunge_all()
+
+    # When
+    user = get_or_404(User, user_id)
+
+    # Then
+    assert user.username == 'test'
+    assert get_or_404(User, str(user_id)) is user
+    assert user_by_username('test') is user
+
+def test_get_or_404_erro(app):
+    with pytest.raises(NotFound):
+        get_or_404(User, 42)
+
+@pytest.mark.parametrize("ident", ["abc", None, "1.5"])
+def test_get_or_404_ident_invalido_erro(app, ident):
+    with pytest.raises(NotFound):
+        get_or_404(User, ident)
+
+def test_statement_cache_hit_ratio_sucesso(app, client, access_token):
+    # Given
+    headers = {'Authorization': f'Bearer {access_token}'}
+    user_id = db.session.execute(db.select(User.id)).scalar()
+    client.get(f'/users/{user_id}')
+    before = client.get('/metrics/statement-cache', headers=headers).json
+
+    # When
+    for _ in range(5):
+        client.get(f'/users/{user_id}')
+    after = client.get('/metrics/statement-cache', headers=headers).json
+
+    # Then
+    assert after['misses'] == before['misses']
+    assert after['hits'] > before['hits']
+    assert 0 < after['hit_ratio'] <= 1
+
+def test_statement_cache_exige_admin_erro(app, client):
+    # Given
+    role = Role(name='user')
+    db.session.add(role)
+    db.session.commit()
+    db.session.add(User(username='plain', password='plain', role_id=role.id))
+    db.session.commit()
+    token = client.post('/auth/login', json={"username": "plain", "password": "plain"}).json['access_token']
+
+    # When
+    anonymous = client.get('/metrics/statement-cache')
+    forbidden = client.get('/metrics/statement-cache', headers={'Authorization': f'Bearer {token}'})
+
+    # Then
+    assert anonymous.status_code == 401
+    assert forbidden.status_code == 403
@@ -0,0 +1,79 @@
+import time
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token, decode_token, get_jwt_identity, jwt_required
+from src.token_cache import VerifiedTokenCache, CachingJWTManager
+
+def test_verified_token_cache_expira():
+    # Given
+    cache = VerifiedTokenCache(maxsize=10)
+    cache.put("valid", {"sub": "1", "exp": time.time() + 60})
+    cache.put("expired", {"sub": "2", "exp": time.time() - 1})
+    cache.put("no-exp", {"sub": "3"})
+
+    # Then
+    assert cache.get("valid")["sub"] == "1"
+    assert cache.get("expired") is None
+    assert cache.get("no-exp") is None
+
+def test_verified_token_cache_limite():
+    # Given
+    cache = VerifiedTokenCache(maxsize=2)
+    exp = time.time() + 60
+
+    # When
+    cache.put("a", {"exp": exp})
+    cache.put("b", {"exp": exp})
+    cache.get("a")
+    cache.put("c", {"exp": exp})
+
+    # Then
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+def test_caching_jwt_manager_reusa_verificacao(mocker):
+    # Given
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY="secret", JWT_VERIFIED_CACHE_SIZE=8)
+    CachingJWTManager(app)
+    decode = mocker.spy(JWTManager, "_decode_jwt_from_config")
+
+    with app.app_context():
+        token = create_access_token(identity="1")
+
+        # When
+        first = decode_token(token)
+        second = decode_token(token)
+
+    # Then
+    assert first == second
+    assert decode.call_count == 1
+    assert app.extensions["jwt_verified_cache"].hits == 1
+
+def test_caching_jwt_manager_cache_na_rota_protegida():
+    # Given
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY="secret", JWT_VERIFIED_CACHE_SIZE=8)
+    CachingJWTManager(app)
+    app.add_url_rule("/me", "me", jwt_required()(lambda: get_jwt_identity()))
+    with app.app_context():
+        token = create_access_token(identity="1")
+    client = app.test_client()
+
+    # When
+    responses = [client.get("/me", headers={"Authorization": f"Bearer {token}"}) for _ in range(2)]
+
+    # Then
+    assert [response.status_code for response in responses] == [200, 200]
+    assert app.extensions["jwt_verified_cache"].hits == 1
+
+def test_caching_jwt_manager_metodo_alterado_erro(mocker):
+    # Given
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY="secret", JWT_VERIFIED_CACHE_SIZE=8)
+    mocker.patch.object(JWTManager, "_decode_jwt_from_config", lambda self, encoded_token, options: {})
+
+    # When / Then
+    with pytest.raises(RuntimeError):
+        CachingJWTManager(app)
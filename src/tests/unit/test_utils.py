@@ -1,7 +1,22 @@
 import pytest
-from src.utils import eleva_quadrado, requires_roles
+from src.utils import eleva_quadrado, requires_roles, parse_id_list
 from http import HTTPStatus
 
+def test_requires_roles_usuario_inativo(mocker):
+    # Given
+    mock_user = mocker.Mock(active=False)
+    
+    mocker.patch('src.utils.get_jwt_identity')
+    mocker.patch('src.utils.get_or_404', return_value=mock_user)
+    mocker.patch('src.utils.name_of', return_value='admin')
+    decorated_function = requires_roles('admin')(lambda: "success")
+    
+    # When
+    result = decorated_function()
+
+    # Then
+    assert result == ({"msg": "User is not active"}, HTTPStatus.UNAUTHORIZED)
+
 @pytest.mark.parametrize("entrada, esperado", [(2, 4), (3, 9), (4, 16), (0, 0), (-2, 4)])
 def test_eleva_quadrado_sucesso(entrada, esperado):
     resultado = eleva_quadrado(entrada)
@@ -21,10 +36,10 @@ def test_eleva_quadrado_erro(entrada, exc_class, msg):
 def test_requires_roles_success(mocker):
     # Given
     mock_user = mocker.Mock()
-    mock_user.role.name = 'admin'
     
     mocker.patch('src.utils.get_jwt_identity')
-    mocker.patch('src.utils.db.get_or_404', return_value=mock_user)
+    mocker.patch('src.utils.get_or_404', return_value=mock_user)
+    mocker.patch('src.utils.name_of', return_value='admin')
     decorated_function = requires_roles('admin')(lambda: "success")            
 
     # When    
@@ -36,14 +51,28 @@ def test_requires_roles_success(mocker):
 def test_requires_roles_fail(mocker):
     # Given
     mock_user = mocker.Mock()
-    mock_user.role.name = 'normal'
     
     mocker.patch('src.utils.get_jwt_identity'), 
-    mocker.patch('src.utils.db.get_or_404', return_value=mock_user)
+    mocker.patch('src.utils.get_or_404', return_value=mock_user)
+    mocker.patch('src.utils.name_of', return_value='normal')
     decorated_function = requires_roles('admin')(lambda: "success")            
     
     # When
     result = decorated_function()
 
     # Then
-    assert result == ({"msg": "Admin only!"}, HTTPStatus.FORBIDDEN)
\ No newline at end of file
+    assert result == ({"msg": "Admin only!"}, HTTPStatus.FORBIDDEN)
+
+@pytest.mark.parametrize("entrada, esperado", [("1,2,3", [1, 2, 3]), ("3, 1,3", [3, 1]), ("", []), ("5,", [5])])
+def test_parse_id_list_sucesso(entrada, esperado):
+    assert parse_id_list(entrada, limit=10) == esperado
+
+@pytest.mark.parametrize("entrada, mensagem", [
+    ("1,a", "ids must be a comma-separated list of integers"),
+    ("1,2,3,4", "At most 3 ids can be requested at once"),
+    ("1,2,3,x" + ",9" * 100_000, "At most 3 ids can be requested at once"),
+])
+def test_parse_id_list_erro(entrada, mensagem):
+    with pytest.raises(ValueError) as erro:
+        parse_id_list(entrada, limit=3)
+    assert str(erro.value) == mensagem
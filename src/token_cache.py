@@ -0,0 +1,125 @@
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask_jwt_extended import JWTManager
+
+# The signature of the private JWTManager method overridden below, as of
+# flask-jwt-extended 4.7.
+_DECODE_PARAMETERS = ("self", "encoded_token", "csrf_value", "allow_expired")
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of decoded JWT claims, keyed by the SHA-256 digest of the token.
+
+    Entries are only stored after the token has been fully verified, and they are
+    dropped once the token's ``exp`` claim has passed.
+
+    Attributes:
+        maxsize (int): The maximum number of tokens kept in the cache.
+        hits (int): The number of lookups served from the cache.
+        misses (int): The number of lookups that required a full verification.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(encoded_token):
+        return hashlib.sha256(encoded_token.encode()).digest()
+
+    def get(self, encoded_token):
+        """
+        Return the cached claims of a token, or None if absent or expired.
+        """
+        key = self.key(encoded_token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, encoded_token, claims):
+        """
+        Store the claims of a verified token until its ``exp`` claim.
+
+        Tokens without an expiration are not cached.
+        """
+        expires_at = claims.get("exp")
+        if expires_at is None or expires_at <= time.time():
+            return
+        key = self.key(encoded_token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _check_decode_hook():
+    """
+    Make sure JWTManager still decodes tokens through the method CachingJWTManager overrides.
+
+    Raises:
+        RuntimeError: If the installed flask-jwt-extended changed the method.
+    """
+    method = getattr(JWTManager, "_decode_jwt_from_config", None)
+    if method is None or tuple(inspect.signature(method).parameters) != _DECODE_PARAMETERS:
+        raise RuntimeError(
+            "This flask-jwt-extended release changed JWTManager._decode_jwt_from_config; "
+            "update src/token_cache.py or set JWT_VERIFIED_CACHE_SIZE=0"
+        )
+
+
+class CachingJWTManager(JWTManager):
+    """
+    JWTManager that skips signature verification for tokens it has already verified.
+
+    Only the decode step is cached: type, freshness and blocklist checks still run
+    on every request, so revoked tokens are rejected as usual. The cache is enabled
+    by setting ``JWT_VERIFIED_CACHE_SIZE`` to a positive value.
+
+    flask-jwt-extended has no public hook for the decode step, so this overrides
+    the private ``_decode_jwt_from_config``. The dependency is pinned to the tested
+    minor release, and ``init_app`` refuses to enable the cache if the method is
+    gone or its signature changed, instead of silently bypassing it.
+    """
+
+    def init_app(self, app, add_context_processor=False):
+        super().init_app(app, add_context_processor=add_context_processor)
+        size = app.config.get("JWT_VERIFIED_CACHE_SIZE", 0)
+        if size > 0:
+            _check_decode_hook()
+        app.extensions["jwt_verified_cache"] = VerifiedTokenCache(size) if size > 0 else None
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        cache = current_app.extensions.get("jwt_verified_cache")
+        if cache is None or csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        claims = cache.get(encoded_token)
+        if claims is None:
+            claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+            cache.put(encoded_token, claims)
+        return claims
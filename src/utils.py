@@ -1,22 +1,73 @@
 from http import HTTPStatus
  
 from flask_jwt_extended import get_jwt_identity
-from src.models.user import User, db
+from src.models.user import User
+from src.statements import get_or_404
+from src.roles import name_of
 from functools import wraps
+from datetime import datetime, timezone
 
 def requires_roles(role_name):
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
             user_id = get_jwt_identity()
-            user = db.get_or_404(User, user_id)
+            user = get_or_404(User, user_id)
+            if not user.active:
+                # E.g. a user whose deletion is pending.
+                return {"msg": "User is not active"}, HTTPStatus.UNAUTHORIZED
             
-            if user.role.name != role_name:
+            if name_of(user.role_id) != role_name:
                 return {"msg": "Admin only!"}, HTTPStatus.FORBIDDEN
             return f(*args, **kwargs)       
         return wrapped
         
     return decorator
 
+def utcnow():
+    """
+    Return the current UTC time as a naive datetime, as stored by SQLite.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 def eleva_quadrado(x):
-    return x ** 2
\ No newline at end of file
+    return x ** 2
+
+def parse_id_list(raw, limit):
+    """
+    Parse a comma separated list of integer ids such as ``"1,2,3"``.
+
+    Duplicates are dropped while the first occurrence keeps its position, so
+    callers can return results in the order they were requested.
+
+    Args:
+        raw (str): The raw query string value.
+        limit (int): The maximum number of ids accepted, duplicates included.
+
+    Returns:
+        list: The parsed ids, in request order.
+
+    Raises:
+        ValueError: If an id is not an integer or the limit is exceeded. The
+            message can be shown to the client.
+    """
+    # Split at most ``limit`` times, so an oversized list is rejected without
+    # parsing the rest of it.
+    parts = raw.split(",", limit)
+    if len(parts) > limit and parts[limit].strip():
+        raise ValueError(f"At most {limit} ids can be requested at once")
+
+    ids = []
+    seen = set()
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            value = int(part)
+        except ValueError:
+            raise ValueError("ids must be a comma-separated list of integers") from None
+        if value not in seen:
+            seen.add(value)
+            ids.append(value)
+    return ids